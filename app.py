@@ -6,14 +6,17 @@ Demonstrates core functionality without complex infrastructure
 
 import os
 import json
-import asyncio
+import base64
+import shutil
+import tempfile
+import atexit
 import threading
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from flask import Flask, render_template, request, jsonify, send_file
 from werkzeug.utils import secure_filename
 import uuid
-import time
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -35,21 +38,61 @@ if os.getenv('SF_SIMPLE_ENABLE_DETAILED_LOGGING', 'false').lower() == 'true':
 logging.getLogger('werkzeug').setLevel(logging.WARNING)
 
 # Import our simple utilities
-from utils.text_extractor import extract_text_from_file
+from utils.text_extractor import detect_source_format
 from utils.scene_analyzer import analyze_screenplay
-from utils.storyboard_generator import generate_storyboard_frames
+from utils.storyboard_generator import generate_storyboard_frames, FRAME_CONCURRENCY
 from utils.print_generator import generate_printable_storyboard
+from utils.status_tracker import StatusTracker, PROGRESS_FIELDS
+from utils.project_store import ProjectStore, ProjectMapping, ACTIVE_JOB_STATES
+from utils.job_queue import JobQueue, MAX_QUEUED_JOBS, QUEUE_RETRY_AFTER
+from utils.generation_job import FINISHED_STATES
+from utils.image_store import resolve_image_path, get_image_mimetype
+from utils.llm_cache import get_llm_cache
+from utils.image_cache import get_image_cache
+from utils.page_cache import get_page_cache
+from utils.upload_cache import UPLOAD_CACHE_ENABLED, get_upload_cache, spool_upload
+from utils.chunked_upload import UploadSessions, ChunkedUploadError
+from utils.upload_job import (
+    EXTRACTION_WORKERS, EXTRACTING, EXTRACTED, extraction_status, finish_upload, recover_uploads, run_upload_job
+)
 
 app = Flask(__name__)
 app.config['UPLOAD_FOLDER'] = 'uploads'
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB per request; larger files use chunked uploads
+app.config['FRAME_CONCURRENCY'] = FRAME_CONCURRENCY  # Frames rendered in parallel per job
+app.config['MAX_QUEUED_JOBS'] = MAX_QUEUED_JOBS  # Waiting jobs accepted before /generate returns 429
+app.config['QUEUE_RETRY_AFTER'] = QUEUE_RETRY_AFTER  # Retry-After seconds sent with 429 responses
+# Default for cancelling jobs once no page is watching them (overridable per /generate request)
+app.config['CANCEL_WHEN_UNWATCHED'] = os.getenv('SF_SIMPLE_CANCEL_UNWATCHED', 'false').lower() == 'true'
+app.config['SSE_HEARTBEAT_SECONDS'] = 15  # Keepalive comment interval on /events streams
+app.config['SSE_RETRY_MS'] = 2000  # Client reconnect delay for /events streams
+# Open /events streams per web worker; each holds a gthread thread, so past this clients poll the delta endpoint
+app.config['SSE_MAX_STREAMS'] = int(os.getenv('SF_SIMPLE_SSE_MAX_STREAMS', '8'))
+app.config['API_PAGE_SIZE'] = 50  # Default page size of the /api list endpoints
+app.config['API_MAX_PAGE_SIZE'] = 200  # Largest ?limit= the /api list endpoints accept
+# Let the front server (nginx/Apache) stream stored images via X-Sendfile when configured
+app.config['USE_X_SENDFILE'] = os.getenv('SF_SIMPLE_USE_X_SENDFILE', 'false').lower() == 'true'
+
+# Stored images are content-addressed, so browsers may cache them for a year
+IMAGE_CACHE_MAX_AGE = 365 * 24 * 60 * 60
 
 # Create upload directory
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
-# Simple in-memory storage
-projects = {}
-generation_status = {}
+# Projects, jobs and frames persist in SQLite; only running jobs stay in memory (within a byte budget)
+store = ProjectStore()
+projects = ProjectMapping(store)
+generation_status = StatusTracker(store)
+# Generation runs in worker processes (see utils/worker_pool.py); this tier only enqueues
+job_queue = JobQueue(store)
+# Uploads are extracted in the background so /upload answers right away
+upload_executor = ThreadPoolExecutor(max_workers=EXTRACTION_WORKERS, thread_name_prefix='upload')
+# Extractions cut off by a restart start again (or fail if their saved file is gone)
+recover_uploads(store, projects, generation_status, upload_executor.submit)
+# Resumable uploads are assembled chunk by chunk in part files next to the uploads
+upload_sessions = UploadSessions(os.path.join(app.config['UPLOAD_FOLDER'], 'parts'))
+# Slots for open /events streams, so they can't take every request thread of this worker
+sse_streams = threading.BoundedSemaphore(app.config['SSE_MAX_STREAMS'])
 
 # Styles available
 STYLES = {
@@ -81,7 +124,13 @@ def health_check():
     return jsonify({
         'status': 'healthy',
         'timestamp': datetime.now().isoformat(),
-        'version': '1.0.0'
+        'version': '1.0.0',
+        'queue': job_queue.stats(),
+        'llm_cache': get_llm_cache().stats(),
+        'image_cache': get_image_cache().stats(),
+        'page_cache': get_page_cache().stats(),
+        'upload_cache': get_upload_cache().stats(),
+        'memory': generation_status.memory_stats()
     })
 
 @app.route('/')
@@ -104,58 +153,156 @@ def upload_file():
             logger.warning("❌ No file selected")
             return jsonify({'error': 'No file selected'}), 400
         
-        # Save file
-        filename = secure_filename(file.filename)
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
-        logger.info(f"📄 File saved: {filename} ({os.path.getsize(filepath)} bytes)")
-        
-        # Extract text
-        logger.info("🔍 Extracting text from file...")
-        text = extract_text_from_file(filepath)
-        
-        # Clean up file
-        os.remove(filepath)
+        # A revised draft names the project it replaces so unchanged scenes are reused
+        revision_of = request.form.get('revision_of') or None
+        if revision_of and revision_of not in projects:
+            logger.warning(f"❌ Previous draft not found: {revision_of}")
+            return jsonify({'error': 'Previous project not found'}), 404
         
-        if not text:
-            logger.error("❌ Could not extract text from file")
-            return jsonify({'error': 'Could not extract text from file'}), 400
-        
-        logger.info(f"✅ Text extracted: {len(text)} characters, {len(text.split())} words")
-        
-        # Quick analysis to get scene count
-        logger.info("🎬 Detecting optimal scene count...")
-        from utils.scene_analyzer import detect_optimal_scene_count
-        detected_scenes = detect_optimal_scene_count(text)
-        logger.info(f"📊 Scene detection complete: {detected_scenes} scenes detected")
-        
-        # Create project
-        project_id = str(uuid.uuid4())
-        projects[project_id] = {
-            'id': project_id,
-            'filename': filename,
-            'text': text,
-            'created_at': datetime.now().isoformat(),
-            'word_count': len(text.split()),
-            'char_count': len(text),
-            'detected_scenes': detected_scenes
-        }
+        # Stream the upload into a spooled temp file, hashing it on the way
+        filename = secure_filename(file.filename)
+        spool, file_hash, size = spool_upload(file.stream)
+        logger.info(f"📄 File received: {filename} ({size} bytes, sha256 {file_hash[:12]})")
         
-        logger.info(f"🆔 Project created: {project_id}")
+        def save_spool(filepath):
+            with open(filepath, 'wb') as saved:
+                shutil.copyfileobj(spool, saved)
         
-        return jsonify({
-            'success': True,
-            'project_id': project_id,
-            'filename': filename,
-            'word_count': len(text.split()),
-            'char_count': len(text),
-            'text_length': len(text),
-            'detected_scenes': detected_scenes
-        })
+        with spool:
+            return create_upload_project(filename, file_hash, revision_of, save_spool)
+    
+    except Exception as e:
+        logger.error(f"❌ Upload failed: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+def create_upload_project(filename, file_hash, revision_of, save_file):
+    """
+    Create the project for a received upload
+
+    A file already in the upload cache is ready at once (200). Otherwise
+    save_file(path) stores it where the extractors can read it and extraction
+    runs in the background; the 202 response points at its status channel.
+    """
+    source_format = detect_source_format(filename)
+    project_id = str(uuid.uuid4())
+    project = {
+        'id': project_id,
+        'filename': filename,
+        'text': '',
+        'created_at': datetime.now().isoformat(),
+        'word_count': 0,
+        'char_count': 0,
+        'detected_scenes': 0,
+        'format': source_format,
+        'file_hash': file_hash,
+        'revision_of': revision_of,
+        'status': EXTRACTING
+    }
     
+    # The same draft uploaded again skips extraction and scene detection
+    cached = get_upload_cache().get(file_hash, source_format) if UPLOAD_CACHE_ENABLED else None
+    if cached:
+        summary = finish_upload(project, cached, projects)
+        logger.info(f"♻️ Seen this file before, project {project_id} is ready ({summary['detected_scenes']} scenes)")
+        return jsonify({'success': True, 'project_id': project_id, 'status': 'ready', 'deduplicated': True,
+                        **summary})
+    
+    # Extractors need a path, so the file is written out only on a cache miss
+    fd, filepath = tempfile.mkstemp(suffix=os.path.splitext(filename)[1], dir=app.config['UPLOAD_FOLDER'])
+    os.close(fd)
+    save_file(filepath)
+    
+    # Extraction runs in the background; progress goes out on the generation status channel.
+    # The path is kept on the project so a restarted server can pick the extraction up again
+    projects[project_id] = dict(project, upload_path=filepath)
+    generation_status[project_id] = extraction_status()
+    upload_executor.submit(run_upload_job, project_id, filepath, projects, generation_status)
+    logger.info(f"🆔 Project created: {project_id}, extracting text in the background")
+    
+    return jsonify({
+        'success': True,
+        'project_id': project_id,
+        'filename': filename,
+        'status': EXTRACTING,
+        'revision_of': revision_of,
+        'deduplicated': False,
+        'status_url': f'/status/{project_id}/delta',
+        'events_url': f'/events/{project_id}'
+    }), 202
+
+def chunked_upload_error(error):
+    """JSON response for a rejected chunked upload request"""
+    return jsonify({'error': str(error), **error.details}), error.status_code
+
+@app.route('/upload/chunks', methods=['POST'])
+def start_chunked_upload():
+    """
+    Open a resumable upload session
+
+    Send {filename, size, revision_of?}; then PUT each chunk of `chunk_size`
+    bytes to /upload/chunks/<upload_id>/<index> and POST .../complete.
+    """
+    data = request.get_json(silent=True) or {}
+    filename = secure_filename(data.get('filename') or '')
+    if not filename:
+        return jsonify({'error': 'No file selected'}), 400
+    
+    revision_of = data.get('revision_of') or None
+    if revision_of and revision_of not in projects:
+        return jsonify({'error': 'Previous project not found'}), 404
+    
+    try:
+        session = upload_sessions.create(filename, int(data.get('size') or 0), revision_of)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Invalid file size'}), 400
+    except ChunkedUploadError as e:
+        return chunked_upload_error(e)
+    
+    logger.info(f"📦 Chunked upload {session['upload_id']} started: {filename} "
+                f"({session['size']} bytes in {session['total_chunks']} chunks)")
+    return jsonify(session), 201
+
+@app.route('/upload/chunks/<upload_id>')
+def get_chunked_upload(upload_id):
+    """Session state, including the chunks already received (for resuming)"""
+    session = upload_sessions.get(upload_id)
+    if session is None:
+        return jsonify({'error': 'Upload session not found'}), 404
+    return jsonify(session)
+
+@app.route('/upload/chunks/<upload_id>/<int:index>', methods=['PUT'])
+def put_upload_chunk(upload_id, index):
+    """Store one chunk (raw request body); X-Chunk-SHA256 is checked when sent"""
+    try:
+        return jsonify(upload_sessions.write_chunk(upload_id, index, request.stream,
+                                                   request.headers.get('X-Chunk-SHA256')))
+    except ChunkedUploadError as e:
+        return chunked_upload_error(e)
+
+@app.route('/upload/chunks/<upload_id>/complete', methods=['POST'])
+def complete_chunked_upload(upload_id):
+    """Finish a chunked upload; answers like /upload"""
+    try:
+        session, part_path, file_hash = upload_sessions.complete(upload_id)
+    except ChunkedUploadError as e:
+        return chunked_upload_error(e)
+    
+    revision_of = session['revision_of']
+    if revision_of and revision_of not in projects:
+        upload_sessions.discard(upload_id)
+        return jsonify({'error': 'Previous project not found'}), 404
+    
+    logger.info(f"📄 Chunked upload {upload_id} assembled: {session['filename']} "
+                f"({session['size']} bytes, sha256 {file_hash[:12]})")
+    try:
+        # The part file already holds the assembled upload; it's moved, not copied
+        return create_upload_project(session['filename'], file_hash, revision_of,
+                                     lambda filepath: os.replace(part_path, filepath))
     except Exception as e:
         logger.error(f"❌ Upload failed: {str(e)}")
         return jsonify({'error': str(e)}), 500
+    finally:
+        upload_sessions.discard(upload_id)
 
 @app.route('/generate/<project_id>')
 def generate_page(project_id):
@@ -173,6 +320,9 @@ def generate_storyboard():
         data = request.json
         project_id = data.get('project_id')
         style = data.get('style', 'classic')
+        cancel_when_unwatched = bool(data.get('cancel_when_unwatched', app.config['CANCEL_WHEN_UNWATCHED']))
+        # Fresh take: render every frame again instead of reusing cached images
+        fresh_images = bool(data.get('fresh', False))
         
         logger.info(f"🎬 Generation started for project {project_id} with style '{style}'")
         
@@ -181,166 +331,99 @@ def generate_storyboard():
             return jsonify({'error': 'Project not found'}), 404
         
         project = projects[project_id]
+        if project.get('status') == EXTRACTING:
+            return jsonify({'error': 'Text extraction is still running', 'status': EXTRACTING}), 409
+        if project.get('status') == 'error':
+            return jsonify({'error': 'Could not extract text from file'}), 400
         logger.info(f"📄 Project loaded: {project['filename']} ({project['word_count']} words)")
         
+        # One job per project: a second request (double click, another tab) must not start a rival
+        # run, nor replace the status of one still queued, running or winding down after a cancel
+        current = generation_status.get(project_id) or {}
+        if current.get('status') in ACTIVE_JOB_STATES or job_queue.position(project_id) is not None:
+            return jsonify({'error': 'Generation is already running', 'status': current.get('status')}), 409
+        
+        # Admission control: refuse new work while the queue is full
+        queued = job_queue.stats()['queued']
+        if queued >= app.config['MAX_QUEUED_JOBS']:
+            return queue_full_response()
+        
         # Initialize generation status
         generation_status[project_id] = {
-            'status': 'analyzing',
+            'status': 'queued',
             'progress': 0,
-            'current_step': 'Analyzing screenplay and detecting optimal scenes...',
+            'current_step': f'Waiting in queue (position {queued + 1})...',
             'total_steps': 3,
             'current_step_num': 1,
             'scenes': [],
             'frames': [],
             'analysis': None,
             'style': style,
+            'queue_position': queued + 1,
+            'cancel_when_unwatched': cancel_when_unwatched,
+            'fresh_images': fresh_images,
             'started_at': datetime.now().isoformat()
         }
         
-        logger.info(f"📊 Generation status initialized for {project_id}")
+        # Hand the job to the worker processes
+        prompt_style = STYLES.get(style, STYLES['classic'])['prompt_style']
+        position = job_queue.enqueue(project_id, prompt_style, app.config['MAX_QUEUED_JOBS'])
+        if position is None:
+            del generation_status[project_id]
+            return queue_full_response()
+        if position == 0:
+            return jsonify({'error': 'Generation is already running'}), 409
         
-        # Start generation in background thread
-        def generate_async():
-            try:
-                # OPTIMIZATION: Skip redundant AI analysis since we already detected scenes during upload
-                # Old flow: Upload (detect scenes) → Generate (re-analyze same text?!) → Frames
-                # New flow: Upload (detect scenes) → Generate (use cached count) → Frames IMMEDIATELY
-                
-                # Step 1: Create fast basic analysis (skip redundant AI analysis)
-                if project_id in generation_status:
-                    word_count = project['word_count']
-                    if word_count > 20000:
-                        generation_status[project_id]['current_step'] = 'Analyzing large script (optimized for speed)...'
-                    elif word_count > 8000:
-                        generation_status[project_id]['current_step'] = 'Analyzing medium script...'
-                    else:
-                        generation_status[project_id]['current_step'] = 'Analyzing script...'
-                    generation_status[project_id]['progress'] = 10
-                
-                logger.info(f"🚀 Skipping redundant AI analysis - using basic scene extraction for {project['detected_scenes']} scenes")
-                
-                # FIXED: Use fast targeted AI analysis instead of garbage pattern matching
-                from utils.scene_analyzer import fast_ai_analyze_screenplay
-                
-                # Update progress for AI analysis
-                if project_id in generation_status:
-                    generation_status[project_id]['current_step'] = 'Extracting characters and story beats with AI...'
-                    generation_status[project_id]['progress'] = 20
-                
-                analysis = fast_ai_analyze_screenplay(project['text'], project['detected_scenes'])
-                
-                if project_id in generation_status:
-                    generation_status[project_id]['current_step'] = f'Analysis complete! Ready to generate {analysis["total_scenes"]} scenes!'
-                    generation_status[project_id]['progress'] = 30
-                    generation_status[project_id]['analysis'] = analysis
-                
-                logger.info(f"⚡ Fast analysis complete: {analysis['total_scenes']} scenes, {len(analysis['characters'])} characters")
-                
-                print(f"📊 Analysis complete: {analysis['total_scenes']} scenes, {len(analysis['characters'])} characters")
-                
-                # Step 2: Generate frames with live updates  
-                if project_id in generation_status:
-                    generation_status[project_id]['current_step'] = f'Starting frame generation for {analysis["total_scenes"]} scenes...'
-                    generation_status[project_id]['current_step_num'] = 2
-                    generation_status[project_id]['progress'] = 40
-                
-                # FRAME GENERATION: Start immediately with real AI images
-                
-                # FIXED: Robust frame generation with proper error handling
-                frames = []
-                total_scenes = len(analysis['scenes'])
-                
-                print(f"🎬 Starting generation for {total_scenes} scenes...")
-                
-                try:
-                    # Calculate total frames needed based on intelligent analysis
-                    total_frames_needed = sum(scene.get('frames_needed', 1) for scene in analysis['scenes'])
-                    current_frame_index = 0
-                    
-                    print(f"🎬 Intelligent generation: {total_frames_needed} total frames for {total_scenes} scenes")
-                    
-                    for scene_index, scene in enumerate(analysis['scenes']):
-                        if project_id not in generation_status:
-                            print("❌ Generation cancelled - project removed")
-                            break
-                        
-                        # Variable frames per scene based on AI analysis
-                        frames_for_scene = scene.get('frames_needed', 1)
-                        scene_type = scene.get('scene_type', 'dialogue')
-                        visual_complexity = scene.get('visual_complexity', 'simple')
-                        
-                        print(f"🎬 Scene {scene['scene_number']} ({scene_type}, {visual_complexity}): {frames_for_scene} frames")
-                        
-                        # Generate frames for this scene
-                        for frame_num in range(frames_for_scene):
-                            if project_id not in generation_status:
-                                break
-                            
-                            current_frame_index += 1
-                            progress = 45 + (current_frame_index / total_frames_needed * 50)  # 45% to 95%
-                            
-                            generation_status[project_id].update({
-                                'current_step': f'Generating frame {current_frame_index} of {total_frames_needed} - Scene {scene["scene_number"]}.{frame_num + 1}: {scene["location"]}',
-                                'progress': progress,
-                                'current_frame': current_frame_index,
-                                'total_frames': total_frames_needed
-                            })
-                            
-                            # Generate individual frame with REAL AI images and character consistency
-                            try:
-                                from utils.storyboard_generator import generate_ai_frame_sync
-                                frame = generate_ai_frame_sync(scene, frame_num + 1, STYLES[style]['prompt_style'], analysis)
-                                frames.append(frame)
-                                
-                                # Update frames in real-time
-                                generation_status[project_id]['frames'] = frames.copy()
-                                
-                                print(f"   ✅ Generated frame {current_frame_index}: {frame['frame_id']} ({scene_type})")
-                                
-                            except Exception as frame_error:
-                                print(f"   ❌ Frame {current_frame_index} failed: {frame_error}")
-                                # Continue with other frames
-                                continue
-                            
-                            time.sleep(0.1)  # Minimal delay for UI updates
-                
-                except Exception as gen_error:
-                    print(f"❌ Generation loop failed: {gen_error}")
-                    if project_id in generation_status:
-                        generation_status[project_id]['status'] = 'error'
-                        generation_status[project_id]['error'] = str(gen_error)
-                    return
-                
-                print(f"🎉 Generation complete: {len(frames)} frames")
-                
-                # Step 3: Complete
-                if project_id in generation_status:
-                    generation_status[project_id]['current_step'] = f'Generation complete! Created {len(frames)} frames.'
-                    generation_status[project_id]['current_step_num'] = 3
-                    generation_status[project_id]['status'] = 'completed'
-                    generation_status[project_id]['progress'] = 100
-                    generation_status[project_id]['frames'] = frames
-                    generation_status[project_id]['completed_at'] = datetime.now().isoformat()
-                
-            except Exception as e:
-                if project_id in generation_status:
-                    generation_status[project_id]['status'] = 'error'
-                    generation_status[project_id]['error'] = str(e)
-                    generation_status[project_id]['current_step'] = f'Error: {str(e)}'
-        
-        # Start generation thread
-        thread = threading.Thread(target=generate_async)
-        thread.start()
+        logger.info(f"📊 Generation queued for {project_id} at position {position}")
         
         return jsonify({
             'success': True,
             'project_id': project_id,
-            'message': 'Generation started'
+            'status': 'queued',
+            'queue_position': position,
+            'message': 'Generation queued'
         })
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def queue_full_response():
+    """429 telling the client when to retry a generation request"""
+    retry_after = app.config['QUEUE_RETRY_AFTER']
+    response = jsonify({'error': 'Generation queue is full, please retry shortly', 'retry_after': retry_after})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
+@app.route('/cancel/<project_id>', methods=['POST'])
+def cancel_generation(project_id):
+    """
+    Cancel a queued or running generation job
+    
+    Queued jobs are removed before they start; a running job's worker notices
+    the cancelled status, drops its queued frames and aborts in-flight API calls.
+    """
+    status = generation_status.get(project_id)
+    if status is None:
+        return jsonify({'error': 'Status not found'}), 404
+    
+    if status.get('status') in FINISHED_STATES:
+        return jsonify({'error': 'Generation already finished', 'status': status.get('status')}), 409
+    if status.get('status') in (EXTRACTING, EXTRACTED):
+        return jsonify({'error': 'No generation to cancel', 'status': status.get('status')}), 409
+    
+    job_queue.dequeue(project_id)
+    generation_status.update_status(
+        project_id,
+        status='cancelled',
+        current_step='Generation cancelled',
+        queue_position=None,
+        completed_at=datetime.now().isoformat()
+    )
+    logger.info(f"🛑 Generation cancelled for {project_id}")
+    
+    return jsonify({'success': True, 'project_id': project_id, 'status': 'cancelled'})
+
 @app.route('/processing/<project_id>')
 def processing_page(project_id):
     """Processing page - track progress and view results"""
@@ -380,8 +463,123 @@ def get_status(project_id):
     if project_id not in generation_status:
         return jsonify({'error': 'Status not found'}), 404
     
+    store.touch_job(project_id)
     return jsonify(generation_status[project_id])
 
+@app.route('/status/<project_id>/delta')
+def get_status_delta(project_id):
+    """
+    Get progress fields plus frames added since the client's cursor
+
+    Pass the `cursor` from the previous response to receive only new frames.
+    Responses are cached per status version and support ETag revalidation.
+    """
+    cached = generation_status.delta_response(project_id, request.args.get('cursor'))
+    if cached is None:
+        return jsonify({'error': 'Status not found'}), 404
+    
+    store.touch_job(project_id)
+    etag, body = cached
+    response = app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+@app.route('/events/<project_id>')
+def stream_status_events(project_id):
+    """
+    Server-Sent Events stream of generation progress
+    
+    Pushes `reset`, `analysis`, `frame` (one per newly completed frame), `step`
+    and `progress` events as the job updates its status, then `done` once the
+    job completes, fails or is cancelled, or an upload finishes extracting.
+    Reconnecting clients resume from Last-Event-ID. Past SSE_MAX_STREAMS open
+    streams in this worker the request gets a 503 naming the delta endpoint
+    to poll instead.
+    """
+    if project_id not in generation_status:
+        return jsonify({'error': 'Status not found'}), 404
+    
+    if not sse_streams.acquire(blocking=False):
+        response = jsonify({
+            'error': 'Too many open event streams',
+            'fallback': f'/status/{project_id}/delta'
+        })
+        response.headers['Retry-After'] = str(app.config['SSE_RETRY_MS'] // 1000)
+        return response, 503
+    
+    cursor = request.headers.get('Last-Event-ID') or request.args.get('cursor')
+    heartbeat = app.config['SSE_HEARTBEAT_SECONDS']
+    
+    def format_event(event, data, event_id=None):
+        message = f"event: {event}\n"
+        if event_id:
+            message += f"id: {event_id}\n"
+        return message + f"data: {json.dumps(data)}\n\n"
+    
+    def stream():
+        nonlocal cursor
+        last_step = None
+        yield f"retry: {app.config['SSE_RETRY_MS']}\n\n"
+        
+        while True:
+            delta = generation_status.delta(project_id, cursor)
+            if delta is None:
+                yield format_event('gone', {'error': 'Status not found'})
+                return
+            
+            frames = delta.pop('frames')
+            if delta['reset'] and cursor:
+                yield format_event('reset', {})
+            if 'analysis' in delta:
+                yield format_event('analysis', delta.pop('analysis'))
+            
+            first_index = delta['frame_count'] - len(frames)
+            for offset, frame in enumerate(frames):
+                yield format_event('frame', {'index': first_index + offset, 'frame': frame})
+            
+            if delta['current_step'] != last_step:
+                last_step = delta['current_step']
+                yield format_event('step', {
+                    'current_step': delta['current_step'],
+                    'current_step_num': delta['current_step_num']
+                })
+            
+            # The progress event closes each batch and carries the resume cursor
+            cursor = delta['cursor']
+            yield format_event('progress', delta, event_id=cursor)
+            
+            if delta['status'] in FINISHED_STATES or delta['status'] == EXTRACTED:
+                yield format_event('done', {'status': delta['status']})
+                return
+            
+            # An open stream counts as someone watching the job
+            store.touch_job(project_id)
+            while not generation_status.wait_for_change(project_id, cursor, timeout=heartbeat):
+                store.touch_job(project_id)
+                yield ": keepalive\n\n"
+    
+    response = app.response_class(stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+    # Runs when the server closes the response, even if the stream never started
+    response.call_on_close(sse_streams.release)
+    return response
+
+@app.route('/generated/<name>')
+def serve_generated_image(name):
+    """Serve a stored frame image; names are content hashes so they never change"""
+    path = resolve_image_path(name)
+    if path is None:
+        return "Image not found", 404
+    
+    response = send_file(path, mimetype=get_image_mimetype(name), conditional=True,
+                         etag=name.split('.')[0], max_age=IMAGE_CACHE_MAX_AGE)
+    response.cache_control.immutable = True
+    response.cache_control.public = True
+    return response
+
 @app.route('/print/<project_id>')
 def print_storyboard(project_id):
     """Generate printable version of storyboard"""
@@ -406,12 +604,93 @@ def print_storyboard(project_id):
                          printable_html=printable_html,
                          get_print_styles=get_print_styles)
 
+def encode_cursor(position):
+    """Opaque paging cursor pointing just past the last item returned"""
+    return base64.urlsafe_b64encode(json.dumps(position).encode('utf-8')).decode('ascii')
+
+def page_request():
+    """
+    (cursor position, limit, fields) from the ?cursor=, ?limit= and ?fields= query
+
+    The position is None on the first page and fields is None when every
+    field is wanted; a malformed cursor raises ValueError.
+    """
+    cursor = request.args.get('cursor')
+    position = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii'))) if cursor else None
+    limit = request.args.get('limit', app.config['API_PAGE_SIZE'], type=int)
+    limit = max(1, min(limit, app.config['API_MAX_PAGE_SIZE']))
+    fields = request.args.get('fields')
+    fields = {field.strip() for field in fields.split(',') if field.strip()} if fields else None
+    return position, limit, fields
+
+def select_fields(item, fields, key):
+    """Project an item onto the requested fields (its key field is always kept)"""
+    if fields is None:
+        return item
+    return {field: value for field, value in item.items() if field in fields or field == key}
+
 @app.route('/api/projects')
 def list_projects():
-    """List all projects (for debugging)"""
+    """
+    List projects a page at a time, oldest first
+
+    Takes ?limit=, ?cursor= (next_cursor of the previous page) and
+    ?fields=id,filename,...; script text is only sent when `text` is asked
+    for. Each project's generation progress is under 'generation', without
+    frames or analysis (page through /api/projects/<id>/frames for those).
+    """
+    try:
+        position, limit, fields = page_request()
+        after = None
+        if position is not None:
+            created_at, project_id = position
+            after = (str(created_at), str(project_id))
+    except (ValueError, TypeError):
+        return jsonify({'error': 'Invalid cursor'}), 400
+
+    page = store.list_projects(after, limit + 1, with_text=fields is not None and 'text' in fields)
+    has_more = len(page) > limit
+    page = page[:limit]
+
+    items = []
+    for project in page:
+        job = project.pop('job')
+        if job is not None:
+            project['generation'] = dict({field: job.get(field) for field in PROGRESS_FIELDS},
+                                         frame_count=job.get('published_frames', 0))
+        else:
+            project['generation'] = None
+        items.append(select_fields(project, fields, 'id'))
+
     return jsonify({
-        'projects': list(projects.values()),
-        'generation_status': generation_status
+        'projects': items,
+        'next_cursor': encode_cursor([page[-1].get('created_at'), page[-1]['id']]) if has_more else None
+    })
+
+@app.route('/api/projects/<project_id>/frames')
+def list_project_frames(project_id):
+    """
+    List a project's published frames a page at a time, in storyboard order
+
+    Takes the same ?limit=, ?cursor= and ?fields= as /api/projects, e.g.
+    ?fields=frame_id,scene_number to leave out image_url and prompts.
+    """
+    if project_id not in projects:
+        return jsonify({'error': 'Project not found'}), 404
+    try:
+        position, limit, fields = page_request()
+        after = -1 if position is None else int(position)
+    except (ValueError, TypeError):
+        return jsonify({'error': 'Invalid cursor'}), 400
+
+    page = store.list_frames(project_id, after, limit + 1)
+    has_more = len(page) > limit
+    page = page[:limit]
+
+    return jsonify({
+        'project_id': project_id,
+        'frames': [select_fields(frame, fields, 'frame_id') for _, frame in page],
+        'next_cursor': encode_cursor(page[-1][0]) if has_more else None
     })
 
 if __name__ == '__main__':
@@ -424,4 +703,11 @@ if __name__ == '__main__':
     print(f"🌐 Visit: http://localhost:{port}")
     print("📖 Flow: Upload → Generate → Processing → Print")
     
+    # Development server: run the generation workers alongside it (once, in the
+    # reloader child when debugging). Production runs gunicorn -c gunicorn.conf.py.
+    if not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        from utils.worker_pool import WorkerPool
+        worker_pool = WorkerPool().start()
+        atexit.register(worker_pool.stop)
+    
     app.run(debug=debug, host='0.0.0.0', port=port)
\ No newline at end of file
@@ -0,0 +1,32 @@
+"""
+Gunicorn configuration for Script Fury Simple
+Web workers only serve requests and enqueue jobs; the generation worker pool
+is started once by the gunicorn master
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5001')}"
+workers = int(os.getenv('SF_SIMPLE_WEB_WORKERS', '2'))
+# Threaded workers so long-lived /events streams don't block other requests;
+# SF_SIMPLE_SSE_MAX_STREAMS caps how many of these threads streams may hold
+worker_class = 'gthread'
+threads = int(os.getenv('SF_SIMPLE_WEB_THREADS', '16'))
+timeout = 120
+
+_worker_pool = None
+
+
+def when_ready(server):
+    """Start the generation worker processes next to the web workers"""
+    global _worker_pool
+    if os.getenv('SF_SIMPLE_EMBEDDED_WORKERS', 'true').lower() != 'true':
+        return
+    from utils.worker_pool import WorkerPool
+    _worker_pool = WorkerPool().start()
+
+
+def on_exit(server):
+    """Stop the generation workers with the server"""
+    if _worker_pool is not None:
+        _worker_pool.stop()
@@ -332,7 +332,7 @@ FADE OUT.
         data = response.json()
         print(f"   ✅ Projects API accessible")
         print(f"   📊 Projects count: {len(data.get('projects', []))}")
-        print(f"   📊 Generation status count: {len(data.get('generation_status', {}))}")
+        print(f"   📊 More pages: {bool(data.get('next_cursor'))}")
     else:
         print(f"   ❌ Projects API failed: {response.status_code}")
     
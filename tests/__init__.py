@@ -1 +1,7 @@
-# Tests package for Script Fury Simple
\ No newline at end of file
+# Tests package for Script Fury Simple
+
+import os
+import tempfile
+
+# Keep the SQLite project store used by tests away from the real data directory
+os.environ.setdefault('SF_SIMPLE_DATA_DIR', tempfile.mkdtemp(prefix='sf_simple_tests_'))
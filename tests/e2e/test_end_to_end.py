@@ -15,6 +15,7 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
 
 from app import app, projects, generation_status
 from tests.test_config import TestConfig, TestUtilities, MockDataGenerator
+from utils.upload_cache import UploadCache
 
 
 class TestEndToEndWorkflow(unittest.TestCase):
@@ -198,6 +199,22 @@ class TestEndToEndWorkflow(unittest.TestCase):
 
     def test_multiple_file_formats(self):
         """Test workflow with different file formats"""
+        # Uploads are extracted in the background; an empty dedupe cache makes both uploads run it
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        upload_cache = UploadCache(os.path.join(cache_dir.name, 'upload_cache.db'))
+        for target in ('app.get_upload_cache', 'utils.upload_job.get_upload_cache'):
+            cache_patch = patch(target, return_value=upload_cache)
+            cache_patch.start()
+            self.addCleanup(cache_patch.stop)
+        
+        def extracted(project_id):
+            deadline = time.time() + 10
+            while generation_status[project_id]['status'] == 'extracting':
+                self.assertLess(time.time(), deadline)
+                time.sleep(0.02)
+            return generation_status[project_id]['upload']
+        
         # Test with .txt file
         txt_file = self.create_temp_file(self.small_screenplay, '.txt')
         
@@ -206,7 +223,7 @@ class TestEndToEndWorkflow(unittest.TestCase):
                 'file': (f, 'screenplay.txt')
             })
         
-        self.assertEqual(txt_response.status_code, 200)
+        self.assertEqual(txt_response.status_code, 202)
         txt_data = json.loads(txt_response.data)
         self.assertIn('project_id', txt_data)
         
@@ -218,14 +235,14 @@ class TestEndToEndWorkflow(unittest.TestCase):
                 'file': (f, 'screenplay.fountain')
             })
         
-        self.assertEqual(fountain_response.status_code, 200)
+        self.assertEqual(fountain_response.status_code, 202)
         fountain_data = json.loads(fountain_response.data)
         self.assertIn('project_id', fountain_data)
         
         # Both should have similar text lengths
         self.assertAlmostEqual(
-            txt_data['text_length'], 
-            fountain_data['text_length'], 
+            extracted(txt_data['project_id'])['text_length'], 
+            extracted(fountain_data['project_id'])['text_length'], 
             delta=10
         )
 
@@ -3,16 +3,21 @@ Integration tests for the Flask application
 """
 
 import unittest
+import hashlib
+import io
 import json
 import os
 import tempfile
+import time
 import sys
 from unittest.mock import patch, MagicMock
 
 # Add the parent directory to sys.path to import app
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
 
+import app as app_module
 from app import app, projects, generation_status
+from utils.upload_cache import UploadCache
 from utils.text_extractor import extract_text_from_file
 from utils.scene_analyzer import analyze_screenplay
 from utils.storyboard_generator import generate_storyboard_frames
@@ -31,6 +36,14 @@ class TestFlaskApp(unittest.TestCase):
         projects.clear()
         generation_status.clear()
         
+        # Every test starts with an empty upload dedupe cache
+        self.cache_dir = tempfile.TemporaryDirectory()
+        upload_cache = UploadCache(os.path.join(self.cache_dir.name, 'upload_cache.db'))
+        self.cache_patches = [patch(target, return_value=upload_cache)
+                              for target in ('app.get_upload_cache', 'utils.upload_job.get_upload_cache')]
+        for cache_patch in self.cache_patches:
+            cache_patch.start()
+        
         # Create test directory if it doesn't exist
         self.test_dir = os.path.join(os.path.dirname(__file__), '..', 'fixtures')
         os.makedirs(self.test_dir, exist_ok=True)
@@ -68,9 +81,20 @@ FADE OUT.
 
     def tearDown(self):
         """Clean up after each test"""
+        for cache_patch in self.cache_patches:
+            cache_patch.stop()
+        self.cache_dir.cleanup()
         projects.clear()
         generation_status.clear()
 
+    def wait_for_extraction(self, project_id, timeout=10):
+        """Status of an upload once its background extraction has finished"""
+        deadline = time.time() + timeout
+        while generation_status[project_id]['status'] == 'extracting':
+            self.assertLess(time.time(), deadline, 'Extraction did not finish')
+            time.sleep(0.02)
+        return generation_status[project_id]
+
     def test_home_page(self):
         """Test home page loads correctly"""
         response = self.app.get('/')
@@ -98,20 +122,132 @@ FADE OUT.
                     'file': (f, 'test_screenplay.txt')
                 })
             
-            self.assertEqual(response.status_code, 200)
+            # Accepted right away; extraction finishes in the background
+            self.assertEqual(response.status_code, 202)
             data = json.loads(response.data)
             self.assertIn('project_id', data)
-            self.assertIn('text_length', data)
-            self.assertIn('word_count', data)
-            self.assertIn('char_count', data)
+            self.assertEqual(data['status'], 'extracting')
             
             # Check project was created
             project_id = data['project_id']
             self.assertIn(project_id, projects)
             
+            status = self.wait_for_extraction(project_id)
+            self.assertEqual(status['status'], 'extracted')
+            self.assertIn('text_length', status['upload'])
+            self.assertIn('word_count', status['upload'])
+            self.assertIn('char_count', status['upload'])
+            self.assertEqual(projects[project_id]['status'], 'ready')
+            self.assertEqual(projects[project_id]['text'], self.sample_screenplay.strip())
+            
         finally:
             os.unlink(temp_path)
 
+    def test_upload_revised_draft(self):
+        """Test a revised draft links to its previous project and reports changed scenes"""
+        first = self.app.post('/upload', data={'file': (io.BytesIO(self.sample_screenplay.encode()), 'draft1.txt')})
+        previous_id = json.loads(first.data)['project_id']
+        self.wait_for_extraction(previous_id)
+
+        revised = self.sample_screenplay.replace('You know me too well.', 'Not today.')
+        response = self.app.post('/upload', data={
+            'file': (io.BytesIO(revised.encode()), 'draft2.txt'),
+            'revision_of': previous_id
+        })
+        self.assertEqual(response.status_code, 202)
+        data = json.loads(response.data)
+        self.assertEqual(data['revision_of'], previous_id)
+        upload = self.wait_for_extraction(data['project_id'])['upload']
+        self.assertEqual(upload['revision']['unchanged_scenes'], 1)
+        self.assertEqual(upload['revision']['changed_scenes'], 1)
+        self.assertEqual(projects[data['project_id']]['revision_of'], previous_id)
+
+        missing = self.app.post('/upload', data={
+            'file': (io.BytesIO(revised.encode()), 'draft3.txt'),
+            'revision_of': 'no-such-project'
+        })
+        self.assertEqual(missing.status_code, 404)
+
+    def test_upload_pdf_reports_engines(self):
+        """Test PDF uploads report the extraction engine of every page"""
+        from tests.unit.test_text_extractor import make_pdf
+        pdf = make_pdf(['INT. DINER - NIGHT', 'Bob pours coffee.'])
+        response = self.app.post('/upload', data={'file': (io.BytesIO(pdf), 'diner.pdf')})
+
+        self.assertEqual(response.status_code, 202)
+        data = json.loads(response.data)
+        extraction = self.wait_for_extraction(data['project_id'])['upload']['extraction']
+        self.assertEqual(extraction['engines'], {'pypdf2': 2})
+        self.assertEqual([page['page'] for page in extraction['pages']], [1, 2])
+        self.assertEqual(projects[data['project_id']]['text'], 'INT. DINER - NIGHT\nBob pours coffee.')
+
+    def test_upload_same_file_is_deduplicated(self):
+        """Test re-uploading a file reuses its extraction and scene count"""
+        script = self.sample_screenplay.encode()
+        first = json.loads(self.app.post('/upload', data={'file': (io.BytesIO(script), 'a.txt')}).data)
+        self.assertFalse(first['deduplicated'])
+        detected_scenes = self.wait_for_extraction(first['project_id'])['upload']['detected_scenes']
+
+        # A known file is ready straight away, without a background job
+        with patch('utils.upload_job.extract_text_from_file') as mock_extract:
+            response = self.app.post('/upload', data={'file': (io.BytesIO(script), 'b.txt')})
+            mock_extract.assert_not_called()
+        self.assertEqual(response.status_code, 200)
+        second = json.loads(response.data)
+        self.assertTrue(second['deduplicated'])
+        self.assertEqual(second['status'], 'ready')
+        self.assertNotEqual(second['project_id'], first['project_id'])
+        self.assertEqual(second['detected_scenes'], detected_scenes)
+        self.assertEqual(projects[second['project_id']]['text'], projects[first['project_id']]['text'])
+
+    def test_generate_waits_for_extraction(self):
+        """Test generation is refused until the upload's text is extracted, and failures are reported"""
+        projects['extracting-project'] = {'filename': 'slow.pdf', 'text': '', 'word_count': 0, 'status': 'extracting'}
+        response = self.app.post('/generate', data=json.dumps({'project_id': 'extracting-project'}),
+                                 content_type='application/json')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(json.loads(response.data)['status'], 'extracting')
+
+        upload = self.app.post('/upload', data={'file': (io.BytesIO(b'%PDF-1.4 broken'), 'broken.pdf')})
+        status = self.wait_for_extraction(json.loads(upload.data)['project_id'])
+        self.assertEqual(status['status'], 'error')
+        self.assertIn('Could not extract text', status['error'])
+
+    def test_chunked_upload_resumes(self):
+        """Test a chunked upload can be resumed and ends like a regular upload"""
+        data = self.sample_screenplay.encode()
+        with patch.object(app_module.upload_sessions, 'chunk_size', 100):
+            start = self.app.post('/upload/chunks', json={'filename': 'big draft.txt', 'size': len(data)})
+        self.assertEqual(start.status_code, 201)
+        session = json.loads(start.data)
+        upload_id = session['upload_id']
+        chunks = [data[offset:offset + 100] for offset in range(0, len(data), 100)]
+        self.assertEqual(session['total_chunks'], len(chunks))
+
+        # First connection drops after one chunk; a corrupted chunk is refused
+        self.app.put(f'/upload/chunks/{upload_id}/0', data=chunks[0],
+                     headers={'X-Chunk-SHA256': hashlib.sha256(chunks[0]).hexdigest()})
+        corrupted = self.app.put(f'/upload/chunks/{upload_id}/1', data=chunks[1][::-1],
+                                 headers={'X-Chunk-SHA256': hashlib.sha256(chunks[1]).hexdigest()})
+        self.assertEqual(corrupted.status_code, 422)
+        incomplete = self.app.post(f'/upload/chunks/{upload_id}/complete')
+        self.assertEqual(incomplete.status_code, 409)
+
+        # Resume: only the missing chunks are sent
+        resumed = json.loads(self.app.get(f'/upload/chunks/{upload_id}').data)
+        self.assertEqual(resumed['received'], [0])
+        for index in range(1, len(chunks)):
+            response = self.app.put(f'/upload/chunks/{upload_id}/{index}', data=chunks[index])
+            self.assertEqual(response.status_code, 200)
+
+        response = self.app.post(f'/upload/chunks/{upload_id}/complete')
+        self.assertEqual(response.status_code, 202)
+        project_id = json.loads(response.data)['project_id']
+        self.assertEqual(self.wait_for_extraction(project_id)['status'], 'extracted')
+        self.assertEqual(projects[project_id]['filename'], 'big_draft.txt')
+        self.assertEqual(projects[project_id]['text'], self.sample_screenplay.strip())
+        self.assertEqual(self.app.get(f'/upload/chunks/{upload_id}').status_code, 404)
+
     def test_upload_file_no_file(self):
         """Test upload with no file provided"""
         response = self.app.post('/upload', data={})
@@ -293,6 +429,244 @@ FADE OUT.
         self.assertIn('error', data)
         self.assertEqual(data['error'], 'Project not found')
 
+    def test_status_delta_endpoint(self):
+        """Test delta status endpoint sends new frames only and supports ETags"""
+        project_id = 'test-project-delta'
+        generation_status[project_id] = {
+            'status': 'generating',
+            'progress': 50,
+            'frames': [{'frame_id': 'frame_1_1', 'image_url': 'http://example.com/1.jpg'}],
+            'analysis': {'title': 'Test Screenplay'}
+        }
+        
+        response = self.app.get(f'/status/{project_id}/delta')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(len(data['frames']), 1)
+        self.assertEqual(data['analysis']['title'], 'Test Screenplay')
+        
+        # Nothing changed: revalidation returns 304
+        etag = response.headers['ETag']
+        response = self.app.get(f'/status/{project_id}/delta', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        
+        # Only the newly added frame comes back for the previous cursor
+        generation_status.update_status(project_id, frames=[
+            {'frame_id': 'frame_1_1', 'image_url': 'http://example.com/1.jpg'},
+            {'frame_id': 'frame_2_1', 'image_url': 'http://example.com/2.jpg'}
+        ])
+        response = self.app.get(f'/status/{project_id}/delta?cursor={data["cursor"]}')
+        delta = json.loads(response.data)
+        self.assertEqual([f['frame_id'] for f in delta['frames']], ['frame_2_1'])
+        self.assertNotIn('analysis', delta)
+
+    def test_api_lists_pages_with_field_projection(self):
+        """Test /api/projects and its frames endpoint page with cursors and project fields"""
+        for number in range(3):
+            projects[f'api-project-{number}'] = {
+                'id': f'api-project-{number}',
+                'filename': f'test{number}.txt',
+                'text': self.sample_screenplay,
+                'created_at': f'2024-01-0{number + 1}T00:00:00'
+            }
+        generation_status['api-project-0'] = {
+            'status': 'completed',
+            'progress': 100,
+            'frames': [{'frame_id': f'frame_{n}_1', 'scene_number': n, 'image_url': f'/generated/{n}.png'}
+                       for n in range(1, 4)],
+            'analysis': {'title': 'Test Screenplay'}
+        }
+
+        data = json.loads(self.app.get('/api/projects?limit=2').data)
+        self.assertEqual([p['id'] for p in data['projects']], ['api-project-0', 'api-project-1'])
+        self.assertNotIn('text', data['projects'][0])
+        self.assertEqual(data['projects'][0]['generation']['frame_count'], 3)
+        self.assertNotIn('frames', data['projects'][0]['generation'])
+
+        data = json.loads(self.app.get(f'/api/projects?cursor={data["next_cursor"]}&fields=filename,text').data)
+        self.assertEqual(data['projects'], [{'id': 'api-project-2', 'filename': 'test2.txt',
+                                             'text': self.sample_screenplay}])
+        self.assertIsNone(data['next_cursor'])
+
+        response = self.app.get('/api/projects/api-project-0/frames?limit=2&fields=scene_number')
+        data = json.loads(response.data)
+        self.assertEqual(data['frames'], [{'frame_id': 'frame_1_1', 'scene_number': 1},
+                                          {'frame_id': 'frame_2_1', 'scene_number': 2}])
+        data = json.loads(self.app.get(f'/api/projects/api-project-0/frames?cursor={data["next_cursor"]}').data)
+        self.assertEqual([f['image_url'] for f in data['frames']], ['/generated/3.png'])
+        self.assertIsNone(data['next_cursor'])
+
+        self.assertEqual(self.app.get('/api/projects?cursor=bogus').status_code, 400)
+        self.assertEqual(self.app.get('/api/projects/missing/frames').status_code, 404)
+
+    def test_generate_queues_job_and_applies_admission_control(self):
+        """Test /generate only enqueues and returns 429 with Retry-After when the queue is full"""
+        for project_id in ('queued-project-1', 'queued-project-2'):
+            projects[project_id] = {
+                'id': project_id,
+                'filename': 'test.txt',
+                'text': self.sample_screenplay,
+                'created_at': '2024-01-01T00:00:00',
+                'word_count': 50,
+                'char_count': 300,
+                'detected_scenes': 2
+            }
+
+        with patch.dict(app.config, {'MAX_QUEUED_JOBS': 1, 'QUEUE_RETRY_AFTER': 7}):
+            response = self.app.post('/generate',
+                                   data=json.dumps({'project_id': 'queued-project-1', 'style': 'classic'}),
+                                   content_type='application/json')
+            self.assertEqual(response.status_code, 200)
+            data = json.loads(response.data)
+            self.assertEqual(data['status'], 'queued')
+            self.assertEqual(data['queue_position'], 1)
+            self.assertEqual(generation_status['queued-project-1']['queue_position'], 1)
+
+            response = self.app.post('/generate',
+                                   data=json.dumps({'project_id': 'queued-project-2', 'style': 'classic'}),
+                                   content_type='application/json')
+            self.assertEqual(response.status_code, 429)
+            self.assertEqual(response.headers['Retry-After'], '7')
+            self.assertNotIn('queued-project-2', generation_status)
+
+    def test_generate_twice_runs_one_job(self):
+        """Test a second /generate for a queued or running project is refused with 409"""
+        from app import job_queue
+        project_id = 'double-click-project'
+        projects[project_id] = {
+            'id': project_id,
+            'filename': 'test.txt',
+            'text': self.sample_screenplay,
+            'created_at': '2024-01-01T00:00:00',
+            'word_count': 50,
+            'char_count': 300,
+            'detected_scenes': 2
+        }
+        request_body = json.dumps({'project_id': project_id, 'style': 'classic'})
+
+        response = self.app.post('/generate', data=request_body, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        epoch = generation_status.parse_cursor(generation_status.delta(project_id)['cursor'])[0]
+
+        response = self.app.post('/generate', data=request_body, content_type='application/json')
+        self.assertEqual(response.status_code, 409)
+
+        # Still refused once a worker has claimed it, and the job's status is left alone
+        self.assertEqual(job_queue.claim('worker-1')['project_id'], project_id)
+        generation_status.update_status(project_id, status='generating')
+        response = self.app.post('/generate', data=request_body, content_type='application/json')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(job_queue.stats()['running'], 1)
+        self.assertEqual(generation_status.parse_cursor(generation_status.delta(project_id)['cursor'])[0], epoch)
+        job_queue.finish(project_id, 'worker-1')
+
+    def test_cancel_queued_generation(self):
+        """Test cancelling a queued job removes it from the queue and marks it cancelled"""
+        from app import job_queue
+        project_id = 'test-project-cancel'
+        generation_status[project_id] = {'status': 'queued', 'progress': 0, 'frames': [], 'analysis': None}
+        job_queue.enqueue(project_id, 'line art')
+
+        response = self.app.post(f'/cancel/{project_id}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data)['status'], 'cancelled')
+        self.assertEqual(generation_status[project_id]['status'], 'cancelled')
+        self.assertIsNone(job_queue.position(project_id))
+
+        # Finished jobs can't be cancelled again
+        response = self.app.post(f'/cancel/{project_id}')
+        self.assertEqual(response.status_code, 409)
+
+    def test_cancel_invalid_project(self):
+        """Test cancelling an unknown job"""
+        response = self.app.post('/cancel/invalid-id')
+        self.assertEqual(response.status_code, 404)
+
+    def test_status_delta_endpoint_invalid_project(self):
+        """Test delta status endpoint with invalid project ID"""
+        response = self.app.get('/status/invalid-id/delta')
+        self.assertEqual(response.status_code, 404)
+
+    def test_events_stream_completed_job(self):
+        """Test SSE stream replays frames and closes once the job is done"""
+        project_id = 'test-project-events'
+        generation_status[project_id] = {
+            'status': 'completed',
+            'progress': 100,
+            'current_step': 'Generation complete! Created 2 frames.',
+            'current_step_num': 3,
+            'frames': [
+                {'frame_id': 'frame_1_1', 'image_url': 'http://example.com/1.jpg'},
+                {'frame_id': 'frame_2_1', 'image_url': 'http://example.com/2.jpg'}
+            ],
+            'analysis': {'title': 'Test Screenplay'}
+        }
+        
+        response = self.app.get(f'/events/{project_id}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        
+        events = []
+        for block in response.get_data(as_text=True).split('\n\n'):
+            fields = dict(line.split(': ', 1) for line in block.splitlines() if line.startswith(('event', 'data')))
+            if 'event' in fields:
+                events.append((fields['event'], json.loads(fields['data'])))
+        
+        names = [name for name, _ in events]
+        self.assertEqual(names, ['analysis', 'frame', 'frame', 'step', 'progress', 'done'])
+        self.assertEqual(events[2][1]['index'], 1)
+        self.assertEqual(events[2][1]['frame']['frame_id'], 'frame_2_1')
+        self.assertEqual(events[-1][1]['status'], 'completed')
+
+    def test_events_streams_capped_per_worker(self):
+        """Test streams past the cap get a 503 pointing at the delta endpoint, and closed streams free their slot"""
+        project_id = 'test-project-events-cap'
+        generation_status[project_id] = {'status': 'completed', 'progress': 100, 'frames': [], 'analysis': None}
+        
+        with patch.object(app_module, 'sse_streams', app_module.threading.BoundedSemaphore(1)) as slots:
+            for _ in range(2):
+                response = self.app.get(f'/events/{project_id}')
+                self.assertEqual(response.status_code, 200)
+                response.get_data()
+                response.close()
+            
+            slots.acquire()
+            response = self.app.get(f'/events/{project_id}')
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response.get_json()['fallback'], f'/status/{project_id}/delta')
+            self.assertIn('Retry-After', response.headers)
+    
+    def test_events_stream_invalid_project(self):
+        """Test SSE stream with invalid project ID"""
+        response = self.app.get('/events/invalid-id')
+        self.assertEqual(response.status_code, 404)
+
+    def test_generated_image_served_immutable_with_ranges(self):
+        """Test stored images are served with immutable caching and range support"""
+        from utils import image_store
+        
+        store_dir = tempfile.mkdtemp()
+        try:
+            with patch.object(image_store, 'IMAGE_STORE_DIR', store_dir):
+                url = image_store.save_image_bytes(b'0123456789' * 10)
+                
+                response = self.app.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.mimetype, 'image/png')
+                self.assertIn('immutable', response.headers['Cache-Control'])
+                response.close()
+                
+                response = self.app.get(url, headers={'Range': 'bytes=0-9'})
+                self.assertEqual(response.status_code, 206)
+                self.assertEqual(response.data, b'0123456789')
+                response.close()
+                
+                response = self.app.get('/generated/' + '0' * 64 + '.png')
+                self.assertEqual(response.status_code, 404)
+        finally:
+            import shutil
+            shutil.rmtree(store_dir, ignore_errors=True)
+
     def test_print_page_success(self):
         """Test print page loads correctly with valid project"""
         # Create a project with generation status
@@ -0,0 +1,80 @@
+"""
+Unit tests for character_index.py
+"""
+
+import unittest
+import os
+import sys
+
+# Add the parent directory to sys.path to import utils
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from utils.character_index import normalize_name, index_characters, find_character
+from utils.scene_analyzer import extract_character_context
+
+SCRIPT = """INT. DINER - NIGHT
+
+MARY JANE, a tall woman with red hair, pours coffee.
+
+MARY JANE
+More?
+
+BOB (V.O.)
+Always.
+
+EXT. PARKING LOT - NIGHT
+
+Bob waits by the truck. Mary Jane watches from the window.
+
+BOB (CONT'D)
+She's not coming.
+
+BOBBY
+(O.S.)
+Who isn't?"""
+
+
+class TestCharacterIndex(unittest.TestCase):
+    """Test the inverted character index and the lookups built on it"""
+
+    def test_normalize_name_folds_variants(self):
+        """Test cue extensions and case variants map to one name"""
+        for variant in ("BOB (V.O.)", "Bob (CONT'D)", "BOB CONT'D", "@Bob", "BOB (O.S.) (CONT’D)", " bob "):
+            self.assertEqual(normalize_name(variant), 'BOB')
+        self.assertEqual(normalize_name('MARY JANE (V.O.)'), 'MARY JANE')
+
+    def test_lines_and_scenes(self):
+        """Test mentions are found by whole name, not by substring"""
+        index = index_characters(SCRIPT)
+
+        self.assertEqual(index.lines_for('Bob'), [7, 12, 14])
+        self.assertEqual(index.scenes_for('BOB (V.O.)'), [0, 1])
+        self.assertEqual(index.lines_for('MARY JANE'), [2, 4, 12])
+        self.assertEqual(index.lines_for('JANE MARY'), [])
+        self.assertEqual(index.scenes_for('NOBODY'), [])
+
+    def test_scene_characters_come_from_cues(self):
+        """Test per-scene speaking characters with variants folded together"""
+        index = index_characters(SCRIPT)
+
+        self.assertEqual(index.scene_characters(0), ['MARY JANE', 'BOB'])
+        self.assertEqual(index.scene_characters(1), ['BOB', 'BOBBY'])
+        self.assertEqual(index.speaking_characters(), {'MARY JANE': 1, 'BOB': 2, 'BOBBY': 1})
+        self.assertIs(index_characters(SCRIPT), index)
+
+    def test_context_lookup(self):
+        """Test the most descriptive nearby line is returned"""
+        self.assertEqual(extract_character_context(SCRIPT, 'Mary Jane'),
+                         'Character: MARY JANE, a tall woman with red hair, pours coffee....')
+        self.assertEqual(extract_character_context(SCRIPT, 'ZED'), 'Character appearing in screenplay: ZED')
+
+    def test_find_character(self):
+        """Test database lookups accept name variants"""
+        database = {'BOB': {'clothing': 'denim'}, 'Mary Jane': {'clothing': 'apron'}}
+        self.assertEqual(find_character(database, 'BOB (V.O.)'), {'clothing': 'denim'})
+        self.assertEqual(find_character(database, 'MARY JANE'), {'clothing': 'apron'})
+        self.assertIsNone(find_character(database, 'BOBBY'))
+
+
+if __name__ == '__main__':
+    unittest.main()
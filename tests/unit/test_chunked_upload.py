@@ -0,0 +1,120 @@
+"""
+Unit tests for chunked_upload.py
+"""
+
+import unittest
+import hashlib
+import io
+import os
+import sys
+import tempfile
+
+# Add the parent directory to sys.path to import utils
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from utils.chunked_upload import UploadSessions, ChunkedUploadError
+
+DATA = b'INT. DINER - NIGHT\n\nBob pours coffee.\n'
+
+
+class TestChunkedUpload(unittest.TestCase):
+    """Test cases for resumable chunked upload sessions"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.sessions = UploadSessions(os.path.join(self.temp_dir.name, 'parts'),
+                                       os.path.join(self.temp_dir.name, 'sessions.db'),
+                                       chunk_size=16, max_bytes=1024)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def chunk(self, index):
+        return DATA[index * 16:(index + 1) * 16]
+
+    def test_chunks_assemble_in_any_order(self):
+        """Test chunks sent out of order (and resent) assemble into the original file"""
+        session = self.sessions.create('diner.txt', len(DATA))
+        self.assertEqual(session['total_chunks'], 3)
+
+        for index in (2, 0, 2, 1):
+            checksum = hashlib.sha256(self.chunk(index)).hexdigest()
+            self.sessions.write_chunk(session['upload_id'], index, io.BytesIO(self.chunk(index)), checksum)
+        self.assertEqual(self.sessions.get(session['upload_id'])['received'], [0, 1, 2])
+
+        completed, part_path, file_hash = self.sessions.complete(session['upload_id'])
+        self.assertEqual(completed['filename'], 'diner.txt')
+        self.assertEqual(file_hash, hashlib.sha256(DATA).hexdigest())
+        with open(part_path, 'rb') as part:
+            self.assertEqual(part.read(), DATA)
+
+        self.sessions.discard(session['upload_id'])
+        self.assertIsNone(self.sessions.get(session['upload_id']))
+        self.assertFalse(os.path.exists(part_path))
+
+    def test_missing_chunks_block_completion(self):
+        """Test completing reports the chunks still to send, so the client can resume"""
+        session = self.sessions.create('diner.txt', len(DATA))
+        self.sessions.write_chunk(session['upload_id'], 1, io.BytesIO(self.chunk(1)))
+
+        with self.assertRaises(ChunkedUploadError) as context:
+            self.sessions.complete(session['upload_id'])
+        self.assertEqual(context.exception.status_code, 409)
+        self.assertEqual(context.exception.details['missing'], [0, 2])
+
+    def test_bad_chunks_are_not_recorded(self):
+        """Test checksum mismatches and wrong lengths are rejected"""
+        session = self.sessions.create('diner.txt', len(DATA))
+        upload_id = session['upload_id']
+
+        cases = [
+            (0, self.chunk(0), 'f' * 64, 422),
+            (0, self.chunk(0)[:-1], None, 400),
+            (0, self.chunk(0) + b'x', None, 400),
+            (3, self.chunk(0), None, 400)
+        ]
+        for index, body, checksum, status_code in cases:
+            with self.assertRaises(ChunkedUploadError) as context:
+                self.sessions.write_chunk(upload_id, index, io.BytesIO(body), checksum)
+            self.assertEqual(context.exception.status_code, status_code)
+        self.assertEqual(self.sessions.get(upload_id)['received'], [])
+
+    def test_bad_resend_keeps_received_chunk(self):
+        """Test a truncated or corrupt resend of a received chunk can't corrupt the completed file"""
+        session = self.sessions.create('diner.txt', len(DATA))
+        upload_id = session['upload_id']
+        for index in range(3):
+            self.sessions.write_chunk(upload_id, index, io.BytesIO(self.chunk(index)))
+
+        corrupt = b'X' * 16
+        resends = [
+            (self.chunk(1)[:8], None, 400),
+            (corrupt, hashlib.sha256(self.chunk(1)).hexdigest(), 422),
+            (corrupt, None, 409)
+        ]
+        for body, checksum, status_code in resends:
+            with self.assertRaises(ChunkedUploadError) as context:
+                self.sessions.write_chunk(upload_id, 1, io.BytesIO(body), checksum)
+            self.assertEqual(context.exception.status_code, status_code)
+
+        _, part_path, file_hash = self.sessions.complete(upload_id)
+        self.assertEqual(file_hash, hashlib.sha256(DATA).hexdigest())
+        with open(part_path, 'rb') as part:
+            self.assertEqual(part.read(), DATA)
+
+    def test_session_limits(self):
+        """Test size limits, unknown sessions and expiry"""
+        with self.assertRaises(ChunkedUploadError) as context:
+            self.sessions.create('huge.pdf', 2048)
+        self.assertEqual(context.exception.status_code, 413)
+        with self.assertRaises(ChunkedUploadError) as context:
+            self.sessions.write_chunk('unknown', 0, io.BytesIO(b''))
+        self.assertEqual(context.exception.status_code, 404)
+
+        session = self.sessions.create('diner.txt', len(DATA))
+        self.assertEqual(self.sessions.purge_expired(ttl_seconds=-1), 1)
+        self.assertIsNone(self.sessions.get(session['upload_id']))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,147 @@
+"""
+Unit tests for fountain_parser.py
+"""
+
+import unittest
+import os
+import sys
+import tempfile
+
+# Add the parent directory to sys.path to import utils
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from utils.fountain_parser import (
+    tokenize, parse_fountain, split_scenes, character_cues, title_page,
+    SCENE_HEADING, ACTION, CHARACTER, PARENTHETICAL, DIALOGUE, TRANSITION, TITLE_PAGE
+)
+from utils.scene_analyzer import extract_scenes, basic_analyze_screenplay, apply_fountain_structure
+
+SCRIPT = """Title: Big Fish
+Credit: written by
+Author: John August
+
+EXT. RIVER - DAY #1#
+
+A river. We're underwater, watching a fish. [[Check the fish]]
+
+WILL (V.O.)
+(softly)
+There are some fish
+that cannot be caught.
+
+EDWARD
+Will.
+
+WILL
+Dad.
+
+CUT TO:
+
+/* A cut scene
+that spans lines */
+.FLASHBACK
+
+@McCLOUD
+Hey.
+
+INT. BEDROOM - NIGHT
+
+Edward sleeps.
+
+WILL
+Goodnight.
+"""
+
+
+class TestFountainParser(unittest.TestCase):
+    """Test cases for the streaming Fountain tokenizer"""
+
+    def setUp(self):
+        self.elements = parse_fountain(SCRIPT)
+
+    def test_element_types(self):
+        """Test every element type is recognised in order"""
+        types = [element.type for element in self.elements]
+        self.assertEqual(types, [
+            TITLE_PAGE, TITLE_PAGE, TITLE_PAGE,
+            SCENE_HEADING, ACTION,
+            CHARACTER, PARENTHETICAL, DIALOGUE, DIALOGUE,
+            CHARACTER, DIALOGUE,
+            CHARACTER, DIALOGUE,
+            TRANSITION,
+            SCENE_HEADING, CHARACTER, DIALOGUE,
+            SCENE_HEADING, ACTION, CHARACTER, DIALOGUE
+        ])
+
+    def test_text_is_normalised(self):
+        """Test scene numbers, notes, forcing marks and extensions are stripped"""
+        texts = {element.type: [] for element in self.elements}
+        for element in self.elements:
+            texts[element.type].append(element.text)
+
+        self.assertEqual(texts[SCENE_HEADING], ['EXT. RIVER - DAY', 'FLASHBACK', 'INT. BEDROOM - NIGHT'])
+        self.assertEqual(texts[ACTION][0], "A river. We're underwater, watching a fish.")
+        self.assertEqual(texts[CHARACTER], ['WILL', 'EDWARD', 'WILL', 'McCLOUD', 'WILL'])
+        self.assertEqual(title_page(self.elements)['title'], 'Big Fish')
+
+    def test_line_offsets(self):
+        """Test elements point back at their source lines"""
+        lines = SCRIPT.split('\n')
+        for element in self.elements:
+            self.assertIn(element.text.split(' #')[0].lstrip('.@'), lines[element.line])
+            self.assertEqual(SCRIPT[element.offset:].split('\n')[0], lines[element.line])
+
+    def test_streams_from_file(self):
+        """Test tokenizing an open file gives the same elements and offsets"""
+        with tempfile.NamedTemporaryFile('w', suffix='.fountain', delete=False) as handle:
+            handle.write(SCRIPT)
+        try:
+            with open(handle.name) as source:
+                self.assertEqual(list(tokenize(source)), self.elements)
+        finally:
+            os.remove(handle.name)
+
+    def test_scenes_and_cues(self):
+        """Test grouping by scene and counting character cues"""
+        scenes = split_scenes(self.elements)
+        self.assertEqual(len(scenes), 3)
+        self.assertEqual(character_cues(self.elements), {'WILL': 3, 'EDWARD': 1, 'McCLOUD': 1})
+
+    def test_no_title_page(self):
+        """Test a script starting with FADE IN: has no title page"""
+        elements = parse_fountain("FADE IN:\n\nEXT. PARK - DAY\n\nBirds.")
+        self.assertEqual([element.type for element in elements], [ACTION, SCENE_HEADING, ACTION])
+
+    def test_extract_scenes_from_elements(self):
+        """Test scenes built from elements carry exact characters and dialogue"""
+        scenes = extract_scenes(SCRIPT, 10, self.elements)
+
+        self.assertEqual([scene['location'] for scene in scenes], ['RIVER', 'FLASHBACK', 'BEDROOM'])
+        self.assertEqual(scenes[0]['characters'], ['WILL', 'EDWARD'])
+        self.assertEqual(scenes[0]['dialogue'][0], 'WILL: There are some fish that cannot be caught.')
+        self.assertEqual(scenes[2]['time_of_day'], 'NIGHT')
+
+    def test_fallback_analysis_uses_cues(self):
+        """Test basic analysis of a Fountain script lists its speaking characters"""
+        analysis = basic_analyze_screenplay(SCRIPT, 10, self.elements)
+        self.assertEqual(analysis['title'], 'Big Fish')
+        self.assertEqual(list(analysis['characters']), ['WILL', 'EDWARD', 'McCLOUD'])
+        self.assertEqual(analysis['total_scenes'], 3)
+
+    def test_apply_structure_to_ai_analysis(self):
+        """Test AI-selected scenes take characters and dialogue from the source"""
+        analysis = {
+            'title': 'Untitled',
+            'scenes': [{'scene_number': 3, 'slug_line': 'INT. BEDROOM - NIGHT', 'characters': ['GHOST']}],
+            'characters': {'WILL': {'description': 'thirties'}}
+        }
+        apply_fountain_structure(analysis, self.elements)
+
+        self.assertEqual(analysis['scenes'][0]['characters'], ['WILL'])
+        self.assertEqual(analysis['characters']['WILL'], {'description': 'thirties'})
+        self.assertIn('EDWARD', analysis['characters'])
+        self.assertEqual(analysis['title'], 'Big Fish')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+"""
+Unit tests for generation_job.py
+"""
+
+import unittest
+import os
+import sys
+from unittest.mock import patch
+
+# Add the parent directory to sys.path to import utils
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from utils.generation_job import run_generation_job
+from utils.openai_runtime import CancelScope
+from utils.status_tracker import StatusTracker
+
+
+class TestGenerationJob(unittest.TestCase):
+    """Test cases for running and cancelling generation jobs"""
+
+    def setUp(self):
+        """Set up a job with saved analysis for three frames"""
+        self.statuses = StatusTracker()
+        self.project = {'id': 'project-1', 'text': 'INT. ROOM - DAY', 'word_count': 3, 'detected_scenes': 1}
+        self.statuses['project-1'] = {
+            'status': 'queued',
+            'frames': [],
+            'analysis': {
+                'total_scenes': 1,
+                'characters': [],
+                'scenes': [{'scene_number': 1, 'frames_needed': 3, 'location': 'ROOM'}]
+            }
+        }
+
+    @staticmethod
+    def fake_frame(scene, frame_number, prompt_style, analysis, use_cache=True):
+        return {'frame_id': f"frame_{scene['scene_number']}_{frame_number}"}
+
+    def test_job_completes(self):
+        """Test a job renders every frame in order"""
+        with patch('utils.generation_job.generate_ai_frame_sync', side_effect=self.fake_frame):
+            run_generation_job('project-1', self.project, 'line art', self.statuses, frame_concurrency=2)
+
+        status = self.statuses['project-1']
+        self.assertEqual(status['status'], 'completed')
+        self.assertEqual([frame['frame_id'] for frame in status['frames']],
+                         ['frame_1_1', 'frame_1_2', 'frame_1_3'])
+
+    def test_cancel_stops_remaining_frames(self):
+        """Test cancelling the scope stops queued frames and marks the job cancelled"""
+        scope = CancelScope()
+        rendered = []
+
+        def cancel_after_first(scene, frame_number, prompt_style, analysis, use_cache=True):
+            rendered.append(frame_number)
+            scope.cancel()
+            return self.fake_frame(scene, frame_number, prompt_style, analysis)
+
+        with patch('utils.generation_job.generate_ai_frame_sync', side_effect=cancel_after_first):
+            run_generation_job('project-1', self.project, 'line art', self.statuses,
+                               frame_concurrency=1, scope=scope)
+
+        self.assertEqual(rendered, [1])
+        self.assertEqual(self.statuses['project-1']['status'], 'cancelled')
+
+    def test_cancelled_job_does_not_start(self):
+        """Test a job cancelled before a worker picked it up never renders"""
+        self.statuses.update_status('project-1', status='cancelled')
+
+        with patch('utils.generation_job.generate_ai_frame_sync') as mock_frame:
+            run_generation_job('project-1', self.project, 'line art', self.statuses)
+            mock_frame.assert_not_called()
+
+    def test_revised_draft_reuses_unchanged_scenes(self):
+        """Test a revised draft only analyzes and renders its changed scenes"""
+        old_text = "INT. ROOM - DAY\n\nAnna waits.\n\nEXT. ROAD - NIGHT\n\nA car passes."
+        new_text = "INT. ROOM - DAY\n\nAnna waits.\n\nEXT. ROAD - NIGHT\n\nA truck explodes."
+        self.statuses['old'] = {
+            'status': 'completed',
+            'style': 'classic',
+            'frames': [{'frame_id': 'frame_1_1', 'scene_number': 1, 'image_url': '/generated/room.png'}],
+            'analysis': {'characters': {}, 'scenes': [
+                {'scene_number': 1, 'slug_line': 'INT. ROOM - DAY', 'frames_needed': 1},
+                {'scene_number': 2, 'slug_line': 'EXT. ROAD - NIGHT', 'frames_needed': 1}
+            ]}
+        }
+        self.statuses['new'] = {'status': 'queued', 'style': 'classic', 'frames': [], 'analysis': None}
+        project = {'id': 'new', 'text': new_text, 'word_count': 12, 'detected_scenes': 2}
+        analyzed = []
+
+        def fake_analysis(text, scene_count, elements=None):
+            analyzed.append(text)
+            return {'characters': {}, 'scenes': [{'scene_number': 1, 'slug_line': 'EXT. ROAD - NIGHT'}]}
+
+        with patch('utils.generation_job.fast_ai_analyze_screenplay', side_effect=fake_analysis), \
+             patch('utils.generation_job.generate_ai_frame_sync', side_effect=self.fake_frame) as mock_frame:
+            run_generation_job('new', project, 'line art', self.statuses,
+                               previous_project={'id': 'old', 'text': old_text})
+
+        self.assertEqual(analyzed, ["EXT. ROAD - NIGHT\n\nA truck explodes."])
+        self.assertEqual(mock_frame.call_count, 1)
+        status = self.statuses['new']
+        self.assertEqual(status['status'], 'completed')
+        self.assertEqual(status['frames'][0]['image_url'], '/generated/room.png')
+        self.assertEqual([frame['frame_id'] for frame in status['frames']], ['frame_1_1', 'frame_2_1'])
+
+
+if __name__ == '__main__':
+    unittest.main()
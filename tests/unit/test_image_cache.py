@@ -0,0 +1,103 @@
+"""
+Unit tests for image_cache.py
+"""
+
+import unittest
+import asyncio
+import base64
+import os
+import sys
+import tempfile
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+# Add the parent directory to sys.path to import utils
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from utils.image_cache import ImageCache, render_key
+from utils.image_store import save_image_bytes
+from utils.storyboard_generator import generate_ai_frame
+
+PNG_BYTES = b'\x89PNG\r\n\x1a\n' + b'frame'
+
+
+class TestImageCache(unittest.TestCase):
+    """Test cases for the frame image render cache"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.store_patch = patch('utils.image_store.IMAGE_STORE_DIR', os.path.join(self.temp_dir.name, 'images'))
+        self.store_patch.start()
+        self.cache = ImageCache(os.path.join(self.temp_dir.name, 'image_cache.db'))
+
+    def tearDown(self):
+        self.store_patch.stop()
+        self.temp_dir.cleanup()
+
+    def test_key_covers_render_parameters(self):
+        """Test model, size, quality and prompt all change the key"""
+        base = ('gpt-image-1', '1024x1024', 'medium', 'A street at dawn')
+        self.assertEqual(render_key(*base), render_key(*base))
+        for index, value in enumerate(('dall-e-3', '512x512', 'high', 'A street at dusk')):
+            changed = list(base)
+            changed[index] = value
+            self.assertNotEqual(render_key(*base), render_key(*changed))
+
+    def test_hit_and_miss_metrics(self):
+        """Test stored renders are found again and hits/misses are counted"""
+        params = ('gpt-image-1', '1024x1024', 'medium', 'A street at dawn')
+        self.assertIsNone(self.cache.get(*params))
+
+        image_url = save_image_bytes(PNG_BYTES)
+        self.cache.put(*params, image_url)
+        self.assertEqual(self.cache.get(*params), image_url)
+
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['hit_rate']), (1, 1, 0.5))
+
+    def test_missing_image_file_is_a_miss(self):
+        """Test a cached render whose file was removed is dropped"""
+        params = ('gpt-image-1', '1024x1024', 'medium', 'A street at dawn')
+        image_url = save_image_bytes(PNG_BYTES)
+        self.cache.put(*params, image_url)
+        digest = image_url.rsplit('/', 1)[-1].split('.')[0]
+        os.remove(os.path.join(self.temp_dir.name, 'images', digest[:2], f'{digest}.png'))
+
+        self.assertIsNone(self.cache.get(*params))
+        self.assertEqual(self.cache.stats()['entries'], 0)
+
+    def test_remote_urls_are_not_cached(self):
+        """Test API-hosted URLs (which expire) are never cached"""
+        params = ('dall-e-3', '1024x1024', 'medium', 'A street at dawn')
+        self.cache.put(*params, 'https://example.com/image.png')
+        self.assertEqual(self.cache.stats()['entries'], 0)
+
+    def test_generate_ai_frame_reuses_and_bypasses_cache(self):
+        """Test identical frames skip the image API unless a fresh take is requested"""
+        scene = {'scene_number': 1, 'location': 'STREET', 'description': 'A street at dawn'}
+        image_response = SimpleNamespace(data=[SimpleNamespace(b64_json=base64.b64encode(PNG_BYTES).decode(), url=None)])
+        mock_generate = AsyncMock(return_value=image_response)
+
+        def render(use_cache=True):
+            return asyncio.run(generate_ai_frame(None, scene, 1, 'line art', {}, use_cache))
+
+        with patch('utils.storyboard_generator.generate_image', mock_generate), \
+             patch('utils.storyboard_generator.get_image_cache', return_value=self.cache), \
+             patch('utils.storyboard_generator.IMAGE_CACHE_ENABLED', True), \
+             patch('utils.prompt_sanitizer.sanitize_prompt_for_storyboard',
+                   side_effect=lambda prompt: (prompt, [], False)):
+            first = render()
+            second = render()
+            fresh = render(use_cache=False)
+
+        self.assertEqual(mock_generate.await_count, 2)
+        self.assertFalse(first['image_cached'])
+        self.assertTrue(second['image_cached'])
+        self.assertEqual(second['cost'], 0.0)
+        self.assertFalse(fresh['image_cached'])
+        self.assertEqual(second['image_url'], first['image_url'])
+        self.assertEqual(self.cache.stats()['bypassed'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
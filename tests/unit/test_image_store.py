@@ -0,0 +1,74 @@
+"""
+Unit tests for image_store.py
+"""
+
+import unittest
+import base64
+import hashlib
+import os
+import sys
+import shutil
+import tempfile
+from unittest.mock import patch
+
+# Add the parent directory to sys.path to import utils
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from utils import image_store
+from utils.image_store import save_image_bytes, save_b64_image, resolve_image_path, get_image_mimetype
+
+
+class TestImageStore(unittest.TestCase):
+    """Test cases for the content-addressed image store"""
+
+    def setUp(self):
+        """Point the store at a temporary directory"""
+        self.store_dir = tempfile.mkdtemp()
+        self.patcher = patch.object(image_store, 'IMAGE_STORE_DIR', self.store_dir)
+        self.patcher.start()
+        self.image_bytes = b'\x89PNG\r\n\x1a\nfake image data'
+
+    def tearDown(self):
+        """Remove the temporary store"""
+        self.patcher.stop()
+        shutil.rmtree(self.store_dir, ignore_errors=True)
+
+    def test_save_returns_hash_url(self):
+        """Test stored images are addressed by their SHA-256"""
+        digest = hashlib.sha256(self.image_bytes).hexdigest()
+        url = save_image_bytes(self.image_bytes)
+
+        self.assertEqual(url, f"/generated/{digest}.png")
+        path = resolve_image_path(f"{digest}.png")
+        self.assertTrue(path.startswith(self.store_dir))
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), self.image_bytes)
+
+    def test_identical_images_share_one_file(self):
+        """Test saving the same bytes twice reuses the file"""
+        url1 = save_image_bytes(self.image_bytes)
+        url2 = save_b64_image(base64.b64encode(self.image_bytes).decode())
+
+        self.assertEqual(url1, url2)
+        stored = [name for _, _, names in os.walk(self.store_dir) for name in names]
+        self.assertEqual(len(stored), 1)
+
+    def test_resolve_rejects_bad_names(self):
+        """Test only well-formed hash names resolve"""
+        self.assertIsNone(resolve_image_path('../../app.py'))
+        self.assertIsNone(resolve_image_path('abc.png'))
+        self.assertIsNone(resolve_image_path('0' * 64 + '.png'))
+
+    def test_unsupported_extension(self):
+        """Test unknown image types are rejected"""
+        with self.assertRaises(ValueError):
+            save_image_bytes(self.image_bytes, 'exe')
+
+    def test_mimetype(self):
+        """Test mimetypes follow the extension"""
+        self.assertEqual(get_image_mimetype('a.png'), 'image/png')
+        self.assertEqual(get_image_mimetype('a.jpg'), 'image/jpeg')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+"""
+Unit tests for job_queue.py
+"""
+
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+
+# Add the parent directory to sys.path to import utils
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from utils.project_store import ProjectStore
+from utils.job_queue import JobQueue
+from utils.status_tracker import StatusTracker
+from utils.worker_pool import refresh_queue_positions
+
+
+class TestJobQueue(unittest.TestCase):
+    """Test cases for the SQLite-backed generation queue"""
+
+    def setUp(self):
+        """Create a queue over a temporary database"""
+        self.data_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.data_dir, 'test.db')
+        self.store = ProjectStore(self.db_path)
+        self.queue = JobQueue(self.store)
+
+    def tearDown(self):
+        """Remove the temporary directory"""
+        shutil.rmtree(self.data_dir, ignore_errors=True)
+
+    def test_enqueue_returns_positions(self):
+        """Test jobs get increasing positions and are claimed in FIFO order"""
+        self.assertEqual(self.queue.enqueue('a', 'style'), 1)
+        self.assertEqual(self.queue.enqueue('b', 'style'), 2)
+
+        job = self.queue.claim('worker-1')
+        self.assertEqual(job, {'project_id': 'a', 'prompt_style': 'style'})
+        self.assertEqual(self.queue.position('a'), 0)
+        self.assertEqual(self.queue.position('b'), 1)
+        self.assertEqual(self.queue.stats(), {'queued': 1, 'running': 1})
+
+        self.queue.finish('a', 'worker-1')
+        self.assertIsNone(self.queue.position('a'))
+
+    def test_admission_control(self):
+        """Test a full queue rejects new jobs"""
+        self.assertEqual(self.queue.enqueue('a', 'style', max_queued=1), 1)
+        self.assertIsNone(self.queue.enqueue('b', 'style', max_queued=1))
+        self.assertEqual(self.queue.queued_ids(), ['a'])
+
+        # Running jobs don't count against the limit
+        self.queue.claim('worker-1')
+        self.assertEqual(self.queue.enqueue('b', 'style', max_queued=1), 1)
+
+    def test_enqueue_leaves_running_job_alone(self):
+        """Test re-enqueueing a running project neither removes its claim nor queues a second run"""
+        self.queue.enqueue('a', 'style')
+        self.queue.claim('worker-1')
+
+        self.assertEqual(self.queue.enqueue('a', 'style'), 0)
+        self.assertEqual(self.queue.stats(), {'queued': 0, 'running': 1})
+        self.assertIsNone(self.queue.claim('worker-2'))
+
+    def test_claim_is_exclusive_across_connections(self):
+        """Test two workers never claim the same job"""
+        other = JobQueue(ProjectStore(self.db_path))
+        self.queue.enqueue('a', 'style')
+
+        self.assertIsNotNone(self.queue.claim('worker-1'))
+        self.assertIsNone(other.claim('worker-2'))
+
+    def test_requeue_stale_claims(self):
+        """Test jobs of workers that stopped heartbeating go back in the queue"""
+        self.queue.enqueue('a', 'style')
+        self.queue.claim('worker-1')
+
+        self.assertEqual(self.queue.requeue_stale(stale_seconds=60), 0)
+        self.assertEqual(self.queue.requeue_stale(stale_seconds=-1), 1)
+        self.assertEqual(self.queue.claim('worker-2')['project_id'], 'a')
+
+        # The old worker finishing late must not remove the new claim
+        self.queue.finish('a', 'worker-1')
+        self.assertEqual(self.queue.position('a'), 0)
+
+    def test_deleting_job_dequeues_it(self):
+        """Test removing a job's status also removes it from the queue"""
+        statuses = StatusTracker(self.store)
+        statuses['a'] = {'status': 'queued', 'frames': [], 'analysis': None}
+        self.queue.enqueue('a', 'style')
+
+        del statuses['a']
+        self.assertEqual(self.queue.queued_ids(), [])
+
+    def test_refresh_queue_positions(self):
+        """Test waiting jobs are told their new position"""
+        statuses = StatusTracker(self.store)
+        for project_id in ('a', 'b'):
+            statuses[project_id] = {'status': 'queued', 'frames': [], 'analysis': None}
+            self.queue.enqueue(project_id, 'style')
+
+        self.queue.claim('worker-1')
+        refresh_queue_positions(self.queue, statuses)
+        self.assertEqual(statuses['b']['queue_position'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+"""
+Unit tests for llm_cache.py
+"""
+
+import unittest
+import asyncio
+import os
+import sys
+import tempfile
+from unittest.mock import AsyncMock, MagicMock, patch
+from openai.types.chat import ChatCompletion
+
+# Add the parent directory to sys.path to import utils
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from utils.llm_cache import LLMCache, cache_key
+from utils.rate_limiter import chat_completion
+
+
+def make_completion(content, model='gpt-4o-mini'):
+    """Build a real ChatCompletion like the API returns"""
+    return ChatCompletion(
+        id='chatcmpl-test',
+        choices=[{'index': 0, 'finish_reason': 'stop', 'message': {'role': 'assistant', 'content': content}}],
+        created=0,
+        model=model,
+        object='chat.completion'
+    )
+
+
+class TestLLMCache(unittest.TestCase):
+    """Test cases for the persistent LLM response cache"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, 'llm_cache.db')
+        self.cache = LLMCache(self.db_path)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_key_covers_model_messages_and_format(self):
+        """Test any change to the request changes the key"""
+        request = {'model': 'gpt-4o', 'messages': [{'role': 'user', 'content': 'hi'}]}
+        self.assertEqual(cache_key(request), cache_key(dict(reversed(list(request.items())))))
+        self.assertNotEqual(cache_key(request), cache_key({**request, 'model': 'gpt-4o-mini'}))
+        self.assertNotEqual(cache_key(request), cache_key({**request, 'response_format': {'type': 'json_object'}}))
+        self.assertNotEqual(cache_key(request), cache_key({**request, 'messages': [{'role': 'user', 'content': 'hey'}]}))
+
+    def test_roundtrip_and_counters(self):
+        """Test stored responses come back intact and hits/misses are counted"""
+        self.assertIsNone(self.cache.get('a'))
+        self.cache.put('a', make_completion('{"ok": true}'))
+        cached = self.cache.get('a')
+
+        self.assertEqual(cached.choices[0].message.content, '{"ok": true}')
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['entries']), (1, 1, 1))
+
+    def test_shared_between_instances(self):
+        """Test another process (a second cache on the same file) sees entries and counters"""
+        self.cache.put('a', make_completion('shared'))
+        other = LLMCache(self.db_path)
+        self.assertEqual(other.get('a').choices[0].message.content, 'shared')
+        self.assertEqual(self.cache.stats()['hits'], 1)
+
+    def test_ttl_expires_entries(self):
+        """Test entries older than the TTL are treated as misses"""
+        cache = LLMCache(self.db_path, ttl_seconds=60)
+        with patch('utils.llm_cache.time.time', return_value=1000.0):
+            cache.put('a', make_completion('old'))
+        with patch('utils.llm_cache.time.time', return_value=1030.0):
+            self.assertIsNotNone(cache.get('a'))
+        with patch('utils.llm_cache.time.time', return_value=1100.0):
+            self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.stats()['entries'], 0)
+
+    def test_lru_eviction_by_size(self):
+        """Test the least recently used entries are evicted past max_bytes"""
+        entry_size = len(make_completion('x' * 100).model_dump_json())
+        cache = LLMCache(self.db_path, max_bytes=entry_size * 2 + 10)
+
+        with patch('utils.llm_cache.time.time', side_effect=[1.0, 2.0, 3.0, 4.0]):
+            cache.put('a', make_completion('a' * 100))
+            cache.put('b', make_completion('b' * 100))
+            cache.get('a')  # 'b' is now least recently used
+            cache.put('c', make_completion('c' * 100))
+
+        self.assertIsNotNone(cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('c'))
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_chat_completion_uses_cache(self):
+        """Test a repeated request is answered without calling the API"""
+        client = MagicMock()
+        client.chat.completions.create = AsyncMock(return_value=make_completion('{"scenes": []}'))
+        request = {
+            'model': 'gpt-4o',
+            'messages': [{'role': 'user', 'content': 'Extract scenes'}],
+            'response_format': {'type': 'json_object'}
+        }
+
+        with patch('utils.rate_limiter.get_llm_cache', return_value=self.cache), \
+             patch('utils.rate_limiter.LLM_CACHE_ENABLED', True):
+            first = asyncio.run(chat_completion(client, **request))
+            second = asyncio.run(chat_completion(client, **request))
+
+        self.assertEqual(client.chat.completions.create.await_count, 1)
+        self.assertEqual(first.choices[0].message.content, second.choices[0].message.content)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+"""
+Unit tests for openai_runtime.py
+"""
+
+import unittest
+import asyncio
+import os
+import sys
+import concurrent.futures
+import unittest.mock
+
+# Add the parent directory to sys.path to import utils
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+import threading
+
+from utils.openai_runtime import AsyncRuntime, CancelScope, JobCancelledError, cancel_scope
+
+
+class TestAsyncRuntime(unittest.TestCase):
+    """Test cases for the shared async runtime"""
+
+    def setUp(self):
+        """Set up a private runtime for each test"""
+        self.runtime = AsyncRuntime()
+
+    def tearDown(self):
+        """Stop the runtime thread"""
+        self.runtime.shutdown()
+
+    def test_run_sync_returns_result(self):
+        """Test coroutines submitted from sync code return their result"""
+        async def add(a, b):
+            await asyncio.sleep(0)
+            return a + b
+
+        self.assertEqual(self.runtime.run_sync(add(2, 3)), 5)
+
+    def test_calls_share_one_loop(self):
+        """Test every call runs on the same long-lived loop"""
+        async def current_loop():
+            return asyncio.get_running_loop()
+
+        first = self.runtime.run_sync(current_loop())
+        second = self.runtime.run_sync(current_loop())
+        self.assertIs(first, second)
+
+    def test_run_sync_timeout_cancels_task(self):
+        """Test a timed-out coroutine is cancelled on the runtime loop"""
+        cancelled = concurrent.futures.Future()
+
+        async def slow():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set_result(True)
+                raise
+
+        with self.assertRaises(concurrent.futures.TimeoutError):
+            self.runtime.run_sync(slow(), timeout=0.05)
+        self.assertTrue(cancelled.result(timeout=1))
+
+    def test_cancel_scope_aborts_in_flight_calls(self):
+        """Test cancelling a scope aborts calls running in it and rejects new ones"""
+        scope = CancelScope()
+        started = threading.Event()
+        aborted = concurrent.futures.Future()
+
+        async def slow_request():
+            started.set()
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                aborted.set_result(True)
+                raise
+
+        def cancel_when_started():
+            started.wait(1)
+            scope.cancel()
+
+        canceller = threading.Thread(target=cancel_when_started)
+        canceller.start()
+        with cancel_scope(scope):
+            with self.assertRaises(JobCancelledError):
+                self.runtime.run_sync(slow_request(), timeout=5)
+            with self.assertRaises(JobCancelledError):
+                self.runtime.run_sync(slow_request())
+        canceller.join()
+        self.assertTrue(aborted.result(timeout=1))
+
+    def test_shutdown_then_restart(self):
+        """Test the runtime can be restarted after shutdown"""
+        async def answer():
+            return 42
+
+        self.runtime.run_sync(answer())
+        self.runtime.shutdown()
+        self.assertEqual(self.runtime.run_sync(answer()), 42)
+
+    def test_get_client_requires_api_key(self):
+        """Test the shared client needs an API key"""
+        with unittest.mock.patch.dict(os.environ, {'OPENAI_API_KEY': ''}):
+            with self.assertRaises(ValueError):
+                self.runtime.get_client()
+
+
+if __name__ == '__main__':
+    unittest.main()
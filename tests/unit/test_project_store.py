@@ -0,0 +1,264 @@
+"""
+Unit tests for project_store.py
+"""
+
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+from unittest.mock import patch
+
+# Add the parent directory to sys.path to import utils
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from utils.project_store import ProjectStore, ProjectMapping
+from utils.status_tracker import StatusTracker
+from utils.generation_job import run_generation_job
+
+
+class TestProjectStore(unittest.TestCase):
+    """Test cases for SQLite persistence of projects, jobs and frames"""
+
+    def setUp(self):
+        """Open a store in a temporary directory"""
+        self.data_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.data_dir, 'test.db')
+        self.store = ProjectStore(self.db_path)
+        self.project = {
+            'id': 'project-1',
+            'filename': 'test.txt',
+            'text': 'INT. ROOM - DAY\n\nJOHN\nHello.',
+            'created_at': '2024-01-01T00:00:00',
+            'word_count': 6,
+            'char_count': 27,
+            'detected_scenes': 1
+        }
+
+    def tearDown(self):
+        """Remove the temporary directory"""
+        shutil.rmtree(self.data_dir, ignore_errors=True)
+
+    def test_wal_mode(self):
+        """Test the database runs in WAL mode"""
+        mode = self.store.connection().execute('PRAGMA journal_mode').fetchone()[0]
+        self.assertEqual(mode, 'wal')
+
+    def test_project_roundtrip(self):
+        """Test projects survive reopening the database"""
+        projects = ProjectMapping(self.store)
+        projects['project-1'] = dict(self.project, extra_field='kept')
+
+        reopened = ProjectMapping(ProjectStore(self.db_path))
+        self.assertIn('project-1', reopened)
+        self.assertEqual(reopened['project-1']['text'], self.project['text'])
+        self.assertEqual(reopened['project-1']['extra_field'], 'kept')
+        self.assertEqual(list(reopened), ['project-1'])
+
+        del reopened['project-1']
+        self.assertNotIn('project-1', projects)
+        with self.assertRaises(KeyError):
+            projects['project-1']
+
+    def test_tracker_writes_through(self):
+        """Test job updates and frames are readable from a fresh tracker"""
+        tracker = StatusTracker(self.store)
+        tracker['project-1'] = {'status': 'generating', 'progress': 0, 'frames': [], 'analysis': None}
+        tracker.update_status('project-1', progress=50, analysis={'total_scenes': 1})
+        tracker.record_frame('project-1', 0, {'frame_id': 'frame_1_1'})
+        tracker.record_frame('project-1', 2, {'frame_id': 'frame_2_1'})
+        # Only the in-order prefix is published; frame_2_1 waits for the frame before it
+        tracker.update_status('project-1', frames=[{'frame_id': 'frame_1_1'}])
+        version = tracker.version('project-1')
+
+        restarted = StatusTracker(ProjectStore(self.db_path))
+        self.assertIn('project-1', restarted)
+        self.assertEqual(restarted['project-1']['progress'], 50)
+        self.assertEqual(restarted['project-1']['analysis'], {'total_scenes': 1})
+        self.assertEqual(restarted['project-1']['frames'], [{'frame_id': 'frame_1_1'}])
+        self.assertEqual(restarted.version('project-1'), version)
+
+    def test_trackers_see_each_others_writes(self):
+        """Test a tracker in another process (e.g. the cancel endpoint) is seen by the job's tracker"""
+        worker = StatusTracker(self.store)
+        web = StatusTracker(ProjectStore(self.db_path))
+        worker['project-1'] = {'status': 'generating', 'progress': 0, 'frames': [], 'analysis': None}
+        self.assertEqual(web['project-1']['status'], 'generating')
+
+        worker.update_status('project-1', progress=50)
+        web.update_status('project-1', status='cancelled')
+
+        self.assertEqual(worker['project-1']['status'], 'cancelled')
+        self.assertEqual(worker['project-1']['progress'], 50)
+        self.assertEqual(web.version('project-1'), worker.version('project-1'))
+
+    def test_cancel_from_another_process_sticks(self):
+        """Test the job's next write can't undo a cancel written by the web tier"""
+        worker = StatusTracker(self.store)
+        web = StatusTracker(ProjectStore(self.db_path))
+        worker['project-1'] = {'status': 'analyzing', 'progress': 0, 'frames': [], 'analysis': None}
+        worker.update_status('project-1', progress=20)
+
+        web.update_status('project-1', status='cancelled')
+        self.assertFalse(worker.update_status('project-1', status='generating', progress=45))
+        self.assertFalse(self.store.update_job('project-1', {'status': 'completed'}))
+
+        self.assertEqual(worker['project-1']['status'], 'cancelled')
+        self.assertEqual(web['project-1']['progress'], 20)
+
+    def test_delta_from_another_process_resends_analysis_only_when_changed(self):
+        """Test a tracker reloading from the store only sends analysis to cursors older than it"""
+        worker = StatusTracker(self.store)
+        web = StatusTracker(ProjectStore(self.db_path))
+        worker['project-1'] = {'status': 'analyzing', 'progress': 0, 'frames': [], 'analysis': None}
+        worker.update_status('project-1', status='generating', analysis={'total_scenes': 2})
+
+        first = web.delta('project-1')
+        self.assertEqual(first['analysis'], {'total_scenes': 2})
+
+        worker.update_status('project-1', progress=50)
+        second = web.delta('project-1', first['cursor'])
+        self.assertEqual(second['progress'], 50)
+        self.assertNotIn('analysis', second)
+
+        worker.update_status('project-1', analysis={'total_scenes': 3})
+        self.assertEqual(web.delta('project-1', second['cursor'])['analysis'], {'total_scenes': 3})
+
+    def test_release_keeps_finished_job_readable(self):
+        """Test released jobs leave memory but stay in the store"""
+        tracker = StatusTracker(self.store)
+        tracker['project-1'] = {'status': 'analyzing', 'progress': 0, 'frames': [], 'analysis': None}
+        tracker.update_status('project-1', status='completed', progress=100)
+        tracker.release('project-1')
+
+        self.assertEqual(tracker._entries, {})
+        self.assertEqual(tracker['project-1']['status'], 'completed')
+        self.assertEqual(tracker.delta('project-1')['progress'], 100)
+        # Finished jobs are read on demand into their own budget, not among running ones
+        self.assertEqual(tracker._entries, {})
+        self.assertEqual(list(tracker._finished), ['project-1'])
+
+        del tracker['project-1']
+        self.assertNotIn('project-1', tracker)
+        self.assertEqual(len(tracker), 0)
+
+    def test_list_projects_pages(self):
+        """Test projects are listed in pages with their job state, text only on request"""
+        for number in range(3):
+            self.store.save_project(dict(self.project, id=f'project-{number}', created_at='2024-01-01T00:00:00'))
+        StatusTracker(self.store)['project-1'] = {'status': 'generating', 'progress': 40, 'frames': [], 'analysis': None}
+
+        first = self.store.list_projects(limit=2)
+        self.assertEqual([project['id'] for project in first], ['project-0', 'project-1'])
+        self.assertNotIn('text', first[0])
+        self.assertIsNone(first[0]['job'])
+        self.assertEqual(first[1]['job']['progress'], 40)
+
+        rest = self.store.list_projects(after=('2024-01-01T00:00:00', 'project-1'), with_text=True)
+        self.assertEqual([project['id'] for project in rest], ['project-2'])
+        self.assertEqual(rest[0]['text'], self.project['text'])
+
+    def test_list_frames_published_only(self):
+        """Test frame pages stop at the published prefix"""
+        tracker = StatusTracker(self.store)
+        tracker['project-1'] = {'status': 'generating', 'frames': [], 'analysis': None}
+        for ordinal in (0, 1, 3):
+            tracker.record_frame('project-1', ordinal, {'frame_id': f'frame_{ordinal}'})
+        tracker.update_status('project-1', frames=[{'frame_id': 'frame_0'}, {'frame_id': 'frame_1'}])
+
+        self.assertEqual(self.store.list_frames('project-1', limit=1), [(0, {'frame_id': 'frame_0'})])
+        self.assertEqual(self.store.list_frames('project-1', after=0), [(1, {'frame_id': 'frame_1'})])
+        self.assertEqual(self.store.list_frames('missing'), [])
+
+    def test_list_frames_skips_failed_frame(self):
+        """Test a failed frame in the middle doesn't hide the published frames after it"""
+        tracker = StatusTracker(self.store)
+        tracker['project-1'] = {'status': 'generating', 'frames': [], 'analysis': None}
+        # Frame 1 failed, so it was never saved; frame 4 isn't published until frame 3 is
+        for ordinal in (0, 2, 4):
+            tracker.record_frame('project-1', ordinal, {'frame_id': f'frame_{ordinal}'})
+        tracker.update_status('project-1', frames=[{'frame_id': 'frame_0'}, {'frame_id': 'frame_2'}])
+
+        self.assertEqual([ordinal for ordinal, _ in self.store.list_frames('project-1')], [0, 2])
+        self.assertEqual(self.store.list_frames('project-1', after=0), [(2, {'frame_id': 'frame_2'})])
+        self.assertEqual(self.store.get_job('project-1')['status']['frames'],
+                         [frame for _, frame in self.store.list_frames('project-1')])
+
+    def test_long_text_compressed_at_rest(self):
+        """Test long script text is stored compressed and read back unchanged"""
+        text = self.project['text'] * 200
+        self.store.save_project(dict(self.project, text=text))
+
+        row = self.store.connection().execute('SELECT text, text_z FROM projects').fetchone()
+        self.assertIsNone(row['text'])
+        self.assertLess(len(row['text_z']), len(text) / 4)
+        self.assertEqual(self.store.get_project('project-1')['text'], text)
+
+    def test_tracker_memory_budget(self):
+        """Test least recently used and idle jobs leave memory but stay readable"""
+        tracker = StatusTracker(self.store, memory_bytes=1500)
+        for name in ('a', 'b', 'c'):
+            tracker[name] = {'status': 'generating', 'frames': [{'prompt': name * 600}], 'analysis': None}
+        tracker['a']
+
+        stats = tracker.memory_stats()
+        self.assertEqual(list(tracker._entries), ['c', 'a'])
+        self.assertEqual(set(stats['projects']), {'a', 'c'})
+        self.assertEqual(stats['bytes'], sum(stats['projects'].values()))
+        self.assertEqual(stats['evictions']['lru'], 2)
+        self.assertEqual(tracker['b']['frames'], [{'prompt': 'b' * 600}])
+
+        tracker.idle_seconds = 0
+        self.assertEqual(tracker.memory_stats()['entries'], 0)
+        self.assertEqual(tracker.delta('c')['status'], 'generating')
+
+    def test_finished_jobs_cached_within_budget(self):
+        """Test repeated polls of a finished job reuse its entry, and finished entries stay bounded"""
+        tracker = StatusTracker(self.store, finished_bytes=1000)
+        for name in ('a', 'b'):
+            tracker[name] = {'status': 'completed', 'frames': [{'prompt': name * 600}], 'analysis': None}
+        self.assertEqual(list(tracker._finished), ['b'])
+
+        tracker.delta_response('b')
+        with patch.object(self.store, 'get_job', wraps=self.store.get_job) as get_job:
+            for cursor in (None, None, '1.1.1'):
+                tracker.delta_response('b', cursor)
+            get_job.assert_not_called()
+        self.assertEqual(tracker['a']['frames'], [{'prompt': 'a' * 600}])
+        self.assertEqual(list(tracker._finished), ['a'])
+
+    def test_resume_skips_saved_frames(self):
+        """Test a resumed job reuses its analysis and only renders missing frames"""
+        self.store.save_project(self.project)
+        analysis = {
+            'total_scenes': 1,
+            'characters': [],
+            'scenes': [{'scene_number': 1, 'frames_needed': 2, 'location': 'ROOM'}]
+        }
+        tracker = StatusTracker(self.store)
+        tracker['project-1'] = {'status': 'generating', 'style': 'classic', 'frames': [], 'analysis': None}
+        tracker.update_status('project-1', analysis=analysis)
+        tracker.record_frame('project-1', 0, {'frame_id': 'frame_1_1'})
+
+        # Simulate a restart: new tracker over the same database
+        restarted = StatusTracker(ProjectStore(self.db_path))
+        rendered = []
+
+        def fake_frame(scene, frame_number, prompt_style, analysis, use_cache=True):
+            rendered.append(frame_number)
+            return {'frame_id': f"frame_{scene['scene_number']}_{frame_number}"}
+
+        with patch('utils.generation_job.generate_ai_frame_sync', side_effect=fake_frame), \
+             patch('utils.generation_job.fast_ai_analyze_screenplay') as mock_analyze:
+            run_generation_job('project-1', self.project, 'line art', restarted)
+            mock_analyze.assert_not_called()
+
+        self.assertEqual(rendered, [2])
+        status = restarted['project-1']
+        self.assertEqual(status['status'], 'completed')
+        self.assertEqual([frame['frame_id'] for frame in status['frames']], ['frame_1_1', 'frame_1_2'])
+        self.assertEqual(self.store.list_job_ids(('queued', 'analyzing', 'generating')), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
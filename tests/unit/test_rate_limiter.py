@@ -0,0 +1,171 @@
+"""
+Unit tests for rate_limiter.py
+"""
+
+import unittest
+import asyncio
+import os
+import sys
+import tempfile
+from unittest.mock import patch
+import httpx
+import openai
+
+# Add the parent directory to sys.path to import utils
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from utils.rate_limiter import (
+    RateLimiter, ModelLimiter, SharedWindow, parse_rate_limits, get_retry_after, estimate_chat_tokens
+)
+
+
+def rate_limit_error(headers=None):
+    """Build the error the OpenAI client raises for a 429"""
+    response = httpx.Response(429, headers=headers or {}, request=httpx.Request('POST', 'https://api.openai.com/v1/images'))
+    return openai.RateLimitError('Rate limit reached', response=response, body=None)
+
+
+class TestRateLimiter(unittest.TestCase):
+    """Test cases for the shared OpenAI rate limiter"""
+
+    def test_parse_rate_limits(self):
+        """Test per-model budgets are parsed from the env format"""
+        limits = parse_rate_limits('gpt-4o-mini=500:200000, gpt-image-1=50,broken')
+        self.assertEqual(limits['gpt-4o-mini'], (500, 200000))
+        self.assertEqual(limits['gpt-image-1'][0], 50)
+        self.assertNotIn('broken', limits)
+
+    def test_retry_after_headers(self):
+        """Test retry-after-ms takes precedence over retry-after"""
+        self.assertEqual(get_retry_after(rate_limit_error({'retry-after': '3'})), 3.0)
+        self.assertEqual(get_retry_after(rate_limit_error({'retry-after-ms': '250', 'retry-after': '3'})), 0.25)
+        self.assertIsNone(get_retry_after(rate_limit_error()))
+
+    def test_estimate_chat_tokens(self):
+        """Test token estimates include the prompt and completion budget"""
+        tokens = estimate_chat_tokens({'messages': [{'role': 'user', 'content': 'x' * 400}], 'max_tokens': 50})
+        self.assertEqual(tokens, 150)
+
+    def test_rpm_window_blocks_extra_requests(self):
+        """Test requests beyond the per-minute budget have to wait"""
+        limiter = ModelLimiter(rpm=2, tpm=1000000)
+
+        async def fill():
+            await limiter.acquire(0)
+            await limiter.acquire(0)
+            limiter.in_flight = 0
+            return limiter._wait_time(0, limiter._window[0][0] + 1)
+
+        wait = asyncio.run(fill())
+        self.assertAlmostEqual(wait, 59, delta=0.01)
+
+    def test_tpm_window_blocks_large_requests(self):
+        """Test a request that would exceed the token budget waits for old usage to expire"""
+        limiter = ModelLimiter(rpm=100, tpm=1000)
+
+        async def fill():
+            entry = await limiter.acquire(800)
+            await limiter.release(entry, None, throttled=False)
+            return limiter._wait_time(300, entry[0]), limiter._wait_time(100, entry[0])
+
+        blocked, allowed = asyncio.run(fill())
+        self.assertAlmostEqual(blocked, 60, delta=0.01)
+        self.assertEqual(allowed, 0)
+
+    def test_retries_honour_retry_after_and_adapt_concurrency(self):
+        """Test 429s are retried after retry-after and halve the model's concurrency"""
+        limiter = RateLimiter(limits={})
+        attempts = []
+        sleeps = []
+
+        async def flaky_call():
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise rate_limit_error({'retry-after': '2'})
+            return 'image'
+
+        async def fake_sleep(delay):
+            sleeps.append(delay)
+
+        with patch('utils.rate_limiter.asyncio.sleep', side_effect=fake_sleep):
+            result = asyncio.run(limiter.call('gpt-image-1', 0, flaky_call))
+
+        self.assertEqual(result, 'image')
+        self.assertEqual(len(attempts), 3)
+        self.assertTrue(all(2 <= delay <= 3.2 for delay in sleeps))
+        stats = limiter.stats()['gpt-image-1']
+        self.assertEqual(stats['throttled'], 2)
+        self.assertLess(stats['concurrency'], 8)
+
+    def test_gives_up_after_max_retries(self):
+        """Test persistent 429s are raised once retries run out"""
+        limiter = RateLimiter(limits={})
+
+        async def always_throttled():
+            raise rate_limit_error({'retry-after-ms': '1'})
+
+        with self.assertRaises(openai.RateLimitError):
+            asyncio.run(limiter.call('gpt-image-1', 0, always_throttled, max_retries=2))
+        self.assertEqual(limiter.stats()['gpt-image-1']['in_flight'], 0)
+
+    def test_success_grows_concurrency(self):
+        """Test successful calls slowly raise the concurrency limit"""
+        limiter = RateLimiter(limits={})
+
+        async def ok():
+            return 'ok'
+
+        async def run_many():
+            for _ in range(20):
+                await limiter.call('gpt-4o-mini', 10, ok)
+
+        asyncio.run(run_many())
+        self.assertGreater(limiter.stats()['gpt-4o-mini']['concurrency'], 8)
+
+
+class TestSharedWindow(unittest.TestCase):
+    """Test cases for the rate limit window shared between processes"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, 'rate_limits.db')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_budget_spans_processes(self):
+        """Test two limiters over one database share a single RPM/TPM budget"""
+        first, second = SharedWindow(self.db_path), SharedWindow(self.db_path)
+        self.assertEqual(first.reserve('gpt-4o-mini', 2, 1000, 600)[0], 0)
+        # Tokens: 600 + 500 exceeds the shared budget, so the other process waits
+        wait, reservation = second.reserve('gpt-4o-mini', 2, 1000, 500)
+        self.assertIsNone(reservation)
+        self.assertAlmostEqual(wait, 60, delta=1)
+
+        self.assertIsNotNone(second.reserve('gpt-4o-mini', 2, 1000, 300)[1])
+        self.assertIsNone(first.reserve('gpt-4o-mini', 2, 1000, 0)[1])
+        self.assertIsNotNone(first.reserve('gpt-image-1', 2, 1000, 0)[1])
+
+    def test_429_pauses_every_process(self):
+        """Test a 429 in one process holds the other processes' requests for that model"""
+        limiter = RateLimiter(limits={}, shared=SharedWindow(self.db_path))
+
+        async def throttled_call():
+            raise rate_limit_error({'retry-after': '20'})
+
+        async def stop_at_backoff(delay):
+            raise asyncio.CancelledError()
+
+        with patch('utils.rate_limiter.asyncio.sleep', side_effect=stop_at_backoff):
+            with self.assertRaises(asyncio.CancelledError):
+                asyncio.run(limiter.call('gpt-image-1', 0, throttled_call))
+
+        other_process = SharedWindow(self.db_path)
+        wait, reservation = other_process.reserve('gpt-image-1', 50, 1000, 0)
+        self.assertIsNone(reservation)
+        self.assertGreater(wait, 15)
+        self.assertIsNotNone(other_process.reserve('gpt-4o-mini', 50, 1000, 0)[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+"""
+Unit tests for revisions.py
+"""
+
+import unittest
+import os
+import sys
+
+# Add the parent directory to sys.path to import utils
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from utils.revisions import (
+    match_scenes, diff_summary, plan_revision, changed_script, scene_budget, merge_revision, carry_over_frames
+)
+
+DRAFT_1 = """INT. KITCHEN - DAY
+
+Anna makes coffee.
+
+EXT. STREET - NIGHT
+
+Anna runs from a car.
+
+INT. OFFICE - DAY
+
+Ben reads a letter."""
+
+# Street scene rewritten, office scene reflowed only, a new scene added at the end
+DRAFT_2 = """INT. KITCHEN - DAY
+
+Anna makes coffee.
+
+EXT. STREET - NIGHT
+
+Anna jumps over a car and keeps running.
+
+INT. OFFICE - DAY
+
+Ben reads
+a letter.
+
+EXT. ROOFTOP - NIGHT
+
+Anna and Ben face off."""
+
+PREVIOUS_ANALYSIS = {
+    'title': 'Drafts',
+    'characters': {'ANNA': {'description': 'red coat'}},
+    'scenes': [
+        {'scene_number': 1, 'slug_line': 'INT. KITCHEN - DAY', 'frames_needed': 1, 'mood': 'calm'},
+        {'scene_number': 2, 'slug_line': 'EXT. STREET - NIGHT', 'frames_needed': 2},
+        {'scene_number': 3, 'slug_line': 'INT. OFFICE - DAY', 'frames_needed': 1}
+    ]
+}
+
+
+class TestRevisions(unittest.TestCase):
+    """Test scene diffing and reuse between drafts"""
+
+    def test_match_scenes_by_content(self):
+        """Test unchanged scenes match across drafts, ignoring reflowed whitespace"""
+        self.assertEqual(match_scenes(DRAFT_1, DRAFT_2), {0: 0, 2: 2})
+        self.assertEqual(diff_summary(DRAFT_1, DRAFT_2),
+                         {'unchanged_scenes': 2, 'changed_scenes': 2, 'removed_scenes': 1})
+
+    def test_moved_scene_still_matches(self):
+        """Test reordering scenes is not treated as an edit"""
+        blocks = DRAFT_1.split("\n\n")
+        scenes = ["\n\n".join(blocks[start:start + 2]) for start in range(0, len(blocks), 2)]
+        moved = "\n\n".join([scenes[2], scenes[0], scenes[1]])
+        self.assertEqual(len(match_scenes(DRAFT_1, moved)), 3)
+
+    def test_plan_reuses_unchanged_scenes(self):
+        """Test only changed or new scenes are left to analyze"""
+        plan = plan_revision(PREVIOUS_ANALYSIS, DRAFT_1, DRAFT_2)
+
+        self.assertEqual([scene['scene_number'] for scene in plan['reused']], [1, 3])
+        self.assertEqual(plan['reused'][0]['mood'], 'calm')
+        self.assertEqual(plan['changed'], [1, 3])
+        self.assertEqual(plan['dropped'], 1)
+        self.assertEqual(scene_budget(plan, 3), 1)
+        self.assertTrue(changed_script(DRAFT_2, plan).startswith('EXT. STREET - NIGHT'))
+        self.assertIn('EXT. ROOFTOP - NIGHT', changed_script(DRAFT_2, plan))
+
+    def test_merge_renumbers_new_scenes(self):
+        """Test scenes analyzed from the changed script land at their place in the new draft"""
+        plan = plan_revision(PREVIOUS_ANALYSIS, DRAFT_1, DRAFT_2)
+        partial = {
+            'scenes': [{'scene_number': 2, 'slug_line': 'EXT. ROOFTOP - NIGHT', 'frames_needed': 2}],
+            'characters': {'ANNA': {'description': 'blue coat'}, 'BEN': {'description': 'glasses'}}
+        }
+        analysis = merge_revision(PREVIOUS_ANALYSIS, plan, DRAFT_2, partial)
+
+        self.assertEqual([scene['scene_number'] for scene in analysis['scenes']], [1, 3, 4])
+        self.assertEqual(analysis['total_frames'], 4)
+        self.assertEqual(analysis['characters']['ANNA']['description'], 'red coat')
+        self.assertIn('BEN', analysis['characters'])
+        self.assertEqual(analysis['revision'], {'reused_scenes': 2, 'analyzed_scenes': 1, 'changed_scenes': 2})
+
+    def test_carry_over_frames(self):
+        """Test frames of reused scenes are renamed to their new scene number"""
+        scenes = [{'scene_number': 5, 'previous_scene_number': 3, 'frames_needed': 1},
+                  {'scene_number': 6, 'frames_needed': 1}]
+        previous_frames = [{'frame_id': 'frame_3_1', 'scene_number': 3, 'image_url': '/generated/a.png', 'cost': 0.02}]
+
+        carried = carry_over_frames(previous_frames, scenes, 'old-project')
+        self.assertEqual(list(carried), ['frame_5_1'])
+        self.assertEqual(carried['frame_5_1']['scene_number'], 5)
+        self.assertEqual(carried['frame_5_1']['image_url'], '/generated/a.png')
+        self.assertEqual(carried['frame_5_1']['cost'], 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
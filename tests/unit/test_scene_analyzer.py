@@ -3,9 +3,13 @@ Unit tests for scene_analyzer.py
 """
 
 import unittest
+import asyncio
+import json
 import os
 import sys
 from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import patch
 
 # Add the parent directory to sys.path to import utils
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
@@ -22,7 +26,11 @@ from utils.scene_analyzer import (
     is_character_name,
     clean_character_name,
     extract_primary_setting,
-    estimate_pages
+    estimate_pages,
+    ai_analyze_screenplay,
+    fast_ai_extract_for_generation,
+    split_into_scene_chunks,
+    map_reduce_extract
 )
 
 
@@ -469,5 +477,151 @@ class TestSceneAnalyzerIntegration(unittest.TestCase):
             self.assertIn('scenes', analysis)
 
 
+def fake_chat_response(content):
+    """Minimal stand-in for a chat completion response"""
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+class TestConcurrentAnalysis(unittest.TestCase):
+    """Test the analysis LLM calls run concurrently and tolerate partial failures"""
+
+    SCRIPT = "FADE IN:\n\nEXT. CITY STREET - DAY\n\nJOHN walks down the street.\n\nINT. OFFICE - NIGHT\n\nMARY waits."
+
+    def run_with_responses(self, analyze, responses, delay=0.0):
+        """Run an analysis coroutine with chat calls answered by system-prompt keyword"""
+        state = {'in_flight': 0, 'max_in_flight': 0}
+
+        async def fake_chat(client, **kwargs):
+            state['in_flight'] += 1
+            state['max_in_flight'] = max(state['max_in_flight'], state['in_flight'])
+            try:
+                await asyncio.sleep(delay)
+                system_prompt = kwargs['messages'][0]['content']
+                for keyword, response in responses.items():
+                    if keyword in system_prompt:
+                        if isinstance(response, Exception):
+                            raise response
+                        return fake_chat_response(response)
+                raise AssertionError('unexpected call')
+            finally:
+                state['in_flight'] -= 1
+
+        with patch('utils.scene_analyzer.chat_completion', side_effect=fake_chat):
+            result = asyncio.run(analyze(None, self.SCRIPT, 2))
+        return result, state['max_in_flight']
+
+    def test_fast_extraction_runs_calls_concurrently(self):
+        """Test character and scene extraction overlap"""
+        responses = {
+            'character analyst': json.dumps({'characters': {'JOHN': {'description': 'tall'}}}),
+            'storyboard director': json.dumps({'scenes': [{'scene_number': 1, 'location': 'STREET', 'frames_needed': 2}]})
+        }
+        analysis, max_in_flight = self.run_with_responses(fast_ai_extract_for_generation, responses, delay=0.01)
+
+        self.assertEqual(max_in_flight, 2)
+        self.assertIn('JOHN', analysis['characters'])
+        self.assertEqual(analysis['total_frames'], 2)
+
+    def test_fast_extraction_keeps_characters_when_scenes_fail(self):
+        """Test a bad scene response falls back to basic scenes without losing characters"""
+        responses = {
+            'character analyst': json.dumps({'characters': {'JOHN': {'description': 'tall'}}}),
+            'storyboard director': 'not json'
+        }
+        analysis, _ = self.run_with_responses(fast_ai_extract_for_generation, responses)
+
+        self.assertIn('JOHN', analysis['characters'])
+        self.assertEqual(analysis['total_scenes'], 2)
+        self.assertEqual(analysis['scenes'][0]['location'], 'CITY STREET')
+
+    def test_fast_extraction_fails_when_every_call_fails(self):
+        """Test the caller's fallback is used when nothing succeeded"""
+        responses = {'character analyst': RuntimeError('boom'), 'storyboard director': 'not json'}
+        with self.assertRaises(Exception):
+            self.run_with_responses(fast_ai_extract_for_generation, responses)
+
+    def test_full_analysis_tolerates_failed_character_call(self):
+        """Test the three full-analysis calls run together and a failed one only loses its part"""
+        responses = {
+            'screenplay analysis expert': json.dumps({'title': 'The Test', 'genre': 'Drama'}),
+            'scene expert': json.dumps({'scenes': [{'scene_number': 1, 'frames_needed': 1}]}),
+            'character analysis expert': RuntimeError('timeout')
+        }
+        analysis, max_in_flight = self.run_with_responses(ai_analyze_screenplay, responses, delay=0.01)
+
+        self.assertEqual(max_in_flight, 3)
+        self.assertEqual(analysis['title'], 'The Test')
+        self.assertEqual(analysis['total_scenes'], 1)
+        self.assertEqual(analysis['characters'], {})
+
+
+class TestChunkedAnalysis(unittest.TestCase):
+    """Test the map-reduce analysis used for long scripts"""
+
+    @staticmethod
+    def make_script(scene_count, words_per_scene=50):
+        scenes = [
+            f"INT. ROOM {number} - DAY\n\n" + ' '.join(['action'] * words_per_scene)
+            for number in range(1, scene_count + 1)
+        ]
+        return "TITLE PAGE\n\n" + "\n\n".join(scenes)
+
+    def test_split_keeps_whole_scenes_in_order(self):
+        """Test chunks split on scene headings and number every scene once"""
+        chunks = split_into_scene_chunks(self.make_script(10), target_words=120)
+
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(chunks[0]['first_scene'], 1)
+        self.assertEqual(chunks[-1]['last_scene'], 10)
+        for previous, chunk in zip(chunks, chunks[1:]):
+            self.assertEqual(chunk['first_scene'], previous['last_scene'] + 1)
+            self.assertTrue(chunk['text'].startswith('### SCENE'))
+        markers = [line for chunk in chunks for line in chunk['text'].split('\n') if line.startswith('### SCENE')]
+        self.assertEqual(markers, [f'### SCENE {number}' for number in range(1, 11)])
+
+    def run_map_reduce(self, script, reduce_response, failing_chunk=None):
+        """Run map_reduce_extract with chunk calls answered from the scene markers"""
+        calls = []
+
+        async def fake_chat(client, **kwargs):
+            content = kwargs['messages'][1]['content']
+            calls.append(kwargs['model'])
+            if 'Scenes:' in content:
+                return fake_chat_response(json.dumps(reduce_response))
+            numbers = [int(line.split()[-1]) for line in content.split('\n') if line.startswith('### SCENE')]
+            if failing_chunk is not None and failing_chunk in numbers:
+                raise RuntimeError('chunk failed')
+            return fake_chat_response(json.dumps({
+                'scenes': [{'scene_number': n, 'slug_line': f'INT. ROOM {n} - DAY', 'synopsis': f'scene {n}',
+                            'importance': n % 10, 'characters': ['ANNA']} for n in numbers],
+                'characters': {'ANNA': {'description': 'a pilot'}, 'BANG!': {}}
+            }))
+
+        with patch('utils.scene_analyzer.chat_completion', side_effect=fake_chat), \
+             patch('utils.scene_analyzer.ANALYSIS_CHUNK_WORDS', 120):
+            result = asyncio.run(map_reduce_extract(None, script, 3))
+        return result, calls
+
+    def test_every_scene_is_a_candidate(self):
+        """Test scenes from anywhere in the script can be selected by the reduce pass"""
+        reduce_response = {'scenes': [{'scene_number': 2, 'frames_needed': 2}, {'scene_number': 17}, {'scene_number': 30}],
+                           'characters': ['ANNA']}
+        (characters_data, story_data), calls = self.run_map_reduce(self.make_script(30), reduce_response)
+
+        self.assertEqual([scene['scene_number'] for scene in story_data['scenes']], [2, 17, 30])
+        self.assertEqual(story_data['scenes'][0]['frames_needed'], 2)
+        self.assertEqual(story_data['scenes'][1]['synopsis'], 'scene 17')
+        self.assertEqual(list(characters_data['characters']), ['ANNA'])
+        self.assertGreater(len(calls), 2)
+        self.assertEqual(calls[-1], 'gpt-4o')
+
+    def test_failed_reduce_keeps_most_important_candidates(self):
+        """Test a failed reduce pass falls back to ranking by importance"""
+        (_, story_data), _ = self.run_map_reduce(self.make_script(12), {'unexpected': True}, failing_chunk=1)
+
+        numbers = [scene['scene_number'] for scene in story_data['scenes']]
+        self.assertEqual(numbers, [7, 8, 9])
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
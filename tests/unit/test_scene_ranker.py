@@ -0,0 +1,130 @@
+"""
+Unit tests for scene_ranker.py
+"""
+
+import unittest
+import os
+import sys
+import json
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import patch
+
+# Add the parent directory to sys.path to import utils
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from utils.scene_ranker import (
+    rank_scenes, select_candidates, format_candidates, merge_annotations, action_density, position_weight
+)
+from utils.scene_analyzer import sampled_extract
+from utils.fountain_parser import parse_fountain
+
+
+def make_script(count, busy=()):
+    """Script of `count` quiet dialogue scenes; scenes numbered in `busy` are action scenes"""
+    scenes = []
+    for number in range(1, count + 1):
+        if number in busy:
+            body = ("ANNA runs down the hall. Guards chase her. She jumps a railing and crashes through a window.\n\n"
+                    "GUARD\nStop her!\n\nANNA\nNever!")
+        else:
+            body = "ANNA sits.\n\nANNA\nI have been thinking about the weather and the garden all week long, really."
+        scenes.append(f"INT. ROOM {number} - DAY\n\n{body}")
+    return "\n\n".join(scenes)
+
+
+class TestSceneRanker(unittest.TestCase):
+    """Test the local scene scoring and candidate short list"""
+
+    def test_signals(self):
+        """Test action density favours action lines and position peaks on story beats"""
+        self.assertGreater(action_density("He runs and jumps, then crashes.", 10), action_density("He sits.", 10))
+        self.assertEqual(action_density("", 0), 0.0)
+        self.assertAlmostEqual(position_weight(0.5), 0.8)
+        self.assertLess(position_weight(0.38), 0.1)
+
+    def test_rank_is_deterministic_and_prefers_action_scenes(self):
+        """Test busy scenes outrank quiet ones and plain-text cues give scene characters"""
+        script = make_script(20, busy=(7, 14))
+        ranked = rank_scenes(script)
+
+        self.assertEqual([scene['scene_number'] for scene in ranked], list(range(1, 21)))
+        self.assertEqual(ranked, rank_scenes(script))
+        self.assertEqual(set(ranked[6]['characters']), {'ANNA', 'GUARD'})
+        self.assertGreater(ranked[6]['rank_score'], ranked[7]['rank_score'])
+
+        candidates = select_candidates(ranked, 2)
+        self.assertEqual(len(candidates), 4)
+        self.assertIn(7, [scene['scene_number'] for scene in candidates])
+        self.assertIn(14, [scene['scene_number'] for scene in candidates])
+        self.assertEqual(candidates, sorted(candidates, key=lambda scene: scene['scene_number']))
+
+    def test_location_novelty(self):
+        """Test a repeated location scores lower than its first appearance"""
+        script = "\n\n".join(f"INT. {place} - DAY\n\nShe waits." for place in
+                             ('KITCHEN', 'GARAGE', 'HALL', 'KITCHEN', 'ATTIC', 'CELLAR', 'BARN', 'SHED', 'YARD'))
+        ranked = rank_scenes(script)
+        # Scenes 4 and 6 sit equally far from the story beats
+        self.assertGreater(ranked[5]['rank_score'], ranked[3]['rank_score'])
+
+    def test_fountain_elements(self):
+        """Test Fountain scripts are ranked from their parsed elements"""
+        script = make_script(6, busy=(3,))
+        ranked = rank_scenes(script, parse_fountain(script))
+        self.assertEqual(len(ranked), 6)
+        self.assertEqual(set(ranked[2]['characters']), {'ANNA', 'GUARD'})
+
+    def test_merge_annotations(self):
+        """Test picks are applied by number and a bad response keeps the local top scenes"""
+        candidates = select_candidates(rank_scenes(make_script(10, busy=(4, 9))), 2)
+        annotation = {'scenes': [{'scene_number': 9, 'frames_needed': 2, 'slug_line': 'INVENTED'},
+                                 {'scene_number': 99}, {'scene_number': 4, 'mood': 'tense'}, {'scene_number': 9}]}
+
+        merged = merge_annotations(candidates, annotation, 2)
+        self.assertEqual([scene['scene_number'] for scene in merged], [4, 9])
+        self.assertEqual(merged[1]['frames_needed'], 2)
+        self.assertEqual(merged[1]['slug_line'], 'INT. ROOM 9 - DAY')
+        self.assertEqual(merged[0]['mood'], 'tense')
+
+        fallback = merge_annotations(candidates, None, 2)
+        self.assertEqual([scene['scene_number'] for scene in fallback], [4, 9])
+
+    def test_sampled_extract_sends_only_candidates(self):
+        """Test the scene call receives the compact short list instead of the script"""
+        script = make_script(30, busy=(5, 25))
+        prompts = {}
+
+        async def fake_chat(client, **kwargs):
+            content = kwargs['messages'][1]['content']
+            if content.startswith('Candidate scenes:'):
+                prompts['scenes'] = content
+                reply = {'scenes': [{'scene_number': 25, 'story_beat': 'climax'}]}
+            else:
+                reply = {'characters': {'ANNA': {'description': 'a pilot'}}}
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=json.dumps(reply)))])
+
+        with patch('utils.scene_analyzer.chat_completion', side_effect=fake_chat):
+            _, story_data = asyncio.run(sampled_extract(None, script, 2))
+
+        self.assertLess(len(prompts['scenes']), len(script) / 3)
+        self.assertEqual(len(prompts['scenes'].split('\n')), 5)
+        self.assertEqual(story_data['scenes'][0]['scene_number'], 25)
+        self.assertEqual(story_data['scenes'][0]['story_beat'], 'climax')
+        self.assertEqual(format_candidates(story_data['scenes']).split(' | ')[0], '25. INT. ROOM 25 - DAY')
+
+    def test_sampled_extract_ranks_fountain_elements(self):
+        """Test Fountain scripts are ranked from their parsed elements, not heuristic headings"""
+        script = make_script(6, busy=(3,))
+        elements = parse_fountain(script)
+
+        async def fake_chat(client, **kwargs):
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content='{}'))])
+
+        with patch('utils.scene_analyzer.chat_completion', side_effect=fake_chat), \
+             patch('utils.scene_ranker.rank_scenes', wraps=rank_scenes) as ranker:
+            asyncio.run(sampled_extract(None, script, 2, elements))
+        ranker.assert_called_once_with(script, elements)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+"""
+Unit tests for screenplay_index.py
+"""
+
+import unittest
+import os
+import sys
+
+# Add the parent directory to sys.path to import utils
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from utils.screenplay_index import ScreenplayIndex, ScriptCache, index_screenplay
+
+
+class TestScreenplayIndex(unittest.TestCase):
+    """Test cases for the single-pass screenplay index"""
+
+    def setUp(self):
+        self.text = (
+            "THE TEST\n"
+            "\n"
+            "FADE IN:\n"
+            "EXT. CITY STREET - DAY\n"
+            "John walks.\n"
+            "INT. COFFEE SHOP - NIGHT\n"
+            "MARY\n"
+            "Hello there.\n"
+            "INT. OFFICE\n"
+            "Papers everywhere."
+        )
+        self.index = ScreenplayIndex(self.text)
+
+    def test_counts_match_plain_scans(self):
+        """Test word and line counts match str.split() on the whole text"""
+        self.assertEqual(self.index.word_count, len(self.text.split()))
+        self.assertEqual(self.index.line_count, len(self.text.split('\n')))
+        self.assertEqual(self.index.non_empty_lines, 9)
+        self.assertEqual(self.index.pages, 1)
+
+    def test_word_slices_match_split(self):
+        """Test word ranges match slices of text.split() across line boundaries"""
+        words = self.text.split()
+        for start, stop in ((0, 3), (2, 9), (5, 6), (len(words) - 3, len(words)), (0, 100), (12, 12)):
+            self.assertEqual(self.index.words(start, stop), words[start:stop])
+
+    def test_line_offsets(self):
+        """Test lines can be read back from their offsets"""
+        for number, line in enumerate(self.text.split('\n')):
+            self.assertEqual(self.index.line(number), line)
+            self.assertEqual(self.text[self.index.line_offsets[number]:].split('\n')[0], line)
+
+    def test_sluglines_and_sections(self):
+        """Test headings are parsed once and sections span heading to heading"""
+        slugs = self.index.sluglines
+        self.assertEqual([slug['location'] for slug in slugs], ['CITY STREET', 'COFFEE SHOP', 'OFFICE'])
+        self.assertEqual([slug['time_of_day'] for slug in slugs], ['DAY', 'NIGHT', 'DAY'])
+        self.assertEqual(self.index.section(1), "INT. COFFEE SHOP - NIGHT\nMARY\nHello there.")
+        self.assertEqual(self.index.preamble(), "THE TEST\n\nFADE IN:\n")
+        self.assertEqual([slug['words'] for slug in slugs], [7, 8, 4])
+        self.assertEqual(self.index.preamble_words, 4)
+
+    def test_strict_heading_count(self):
+        """Test only sluglines with a time of day count as strict headings"""
+        self.assertEqual(self.index.strict_heading_count, 2)
+
+    def test_index_is_built_once_per_text(self):
+        """Test repeated lookups reuse the cached index"""
+        self.assertIs(index_screenplay(self.text), index_screenplay(self.text))
+        self.assertEqual(index_screenplay('').pages, 0)
+
+    def test_script_cache_stays_within_budget(self):
+        """Test cached indexes are dropped least recently used first once their scripts pass the budget"""
+        cache = ScriptCache(ScreenplayIndex, max_chars=2 * len(self.text) + 4)
+        first = cache.get(self.text)
+        second = cache.get(self.text + ' A')
+        cache.get(self.text)
+        cache.get(self.text + ' B')
+
+        self.assertEqual(len(cache._entries), 2)
+        self.assertIs(cache.get(self.text), first)
+        self.assertIsNot(cache.get(self.text + ' A'), second)
+
+if __name__ == '__main__':
+    unittest.main()
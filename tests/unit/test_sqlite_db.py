@@ -0,0 +1,80 @@
+"""
+Unit tests for sqlite_db.py
+"""
+
+import unittest
+import os
+import sys
+import tempfile
+import threading
+
+# Add the parent directory to sys.path to import utils
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from utils.sqlite_db import SQLiteCache, SQLiteDatabase, process_wide
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    a TEXT NOT NULL,
+    b INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    last_used_at REAL NOT NULL,
+    PRIMARY KEY (a, b)
+);
+"""
+
+
+class TestSQLiteDatabase(unittest.TestCase):
+    """Test cases for the shared SQLite helpers"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, 'nested', 'test.db')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_connection_per_thread_with_migrations(self):
+        """Test each thread gets its own WAL connection and later columns are added"""
+        SQLiteDatabase(self.db_path, SCHEMA)
+        db = SQLiteDatabase(self.db_path, SCHEMA, migrations=(('entries', 'note', 'TEXT'),))
+
+        other = []
+        thread = threading.Thread(target=lambda: other.append(db.connection()))
+        thread.start()
+        thread.join()
+        self.assertIs(db.connection(), db.connection())
+        self.assertIsNot(db.connection(), other[0])
+        self.assertEqual(db.connection().execute('PRAGMA journal_mode').fetchone()[0], 'wal')
+        columns = {row['name'] for row in db.connection().execute('PRAGMA table_info(entries)')}
+        self.assertIn('note', columns)
+
+    def test_lazy_database_opens_on_first_use(self):
+        """Test a lazy database doesn't create its file until used"""
+        db = SQLiteDatabase(self.db_path, SCHEMA, lazy=True)
+        self.assertFalse(os.path.exists(self.db_path))
+        db.connection()
+        self.assertTrue(os.path.exists(self.db_path))
+
+    def test_cache_evicts_least_recently_used_by_composite_key(self):
+        """Test eviction past max_bytes deletes the oldest rows and counts them"""
+        cache = SQLiteCache(self.db_path, SCHEMA, 'entries', ('a', 'b'), max_bytes=25)
+        with cache.connection() as conn:
+            conn.executemany('INSERT INTO entries (a, b, size, last_used_at) VALUES (?, ?, ?, ?)',
+                             [('x', 1, 10, 1.0), ('x', 2, 10, 3.0), ('y', 1, 10, 2.0)])
+            cache._count(conn, 'hits', 3)
+            cache._evict_over_budget(conn)
+
+        rows = cache.connection().execute('SELECT a, b FROM entries ORDER BY a, b').fetchall()
+        self.assertEqual([tuple(row) for row in rows], [('x', 2), ('y', 1)])
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['evictions'], stats['entries'], stats['bytes']), (3, 1, 2, 20))
+
+    def test_process_wide_creates_once(self):
+        """Test the getter builds its instance once"""
+        get = process_wide(object)
+        self.assertIs(get(), get())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+"""
+Unit tests for status_tracker.py
+"""
+
+import unittest
+import json
+import threading
+import os
+import sys
+
+# Add the parent directory to sys.path to import utils
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from utils.status_tracker import StatusTracker
+
+
+class TestStatusTracker(unittest.TestCase):
+    """Test cases for versioned status tracking"""
+
+    def setUp(self):
+        """Set up a tracker with one running job"""
+        self.tracker = StatusTracker()
+        self.tracker['project-1'] = {
+            'status': 'generating',
+            'progress': 0,
+            'frames': [],
+            'analysis': None
+        }
+
+    def test_update_bumps_version(self):
+        """Test every update increments the version"""
+        version = self.tracker.version('project-1')
+        self.assertTrue(self.tracker.update_status('project-1', progress=10))
+        self.assertEqual(self.tracker.version('project-1'), version + 1)
+        self.assertEqual(self.tracker['project-1']['progress'], 10)
+
+    def test_update_missing_project(self):
+        """Test updates for unknown projects are ignored"""
+        self.assertFalse(self.tracker.update_status('missing', progress=10))
+        self.assertNotIn('missing', self.tracker)
+
+    def test_cancel_survives_later_job_writes(self):
+        """Test a cancel landing between two job writes isn't overwritten by the next one"""
+        self.tracker.update_status('project-1', status='analyzing', progress=10)
+        self.assertTrue(self.tracker.update_status('project-1', status='cancelled'))
+
+        self.assertFalse(self.tracker.update_status('project-1', status='generating', progress=45))
+        self.assertFalse(self.tracker.update_status('project-1', progress=60))
+        self.assertEqual(self.tracker['project-1']['status'], 'cancelled')
+        self.assertEqual(self.tracker['project-1']['progress'], 10)
+
+        # A new run replaces the status outright
+        self.tracker['project-1'] = {'status': 'queued', 'progress': 0, 'frames': []}
+        self.assertTrue(self.tracker.update_status('project-1', status='analyzing'))
+
+    def test_delta_returns_only_new_frames(self):
+        """Test frames already seen by the client are not re-sent"""
+        self.tracker.update_status('project-1', frames=[{'frame_id': 'frame_1_1'}])
+        first = self.tracker.delta('project-1')
+        self.assertEqual(len(first['frames']), 1)
+
+        self.tracker.update_status('project-1', frames=[{'frame_id': 'frame_1_1'}, {'frame_id': 'frame_2_1'}])
+        second = self.tracker.delta('project-1', first['cursor'])
+        self.assertEqual([f['frame_id'] for f in second['frames']], ['frame_2_1'])
+        self.assertEqual(second['frame_count'], 2)
+        self.assertFalse(second['reset'])
+
+    def test_delta_includes_analysis_only_when_changed(self):
+        """Test analysis is sent once and omitted after that"""
+        self.tracker.update_status('project-1', analysis={'title': 'Test'})
+        first = self.tracker.delta('project-1')
+        self.assertEqual(first['analysis'], {'title': 'Test'})
+
+        self.tracker.update_status('project-1', progress=50)
+        second = self.tracker.delta('project-1', first['cursor'])
+        self.assertNotIn('analysis', second)
+
+    def test_new_run_resets_cursor(self):
+        """Test replacing the status invalidates older cursors"""
+        self.tracker.update_status('project-1', frames=[{'frame_id': 'frame_1_1'}])
+        cursor = self.tracker.delta('project-1')['cursor']
+
+        self.tracker['project-1'] = {'status': 'analyzing', 'progress': 0, 'frames': []}
+        delta = self.tracker.delta('project-1', cursor)
+        self.assertTrue(delta['reset'])
+        self.assertEqual(delta['frames'], [])
+
+    def test_delta_response_cached_per_version(self):
+        """Test serialized responses are reused until the version changes"""
+        etag1, body1 = self.tracker.delta_response('project-1')
+        etag2, body2 = self.tracker.delta_response('project-1')
+        self.assertEqual(etag1, etag2)
+        self.assertIs(body1, body2)
+
+        self.tracker.update_status('project-1', progress=20)
+        etag3, body3 = self.tracker.delta_response('project-1')
+        self.assertNotEqual(etag1, etag3)
+        self.assertEqual(json.loads(body3)['progress'], 20)
+
+        # Clients at different cursors get different bodies, so different validators
+        cursor = json.loads(body1)['cursor']
+        etag4, _ = self.tracker.delta_response('project-1', cursor)
+        self.assertNotEqual(etag3, etag4)
+
+    def test_wait_for_change(self):
+        """Test waiters wake up on updates and time out otherwise"""
+        cursor = self.tracker.delta('project-1')['cursor']
+        self.assertFalse(self.tracker.wait_for_change('project-1', cursor, timeout=0.01))
+
+        timer = threading.Timer(0.05, self.tracker.update_status, args=('project-1',), kwargs={'progress': 5})
+        timer.start()
+        self.assertTrue(self.tracker.wait_for_change('project-1', cursor, timeout=2))
+        timer.join()
+
+    def test_malformed_cursor(self):
+        """Test malformed cursors are treated as a fresh client"""
+        delta = self.tracker.delta('project-1', 'not-a-cursor')
+        self.assertTrue(delta['reset'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -8,11 +8,13 @@ import sys
 from unittest.mock import patch, MagicMock
 from datetime import datetime
 import time
+import asyncio
 
 # Add the parent directory to sys.path to import utils
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
 
 from utils.storyboard_generator import (
+    ai_generate_frames,
     generate_storyboard_frames,
     generate_frame,
     create_frame_prompt,
@@ -421,6 +423,30 @@ class TestStoryboardGenerator(unittest.TestCase):
         self.assertIn(style2, frame2['prompt'])
         self.assertNotEqual(frame1['prompt'], frame2['prompt'])
 
+    def test_ai_generate_frames_concurrent_keeps_order(self):
+        """Test concurrent AI frame generation is bounded and returns frames in order"""
+        in_flight = 0
+        peak = 0
+
+        async def fake_generate_ai_frame(client, scene, frame_number, style_dna, character_database=None):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            # Later scenes finish first to exercise reordering
+            await asyncio.sleep(0.01 * (3 - scene['scene_number']))
+            in_flight -= 1
+            return generate_frame(scene, frame_number, self.style_prompt)
+
+        analysis = dict(self.sample_analysis)
+        analysis['scenes'] = [dict(scene, frames_needed=2) for scene in self.sample_analysis['scenes']]
+
+        with patch('utils.storyboard_generator.generate_ai_frame', side_effect=fake_generate_ai_frame):
+            frames = asyncio.run(ai_generate_frames(MagicMock(), analysis, self.style_prompt, max_concurrency=2))
+
+        self.assertEqual([f['frame_id'] for f in frames],
+                         ['frame_1_1', 'frame_1_2', 'frame_2_1', 'frame_2_2'])
+        self.assertLessEqual(peak, 2)
+
 
 class TestStoryboardGeneratorIntegration(unittest.TestCase):
     """Integration tests for storyboard generator"""
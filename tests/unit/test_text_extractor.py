@@ -17,9 +17,37 @@ from utils.text_extractor import (
     extract_pdf_text,
     extract_pdf_text_alternative,
     extract_pdf_text_simple,
+    extract_pdf_page_range,
+    extract_pdf_document,
+    page_quality,
     clean_screenplay_text,
     estimate_pages
 )
+from utils.page_cache import PageCache
+
+
+def make_pdf(page_texts):
+    """Minimal PDF with one line of Helvetica text per page"""
+    objects = ['<< /Type /Catalog /Pages 2 0 R >>', None,
+               '<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>']
+    kids = []
+    for text in page_texts:
+        stream = f'BT /F1 12 Tf 72 720 Td ({text}) Tj ET'
+        objects.append(f'<< /Length {len(stream)} >>\nstream\n{stream}\nendstream')
+        objects.append(f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] '
+                       f'/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>')
+        kids.append(f'{len(objects)} 0 R')
+    objects[1] = f'<< /Type /Pages /Kids [{" ".join(kids)}] /Count {len(kids)} >>'
+
+    body, offsets = b'%PDF-1.4\n', []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(body))
+        body += f'{number} 0 obj\n{obj}\nendobj\n'.encode('latin-1')
+    xref = len(body)
+    body += f'xref\n0 {len(objects) + 1}\n0000000000 65535 f \n'.encode()
+    body += ''.join(f'{offset:010d} 00000 n \n' for offset in offsets).encode()
+    body += f'trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n'.encode()
+    return body
 
 
 class TestTextExtractor(unittest.TestCase):
@@ -334,5 +362,88 @@ class TestTextExtractorIntegration(unittest.TestCase):
             self.assertGreater(pages, 1)
 
 
+class TestPagedPdfExtraction(unittest.TestCase):
+    """Test per-page PDF extraction and the page cache"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache = PageCache(os.path.join(self.temp_dir.name, 'page_cache.db'))
+        self.cache_patch = patch('utils.text_extractor.get_page_cache', return_value=self.cache)
+        self.cache_patch.start()
+        self.pdf_path = os.path.join(self.temp_dir.name, 'script.pdf')
+        with open(self.pdf_path, 'wb') as f:
+            f.write(make_pdf(['INT. DINER - NIGHT', 'Bob pours coffee.', 'FADE OUT.']))
+
+    def tearDown(self):
+        self.cache_patch.stop()
+        self.temp_dir.cleanup()
+
+    def test_pages_joined_in_order(self):
+        """Test pages are extracted and joined in page order"""
+        pages = extract_pdf_page_range(self.pdf_path, [2, 0])
+        self.assertEqual({number: page['text'] for number, page in pages.items()},
+                         {0: 'INT. DINER - NIGHT', 2: 'FADE OUT.'})
+        self.assertEqual(extract_pdf_text(self.pdf_path), 'INT. DINER - NIGHT\nBob pours coffee.\nFADE OUT.')
+
+    def test_reupload_reads_cached_pages(self):
+        """Test a second extraction of the same file doesn't parse any page"""
+        first = extract_pdf_text(self.pdf_path)
+        with patch('utils.text_extractor.extract_pdf_pages') as mock_extract:
+            self.assertEqual(extract_pdf_text(self.pdf_path), first)
+            mock_extract.assert_not_called()
+        self.assertEqual(self.cache.stats()['hits'], 3)
+
+    def test_bad_page_is_skipped(self):
+        """Test one unreadable page doesn't fail the file and isn't cached"""
+        with patch('utils.text_extractor.extract_pdf_pages',
+                   return_value={0: {'text': 'INT. DINER - NIGHT', 'engine': 'pypdf2', 'quality': 1.0}, 1: None,
+                                 2: {'text': 'FADE OUT.', 'engine': 'pypdf2', 'quality': 1.0}}):
+            self.assertEqual(extract_pdf_text(self.pdf_path), 'INT. DINER - NIGHT\nFADE OUT.')
+        self.assertEqual(self.cache.stats()['entries'], 2)
+
+        # Only the missing page is extracted next time
+        self.assertEqual(extract_pdf_text(self.pdf_path), 'INT. DINER - NIGHT\nBob pours coffee.\nFADE OUT.')
+        self.assertEqual(self.cache.stats()['entries'], 3)
+
+    def test_page_quality_signals(self):
+        """Test clean pages pass and glued words, merged columns and inline headings fail"""
+        clean = ("INT. DINER - NIGHT\n\nMary Jane, a tall woman with red hair, pours coffee for the\n"
+                 "last customer of the night.\n\n                    MARY JANE\n          More?")
+        self.assertEqual(page_quality(clean), 1.0)
+        self.assertEqual(page_quality(''), 1.0)
+        self.assertLess(page_quality('INT.DINER-NIGHTMaryJanepourscoffeefortheLastcustomer.'), 0.6)
+        self.assertLess(page_quality('\n'.join(['MARY' + ' ' * 40 + 'BOB  Hello there friend, how are you doing today '
+                                                 + ' ' * 8 + 'Fine thanks'] * 5)), 0.6)
+        self.assertLess(page_quality('Mary pours coffee. EXT. PARKING LOT - NIGHT Bob waits.'), 0.6)
+
+    def test_low_quality_pages_use_fallback_engine(self):
+        """Test only pages PyPDF2 garbles are extracted again, and the engine is reported per page"""
+        from PyPDF2._page import PageObject
+        original = PageObject.extract_text
+
+        def glued(page, *args, **kwargs):
+            text = original(page, *args, **kwargs)
+            return text.replace(' ', '') if 'coffee' in text else text
+
+        with patch.object(PageObject, 'extract_text', glued):
+            document = extract_pdf_document(self.pdf_path)
+
+        self.assertEqual(document['text'], 'INT. DINER - NIGHT\nBob pours coffee.\nFADE OUT.')
+        self.assertEqual([page['engine'] for page in document['pages']], ['pypdf2', 'pdfplumber', 'pypdf2'])
+        self.assertEqual(document['engines'], {'pypdf2': 2, 'pdfplumber': 1})
+        # The engine comes back with cached pages too
+        self.assertEqual(extract_pdf_document(self.pdf_path)['engines'], {'pypdf2': 2, 'pdfplumber': 1})
+
+    def test_page_cache_evicts_least_recently_used(self):
+        """Test the cache stays under its size limit"""
+        cache = PageCache(os.path.join(self.temp_dir.name, 'small.db'), max_bytes=10)
+        cache.put_pages('old', {0: {'text': 'aaaaaa', 'engine': 'pypdf2', 'quality': 1.0}})
+        cache.put_pages('new', {0: {'text': 'bbbbbb', 'engine': 'pdfplumber', 'quality': 0.9}})
+
+        self.assertEqual(cache.get_pages('old', 1), {})
+        self.assertEqual(cache.get_pages('new', 1), {0: {'text': 'bbbbbb', 'engine': 'pdfplumber', 'quality': 0.9}})
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
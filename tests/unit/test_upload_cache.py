@@ -0,0 +1,59 @@
+"""
+Unit tests for upload_cache.py
+"""
+
+import unittest
+import hashlib
+import io
+import os
+import sys
+import tempfile
+
+# Add the parent directory to sys.path to import utils
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from utils.upload_cache import UploadCache, spool_upload
+
+
+class TestUploadCache(unittest.TestCase):
+    """Test cases for upload hashing and the extraction dedupe cache"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache = UploadCache(os.path.join(self.temp_dir.name, 'upload_cache.db'))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_spool_upload_hashes_stream(self):
+        """Test the spooled copy matches the stream and its SHA-256"""
+        data = b'INT. DINER - NIGHT\n' * 1000
+        spool, file_hash, size = spool_upload(io.BytesIO(data), chunk_size=100)
+
+        self.assertEqual(file_hash, hashlib.sha256(data).hexdigest())
+        self.assertEqual(size, len(data))
+        self.assertEqual(spool.read(), data)
+
+    def test_roundtrip_by_hash_and_format(self):
+        """Test cached uploads come back only for the same hash and format"""
+        self.cache.put('abc', 'text', 'INT. DINER - NIGHT', {'detected_scenes': 3, 'extraction': None})
+
+        self.assertEqual(self.cache.get('abc', 'text'),
+                         {'text': 'INT. DINER - NIGHT', 'detected_scenes': 3, 'extraction': None})
+        self.assertIsNone(self.cache.get('abc', 'fountain'))
+        self.assertEqual(self.cache.stats()['hits'], 1)
+        self.assertEqual(self.cache.stats()['misses'], 1)
+
+    def test_evicts_least_recently_used(self):
+        """Test the cache stays under its size limit"""
+        cache = UploadCache(os.path.join(self.temp_dir.name, 'small.db'), max_bytes=60)
+        cache.put('old', 'text', 'a' * 30, {})
+        cache.put('new', 'text', 'b' * 30, {})
+
+        self.assertIsNone(cache.get('old', 'text'))
+        self.assertIsNotNone(cache.get('new', 'text'))
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+"""
+Unit tests for upload_job.py
+"""
+
+import unittest
+import fcntl
+import os
+import sys
+import tempfile
+from unittest.mock import patch
+
+# Add the parent directory to sys.path to import utils
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from utils.upload_job import extraction_status, recover_uploads, run_upload_job
+from utils.upload_cache import UploadCache
+from utils.status_tracker import StatusTracker
+from utils.project_store import ProjectStore, ProjectMapping
+
+SCRIPT = """INT. KITCHEN - DAY
+
+Anna makes coffee.
+
+EXT. STREET - NIGHT
+
+Anna runs from a car."""
+
+
+class TestUploadJob(unittest.TestCase):
+    """Test cases for background upload extraction"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache = UploadCache(os.path.join(self.temp_dir.name, 'upload_cache.db'))
+        self.cache_patch = patch('utils.upload_job.get_upload_cache', return_value=self.cache)
+        self.cache_patch.start()
+        self.statuses = StatusTracker()
+        self.projects = {}
+
+    def tearDown(self):
+        self.cache_patch.stop()
+        self.temp_dir.cleanup()
+
+    def start_upload(self, project_id, content, **fields):
+        """Save an upload the way /upload does and publish its 'extracting' status"""
+        filepath = os.path.join(self.temp_dir.name, f'{project_id}.txt')
+        with open(filepath, 'w') as f:
+            f.write(content)
+        self.projects[project_id] = dict({'id': project_id, 'filename': 'draft.txt', 'text': '',
+                                          'format': 'text', 'file_hash': project_id, 'status': 'extracting'},
+                                         **fields)
+        self.statuses[project_id] = extraction_status()
+        return filepath
+
+    def test_extraction_completes_project(self):
+        """Test the project gets its text and the status carries the upload summary"""
+        filepath = self.start_upload('draft-1', SCRIPT)
+        run_upload_job('draft-1', filepath, self.projects, self.statuses)
+
+        status = self.statuses['draft-1']
+        self.assertEqual(status['status'], 'extracted')
+        self.assertEqual(status['progress'], 100)
+        self.assertEqual(status['upload']['word_count'], self.projects['draft-1']['word_count'])
+        self.assertEqual(self.projects['draft-1']['text'], SCRIPT)
+        self.assertEqual(self.projects['draft-1']['status'], 'ready')
+        self.assertFalse(os.path.exists(filepath))
+        # The result is cached for re-uploads of the same file
+        self.assertEqual(self.cache.get('draft-1', 'text')['text'], SCRIPT)
+
+    def test_revised_draft_is_diffed(self):
+        """Test a revised draft reports changed scenes against the project it replaces"""
+        self.projects['draft-1'] = {'id': 'draft-1', 'text': SCRIPT}
+        filepath = self.start_upload('draft-2', SCRIPT.replace('runs from', 'jumps over'), revision_of='draft-1')
+        run_upload_job('draft-2', filepath, self.projects, self.statuses)
+
+        self.assertEqual(self.statuses['draft-2']['upload']['revision'],
+                         {'unchanged_scenes': 1, 'changed_scenes': 1, 'removed_scenes': 1})
+
+    def test_failed_extraction_is_reported(self):
+        """Test an upload without text ends in an error status"""
+        filepath = self.start_upload('empty', '')
+        run_upload_job('empty', filepath, self.projects, self.statuses)
+
+        self.assertEqual(self.statuses['empty']['status'], 'error')
+        self.assertEqual(self.statuses['empty']['error'], 'Could not extract text from file')
+        self.assertEqual(self.projects['empty']['status'], 'error')
+        self.assertFalse(os.path.exists(filepath))
+
+
+    def test_interrupted_extractions_recovered_on_startup(self):
+        """Test a restarted server re-extracts uploads left 'extracting' and fails those without a file"""
+        store = ProjectStore(os.path.join(self.temp_dir.name, 'projects.db'))
+        self.projects, self.statuses = ProjectMapping(store), StatusTracker(store)
+        kept = self.start_upload('kept', SCRIPT)
+        self.projects['kept'] = dict(self.projects['kept'], upload_path=kept)
+        lost = self.start_upload('lost', SCRIPT, upload_path=os.path.join(self.temp_dir.name, 'gone.txt'))
+        os.remove(lost)
+
+        # A fresh process sees only what the store kept
+        projects, statuses = ProjectMapping(ProjectStore(store.db_path)), StatusTracker(ProjectStore(store.db_path))
+        submitted = []
+        self.assertEqual(recover_uploads(store, projects, statuses, lambda *job: submitted.append(job)), 1)
+        self.assertEqual(statuses['lost']['status'], 'error')
+        self.assertEqual(projects['lost']['status'], 'error')
+
+        for job, *args in submitted:
+            job(*args)
+        self.assertEqual(statuses['kept']['status'], 'extracted')
+        self.assertEqual(projects['kept']['text'], SCRIPT)
+        self.assertNotIn('upload_path', projects['kept'])
+        self.assertFalse(os.path.exists(kept))
+
+    def test_upload_extracted_once(self):
+        """Test an upload another job holds (or already finished) isn't extracted again"""
+        filepath = self.start_upload('draft-1', SCRIPT)
+        with open(filepath, 'rb') as held, patch('utils.upload_job.extract_upload') as extract:
+            fcntl.flock(held, fcntl.LOCK_EX)
+            run_upload_job('draft-1', filepath, self.projects, self.statuses)
+            extract.assert_not_called()
+        self.assertEqual(self.statuses['draft-1']['status'], 'extracting')
+
+        run_upload_job('draft-1', filepath, self.projects, self.statuses)
+        with patch('utils.upload_job.extract_upload') as extract:
+            run_upload_job('draft-1', filepath, self.projects, self.statuses)
+            extract.assert_not_called()
+        self.assertEqual(self.statuses['draft-1']['status'], 'extracted')
+
+if __name__ == '__main__':
+    unittest.main()
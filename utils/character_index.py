@@ -0,0 +1,125 @@
+"""
+Inverted character index
+Maps each character name (CONT'D, V.O., O.S. variants folded together) to
+the lines and scenes it appears in, built once per script text so context
+lookups and per-scene character lists don't rescan the script
+"""
+
+import re
+from bisect import bisect_right
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+from utils import fountain_parser
+from utils.screenplay_index import ScriptCache, index_screenplay, SCENE_HEADING
+
+# Cue extensions folded into the bare name: JOHN (V.O.), JOHN (CONT'D), JOHN CONT'D
+_EXTENSION = re.compile(r"\s*(?:\([^)]*\)|\b(?:CONT'?D|CONTINUED|V\.?O\.?|O\.?S\.?|O\.?C\.?)(?=\W|$))", re.IGNORECASE)
+_TOKEN = re.compile(r"[A-Z0-9][A-Z0-9'.-]*")
+
+# Words that mark a line as describing what someone looks like
+DESCRIPTIVE_WORDS = ('young', 'old', 'tall', 'short', 'beard', 'hair', 'wearing', 'dressed',
+                     'looks', 'appears', 'age', 'years', 'man', 'woman', 'boy', 'girl')
+
+
+def normalize_name(name: str) -> str:
+    """Canonical character name: upper case, extensions and forced-cue marks removed"""
+    name = fountain_parser.character_name(name.replace('’', "'"))
+    return ' '.join(_EXTENSION.sub('', name.upper()).split())
+
+
+def _tokens(line: str) -> List[str]:
+    return [token.rstrip('.-') for token in _TOKEN.findall(line.upper())]
+
+
+class CharacterIndex:
+    """Names -> line numbers and scenes for one script, from a single pass over its lines"""
+
+    __slots__ = ('index', 'mentions', 'cues', 'scene_cues', '_scene_lines')
+
+    def __init__(self, text: str) -> None:
+        self.index = index_screenplay(text)
+        # Upper-case word -> sorted line numbers it occurs on
+        self.mentions: Dict[str, List[int]] = defaultdict(list)
+        # Normalized name -> line numbers of its character cues
+        self.cues: Dict[str, List[int]] = defaultdict(list)
+        # Scene index -> {normalized name: cue count}, in order of first cue
+        self.scene_cues: Dict[int, Dict[str, int]] = defaultdict(dict)
+        self._scene_lines = [slug['line'] for slug in self.index.sluglines]
+
+        for number in range(self.index.line_count):
+            for token in set(_tokens(self.index.line(number))):
+                self.mentions[token].append(number)
+
+        for element in fountain_parser.tokenize(text.split('\n')):
+            if element.type != fountain_parser.CHARACTER or SCENE_HEADING.match(element.text):
+                continue
+            name = normalize_name(element.text)
+            if not name or name.endswith(':'):
+                continue
+            self.cues[name].append(element.line)
+            scene = self.scene_of(element.line)
+            if scene is not None:
+                counts = self.scene_cues[scene]
+                counts[name] = counts.get(name, 0) + 1
+
+    def scene_of(self, line: int) -> Optional[int]:
+        """Scene (0-based) a line belongs to, or None before the first heading"""
+        position = bisect_right(self._scene_lines, line) - 1
+        return position if position >= 0 else None
+
+    def lines_for(self, name: str) -> List[int]:
+        """Sorted line numbers mentioning a character (as a cue or in action/dialogue)"""
+        tokens = _tokens(normalize_name(name))
+        if not tokens:
+            return []
+        postings = sorted((self.mentions.get(token, []) for token in tokens), key=len)
+        if len(tokens) == 1:
+            return postings[0]
+        # Multi-word names: every word on the line, in order
+        phrase = f" {' '.join(tokens)} "
+        return [number for number in postings[0]
+                if phrase in f" {' '.join(_tokens(self.index.line(number)))} "]
+
+    def scenes_for(self, name: str) -> List[int]:
+        """Scenes (0-based) a character appears in"""
+        scenes = {self.scene_of(number) for number in self.lines_for(name)}
+        return sorted(scene for scene in scenes if scene is not None)
+
+    def scene_characters(self, scene_index: int) -> List[str]:
+        """Speaking characters of a scene, most cues first"""
+        counts = self.scene_cues.get(scene_index, {})
+        return sorted(counts, key=counts.get, reverse=True)
+
+    def speaking_characters(self) -> Dict[str, int]:
+        """Every character with a cue and how many cues they have"""
+        return {name: len(lines) for name, lines in self.cues.items()}
+
+    def context(self, name: str, radius: int = 3) -> Optional[str]:
+        """Most descriptive line within `radius` lines of a mention, or None"""
+        best = None
+        for number in self.lines_for(name):
+            for nearby in range(max(0, number - radius), min(self.index.line_count, number + radius)):
+                line = self.index.line(nearby).strip()
+                if len(line) > len(best or '') and any(word in line.lower() for word in DESCRIPTIVE_WORDS):
+                    best = line
+        return best
+
+
+_character_indexes = ScriptCache(CharacterIndex)
+
+
+def index_characters(text: str) -> CharacterIndex:
+    """Character index for a script text, built once and reused"""
+    return _character_indexes.get(text or '')
+
+
+def find_character(character_database: Dict[str, Any], name: str) -> Optional[Any]:
+    """Database entry for a name, matching variants like 'John (V.O.)' to 'JOHN'"""
+    if name in character_database:
+        return character_database[name]
+    wanted = normalize_name(name)
+    for key, info in character_database.items():
+        if normalize_name(key) == wanted:
+            return info
+    return None
@@ -0,0 +1,198 @@
+"""
+Chunked, resumable uploads
+A client opens an upload session, sends the file in numbered chunks (each
+with its SHA-256) and completes the session. Each chunk is checked, then
+written straight to its offset in a part file on disk, so no request holds
+more than one chunk in memory and a dropped connection only costs the chunks
+that were missing
+"""
+
+import os
+import math
+import time
+import uuid
+import shutil
+import hashlib
+import tempfile
+from typing import Any, BinaryIO, Dict, Optional, Tuple
+
+from utils.project_store import DATA_DIR
+from utils.sqlite_db import SQLiteDatabase
+
+# Size of each chunk the client sends (must stay below MAX_CONTENT_LENGTH)
+UPLOAD_CHUNK_BYTES = int(float(os.getenv('SF_SIMPLE_UPLOAD_CHUNK_MB', '4')) * 1024 * 1024)
+# Largest file accepted through chunked uploads
+MAX_UPLOAD_BYTES = int(float(os.getenv('SF_SIMPLE_MAX_UPLOAD_MB', '200')) * 1024 * 1024)
+# Unfinished sessions untouched this long are discarded with their part files
+UPLOAD_SESSION_TTL_SECONDS = float(os.getenv('SF_SIMPLE_UPLOAD_SESSION_TTL_HOURS', '24')) * 3600
+UPLOAD_SESSIONS_PATH = os.getenv('SF_SIMPLE_UPLOAD_SESSIONS_PATH', os.path.join(DATA_DIR, 'upload_sessions.db'))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    upload_id TEXT PRIMARY KEY,
+    filename TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    chunk_size INTEGER NOT NULL,
+    total_chunks INTEGER NOT NULL,
+    revision_of TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS chunks (
+    upload_id TEXT NOT NULL,
+    chunk_index INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    PRIMARY KEY (upload_id, chunk_index)
+);
+
+CREATE INDEX IF NOT EXISTS idx_sessions_updated ON sessions(updated_at);
+"""
+
+
+class ChunkedUploadError(Exception):
+    """A rejected session or chunk request, with the HTTP status to answer it with"""
+
+    def __init__(self, message: str, status_code: int = 400, **details: Any) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+        self.details = details
+
+
+class UploadSessions(SQLiteDatabase):
+    """Upload sessions and received chunks in SQLite, chunk data in one part file per session"""
+
+    def __init__(self, parts_dir: str, db_path: str = UPLOAD_SESSIONS_PATH,
+                 chunk_size: int = UPLOAD_CHUNK_BYTES, max_bytes: int = MAX_UPLOAD_BYTES) -> None:
+        self.parts_dir = parts_dir
+        self.chunk_size = chunk_size
+        self.max_bytes = max_bytes
+        os.makedirs(parts_dir, exist_ok=True)
+        super().__init__(db_path, SCHEMA)
+
+    def part_path(self, upload_id: str) -> str:
+        return os.path.join(self.parts_dir, f'{upload_id}.part')
+
+    def create(self, filename: str, size: int, revision_of: Optional[str] = None) -> Dict[str, Any]:
+        """Open a session for a file of `size` bytes and preallocate its part file"""
+        if size <= 0:
+            raise ChunkedUploadError('File is empty')
+        if size > self.max_bytes:
+            raise ChunkedUploadError(f'File is larger than {self.max_bytes // (1024 * 1024)} MB', 413)
+        self.purge_expired()
+
+        upload_id = uuid.uuid4().hex
+        with open(self.part_path(upload_id), 'wb') as part:
+            part.truncate(size)
+        now = time.time()
+        with self.connection() as conn:
+            conn.execute(
+                'INSERT INTO sessions (upload_id, filename, size, chunk_size, total_chunks, revision_of, '
+                'created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (upload_id, filename, size, self.chunk_size, math.ceil(size / self.chunk_size), revision_of, now, now)
+            )
+        return self.get(upload_id)
+
+    def get(self, upload_id: str) -> Optional[Dict[str, Any]]:
+        """A session with the sorted indexes of its received chunks, or None"""
+        conn = self.connection()
+        row = conn.execute('SELECT * FROM sessions WHERE upload_id = ?', (upload_id,)).fetchone()
+        if row is None:
+            return None
+        received = [chunk['chunk_index'] for chunk in conn.execute(
+            'SELECT chunk_index FROM chunks WHERE upload_id = ? ORDER BY chunk_index', (upload_id,))]
+        return {
+            'upload_id': upload_id,
+            'filename': row['filename'],
+            'size': row['size'],
+            'chunk_size': row['chunk_size'],
+            'total_chunks': row['total_chunks'],
+            'revision_of': row['revision_of'],
+            'received': received
+        }
+
+    def _session(self, upload_id: str) -> Dict[str, Any]:
+        session = self.get(upload_id)
+        if session is None:
+            raise ChunkedUploadError('Upload session not found', 404)
+        return session
+
+    def write_chunk(self, upload_id: str, index: int, stream: BinaryIO,
+                    checksum: Optional[str] = None, piece_size: int = 64 * 1024) -> Dict[str, Any]:
+        """
+        Write chunk `index` from `stream` at its offset in the part file
+
+        The chunk is buffered and must have its exact expected length and,
+        when `checksum` is given, that SHA-256 before any byte reaches the
+        part file, so a bad resend never overwrites a chunk already received.
+        A resend without a checksum must match the chunk it replaces.
+        """
+        session = self._session(upload_id)
+        if not 0 <= index < session['total_chunks']:
+            raise ChunkedUploadError(f"Chunk index must be between 0 and {session['total_chunks'] - 1}")
+        offset = index * session['chunk_size']
+        expected = min(session['chunk_size'], session['size'] - offset)
+
+        digest = hashlib.sha256()
+        written = 0
+        with tempfile.SpooledTemporaryFile(max_size=session['chunk_size']) as buffer:
+            # Read one byte past the expected length to notice oversized chunks
+            while written <= expected:
+                piece = stream.read(min(piece_size, expected + 1 - written))
+                if not piece:
+                    break
+                if written + len(piece) > expected:
+                    raise ChunkedUploadError(f'Chunk {index} is longer than {expected} bytes')
+                digest.update(piece)
+                buffer.write(piece)
+                written += len(piece)
+            if written != expected:
+                raise ChunkedUploadError(f'Chunk {index} has {written} bytes, expected {expected}')
+            if checksum and checksum.lower() != digest.hexdigest():
+                raise ChunkedUploadError(f'Chunk {index} checksum mismatch', 422)
+            received = self.connection().execute(
+                'SELECT sha256 FROM chunks WHERE upload_id = ? AND chunk_index = ?', (upload_id, index)
+            ).fetchone()
+            if not checksum and received is not None and received['sha256'] != digest.hexdigest():
+                raise ChunkedUploadError(f'Chunk {index} was already received with different content', 409)
+
+            buffer.seek(0)
+            with open(self.part_path(upload_id), 'r+b') as part:
+                part.seek(offset)
+                shutil.copyfileobj(buffer, part, piece_size)
+
+        with self.connection() as conn:
+            conn.execute('INSERT OR REPLACE INTO chunks (upload_id, chunk_index, sha256) VALUES (?, ?, ?)',
+                         (upload_id, index, digest.hexdigest()))
+            conn.execute('UPDATE sessions SET updated_at = ? WHERE upload_id = ?', (time.time(), upload_id))
+            received = conn.execute('SELECT COUNT(*) FROM chunks WHERE upload_id = ?', (upload_id,)).fetchone()[0]
+        return {'upload_id': upload_id, 'chunk': index, 'received': received, 'total_chunks': session['total_chunks']}
+
+    def complete(self, upload_id: str) -> Tuple[Dict[str, Any], str, str]:
+        """Check every chunk arrived; returns (session, part file path, SHA-256 of the whole file)"""
+        session = self._session(upload_id)
+        missing = sorted(set(range(session['total_chunks'])) - set(session['received']))
+        if missing:
+            raise ChunkedUploadError(f'{len(missing)} chunks missing', 409, missing=missing[:100])
+
+        digest = hashlib.sha256()
+        with open(self.part_path(upload_id), 'rb') as part:
+            for piece in iter(lambda: part.read(1024 * 1024), b''):
+                digest.update(piece)
+        return session, self.part_path(upload_id), digest.hexdigest()
+
+    def discard(self, upload_id: str) -> None:
+        """Forget a session and delete its part file if it's still there"""
+        with self.connection() as conn:
+            conn.execute('DELETE FROM chunks WHERE upload_id = ?', (upload_id,))
+            conn.execute('DELETE FROM sessions WHERE upload_id = ?', (upload_id,))
+        if os.path.exists(self.part_path(upload_id)):
+            os.remove(self.part_path(upload_id))
+
+    def purge_expired(self, ttl_seconds: float = UPLOAD_SESSION_TTL_SECONDS) -> int:
+        """Discard sessions nobody has sent a chunk to within the TTL"""
+        expired = [row['upload_id'] for row in self.connection().execute(
+            'SELECT upload_id FROM sessions WHERE updated_at < ?', (time.time() - ttl_seconds,))]
+        for upload_id in expired:
+            self.discard(upload_id)
+        return len(expired)
@@ -0,0 +1,196 @@
+"""
+Streaming Fountain tokenizer
+Turns .fountain screenplays into typed elements (scene headings, action,
+character cues, parentheticals, dialogue, transitions) in one pass over the
+lines, so scenes and characters don't have to be re-guessed
+"""
+
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+SCENE_HEADING = 'scene_heading'
+ACTION = 'action'
+CHARACTER = 'character'
+PARENTHETICAL = 'parenthetical'
+DIALOGUE = 'dialogue'
+TRANSITION = 'transition'
+TITLE_PAGE = 'title_page'
+
+_HEADING = re.compile(r'^(?:INT\.?/EXT|INT/EXT|I/E|INT|EXT|EST)[.\s]', re.IGNORECASE)
+_SCENE_NUMBER = re.compile(r'\s*#[\w.-]+#\s*$')
+_TITLE_KEY = re.compile(r'^([A-Za-z][A-Za-z ]*):(.*)$')
+# A script only starts with a title page if its first line is one of these keys
+TITLE_PAGE_KEYS = ('title', 'credit', 'author', 'authors', 'source', 'draft date', 'date',
+                   'contact', 'copyright', 'notes', 'revision')
+_NOTE = re.compile(r'\[\[.*?\]\]')
+_INLINE_BONEYARD = re.compile(r'/\*.*?\*/')
+
+
+class FountainElement:
+    """One typed screenplay element with its 0-based line number and character offset"""
+
+    __slots__ = ('type', 'text', 'line', 'offset')
+
+    def __init__(self, type: str, text: str, line: int, offset: int) -> None:
+        self.type = type
+        self.text = text
+        self.line = line
+        self.offset = offset
+
+    def __repr__(self) -> str:
+        return f"FountainElement({self.type!r}, {self.text!r}, line={self.line})"
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, FountainElement) and (
+            (self.type, self.text, self.line, self.offset) == (other.type, other.text, other.line, other.offset)
+        )
+
+
+def _lines_with_next(lines: Iterable[str]) -> Iterator[Tuple[str, Optional[str]]]:
+    """Yield (line, next_line) pairs with one line of lookahead"""
+    iterator = iter(lines)
+    previous = next(iterator, None)
+    for line in iterator:
+        yield previous, line
+        previous = line
+    if previous is not None:
+        yield previous, None
+
+
+def character_name(cue: str) -> str:
+    """Name from a character cue without forcing '@', extensions like (V.O.) or dual-dialogue '^'"""
+    name = cue.strip().lstrip('@').rstrip('^').strip()
+    return name.split('(', 1)[0].strip()
+
+
+def _is_character_cue(line: str) -> bool:
+    name = character_name(line)
+    return bool(name) and name == name.upper() and any(char.isalpha() for char in name)
+
+
+def tokenize(lines: Iterable[str]) -> Iterator[FountainElement]:
+    """
+    Stream elements from Fountain source lines
+
+    Works on any iterable of lines (an open file or text.split('\\n')), keeping
+    only one line of lookahead. Notes, boneyard, sections and synopses are
+    skipped; the title page is emitted as 'Key: value' title_page elements.
+    """
+    offset = 0
+    previous_blank = True
+    in_dialogue = False
+    in_boneyard = False
+    in_title_page = None  # Decided by the first non-empty line
+
+    for number, (raw, next_raw) in enumerate(_lines_with_next(lines)):
+        line_offset = offset
+        offset += len(raw) + (0 if raw.endswith('\n') else 1)
+        line = raw.rstrip('\r\n')
+
+        # Boneyard /* ... */ may span lines; notes [[ ... ]] are dropped inline
+        if in_boneyard:
+            if '*/' not in line:
+                continue
+            line = line.split('*/', 1)[1]
+            in_boneyard = False
+        line = _NOTE.sub('', _INLINE_BONEYARD.sub('', line))
+        if '/*' in line:
+            line, in_boneyard = line.split('/*', 1)[0], True
+
+        stripped = line.strip()
+        next_stripped = next_raw.strip() if next_raw is not None else ''
+
+        if in_title_page is None and stripped:
+            match = _TITLE_KEY.match(stripped)
+            in_title_page = match is not None and match.group(1).strip().lower() in TITLE_PAGE_KEYS
+        if in_title_page:
+            if not stripped:
+                in_title_page = False
+            elif _TITLE_KEY.match(stripped) and not line[:1].isspace():
+                key, value = _TITLE_KEY.match(stripped).groups()
+                yield FountainElement(TITLE_PAGE, f"{key.strip()}: {value.strip()}".rstrip(), number, line_offset)
+            elif stripped:
+                yield FountainElement(TITLE_PAGE, stripped, number, line_offset)
+            continue
+
+        if not stripped:
+            previous_blank = True
+            in_dialogue = False
+            continue
+
+        # Sections, synopses and page breaks carry no screenplay content
+        if stripped.startswith('#') or stripped.startswith('='):
+            continue
+
+        if in_dialogue:
+            if stripped.startswith('(') and stripped.endswith(')'):
+                yield FountainElement(PARENTHETICAL, stripped, number, line_offset)
+            else:
+                yield FountainElement(DIALOGUE, stripped, number, line_offset)
+            previous_blank = False
+            continue
+
+        element_type = ACTION
+        text = stripped
+        if stripped.startswith('!'):
+            text = stripped[1:].strip()
+        elif stripped.startswith('@'):
+            element_type = CHARACTER
+        elif stripped.startswith('.') and not stripped.startswith('..'):
+            element_type, text = SCENE_HEADING, stripped[1:].strip()
+        elif stripped.startswith('>') and not stripped.endswith('<'):
+            element_type, text = TRANSITION, stripped[1:].strip()
+        elif stripped.startswith('>') and stripped.endswith('<'):
+            text = stripped[1:-1].strip()  # Centered text
+        elif stripped.startswith('~'):
+            text = stripped[1:].strip()  # Lyrics
+        elif previous_blank and _HEADING.match(stripped + ' '):
+            element_type = SCENE_HEADING
+        elif previous_blank and not next_stripped and stripped.isupper() and stripped.endswith('TO:'):
+            element_type = TRANSITION
+        elif previous_blank and next_stripped and _is_character_cue(stripped):
+            element_type = CHARACTER
+
+        if element_type == SCENE_HEADING:
+            text = _SCENE_NUMBER.sub('', text)
+        elif element_type == CHARACTER:
+            text = character_name(stripped)
+            in_dialogue = True
+
+        yield FountainElement(element_type, text, number, line_offset)
+        previous_blank = False
+
+
+def parse_fountain(text: str) -> List[FountainElement]:
+    """All elements of a Fountain script"""
+    return list(tokenize(text.split('\n')))
+
+
+def split_scenes(elements: Iterable[FountainElement]) -> List[Tuple[FountainElement, List[FountainElement]]]:
+    """Group elements under their scene heading: [(heading, body elements)]; text before the first heading is dropped"""
+    scenes = []
+    for element in elements:
+        if element.type == SCENE_HEADING:
+            scenes.append((element, []))
+        elif scenes:
+            scenes[-1][1].append(element)
+    return scenes
+
+
+def character_cues(elements: Iterable[FountainElement]) -> Dict[str, int]:
+    """Speaking characters and how many cues each has, in order of first appearance"""
+    counts: Dict[str, int] = {}
+    for element in elements:
+        if element.type == CHARACTER:
+            counts[element.text] = counts.get(element.text, 0) + 1
+    return counts
+
+
+def title_page(elements: Iterable[FountainElement]) -> Dict[str, str]:
+    """Title page fields by lower-case key (title, credit, author, ...)"""
+    fields = {}
+    for element in elements:
+        if element.type == TITLE_PAGE and ':' in element.text:
+            key, value = element.text.split(':', 1)
+            fields[key.strip().lower()] = value.strip()
+    return fields
@@ -0,0 +1,269 @@
+"""
+Storyboard generation job
+Runs analysis + frame rendering for one project and records progress in a
+StatusTracker; jobs interrupted by a restart pick up where they stopped
+"""
+
+import contextvars
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, Optional
+
+from utils.scene_analyzer import fast_ai_analyze_screenplay
+from utils.fountain_parser import parse_fountain
+from utils.revisions import plan_revision, scene_budget, changed_script, merge_revision, carry_over_frames
+from utils.storyboard_generator import generate_ai_frame_sync, FRAME_CONCURRENCY
+from utils.openai_runtime import CancelScope, JobCancelledError, cancel_scope
+
+# Job states after which a job never runs again
+FINISHED_STATES = ('completed', 'error', 'cancelled')
+
+
+def run_generation_job(project_id: str, project: Dict[str, Any], prompt_style: str,
+                       statuses, frame_concurrency: int = FRAME_CONCURRENCY,
+                       scope: Optional[CancelScope] = None,
+                       previous_project: Optional[Dict[str, Any]] = None) -> None:
+    """
+    Analyze a project's screenplay and render its frames
+
+    Analysis and frames already persisted for the project (from a run that
+    was interrupted) are reused, so a resumed job only renders what's missing.
+    For a revised draft (`previous_project` is the draft it replaces) only
+    changed scenes are analyzed and rendered again.
+    Cancelling `scope` (or deleting the job's status) stops queued frames,
+    aborts in-flight API requests and marks the job cancelled.
+    """
+    scope = scope or CancelScope()
+
+    def check_cancelled() -> None:
+        status = statuses.get(project_id)
+        if scope.cancelled or status is None or status.get('status') == 'cancelled':
+            scope.cancel()
+            raise JobCancelledError("Job was cancelled")
+
+    try:
+        with cancel_scope(scope):
+            _run_job(project_id, project, prompt_style, statuses, frame_concurrency, check_cancelled,
+                     previous_project)
+    except JobCancelledError:
+        print(f"🛑 Generation cancelled for {project_id}")
+        statuses.update_status(
+            project_id,
+            status='cancelled',
+            current_step='Generation cancelled',
+            completed_at=datetime.now().isoformat()
+        )
+    except Exception as e:
+        statuses.update_status(
+            project_id,
+            status='error',
+            error=str(e),
+            current_step=f'Error: {str(e)}'
+        )
+    finally:
+        statuses.release(project_id)
+
+
+def _run_job(project_id: str, project: Dict[str, Any], prompt_style: str, statuses,
+             frame_concurrency: int, check_cancelled,
+             previous_project: Optional[Dict[str, Any]] = None) -> None:
+    """Job body; raises JobCancelledError as soon as cancellation is noticed"""
+    status = statuses.get(project_id)
+    if status is None or status.get('status') in FINISHED_STATES:
+        return
+    analysis = status.get('analysis')
+    # A user asking for a fresh take skips the image render cache
+    use_image_cache = not status.get('fresh_images', False)
+    # Frames of unchanged scenes carried over from the previous draft
+    carried_frames = {}
+
+    if analysis is None:
+        # Step 1: Fast targeted AI analysis using the scene count detected at upload
+        word_count = project['word_count']
+        if word_count > 20000:
+            current_step = 'Analyzing large script (optimized for speed)...'
+        elif word_count > 8000:
+            current_step = 'Analyzing medium script...'
+        else:
+            current_step = 'Analyzing script...'
+        statuses.update_status(project_id, status='analyzing', queue_position=None,
+                               current_step=current_step, progress=10)
+
+        statuses.update_status(
+            project_id,
+            current_step='Extracting characters and story beats with AI...',
+            progress=20
+        )
+
+        # A revised draft only sends changed scenes through analysis
+        previous_status = statuses.get(previous_project['id']) if previous_project else None
+        if previous_status is not None and previous_status.get('analysis'):
+            analysis = _revise_analysis(project, previous_project, previous_status['analysis'])
+            # Frames carry over only when they were drawn in the same style and no fresh take was asked for
+            if use_image_cache and previous_status.get('style') == status.get('style'):
+                carried_frames = carry_over_frames(statuses.saved_frames(previous_project['id']),
+                                                   analysis['scenes'], previous_project['id'])
+        else:
+            # Fountain scripts state their structure; parse it instead of guessing
+            elements = parse_fountain(project['text']) if project.get('format') == 'fountain' else None
+            analysis = fast_ai_analyze_screenplay(project['text'], project['detected_scenes'], elements)
+
+        statuses.update_status(
+            project_id,
+            current_step=f'Analysis complete! Ready to generate {analysis["total_scenes"]} scenes!',
+            progress=30,
+            analysis=analysis
+        )
+
+        print(f"📊 Analysis complete: {analysis['total_scenes']} scenes, {len(analysis['characters'])} characters")
+    else:
+        print(f"♻️ Resuming {project_id} with saved analysis ({analysis['total_scenes']} scenes)")
+
+    check_cancelled()
+
+    # Step 2: Generate frames with live updates
+    statuses.update_status(
+        project_id,
+        status='generating',
+        queue_position=None,
+        current_step=f'Starting frame generation for {analysis["total_scenes"]} scenes...',
+        current_step_num=2,
+        progress=40
+    )
+
+    # Frames saved before an interrupted run are kept and not rendered again
+    saved_frames = {frame['frame_id']: frame for frame in statuses.saved_frames(project_id)}
+    frames = []
+
+    try:
+        # Flatten scenes into an ordered list of frame jobs based on intelligent analysis
+        frame_jobs = [
+            (scene, frame_num + 1)
+            for scene in analysis['scenes']
+            for frame_num in range(scene.get('frames_needed', 1))
+        ]
+        total_frames_needed = len(frame_jobs)
+        max_workers = max(1, min(frame_concurrency, total_frames_needed))
+
+        # Results are slotted by job index; frames are published as an ordered
+        # prefix so the status 'frames' list always stays in scene/frame order
+        results = [None] * total_frames_needed
+        finished = [False] * total_frames_needed
+        pending = []
+        for index, (scene, frame_number) in enumerate(frame_jobs):
+            frame_id = f"frame_{scene['scene_number']}_{frame_number}"
+            saved = saved_frames.get(frame_id)
+            if saved is None and frame_id in carried_frames:
+                saved = carried_frames[frame_id]
+                statuses.record_frame(project_id, index, saved)
+            if saved is not None:
+                results[index] = saved
+                finished[index] = True
+            else:
+                pending.append(index)
+
+        published = 0
+        completed_count = total_frames_needed - len(pending)
+        while published < total_frames_needed and finished[published]:
+            frames.append(results[published])
+            published += 1
+
+        print(f"🎬 Intelligent generation: {len(pending)} of {total_frames_needed} frames to render ({max_workers} in parallel)")
+
+        statuses.update_status(project_id, current_frame=completed_count,
+                               total_frames=total_frames_needed, frames=frames.copy())
+
+        def render_frame(*args, **kwargs):
+            # A frame still waiting for a thread doesn't start once the job is cancelled
+            check_cancelled()
+            return generate_ai_frame_sync(*args, **kwargs)
+
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='frame-gen') as executor:
+            # Each frame runs in a copy of this context so its API calls join the job's cancel scope
+            futures = {
+                executor.submit(contextvars.copy_context().run, render_frame,
+                                frame_jobs[index][0], frame_jobs[index][1], prompt_style, analysis,
+                                use_cache=use_image_cache): index
+                for index in pending
+            }
+
+            for future in as_completed(futures):
+                try:
+                    check_cancelled()
+                except JobCancelledError:
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    raise
+
+                index = futures[future]
+                scene, frame_number = frame_jobs[index]
+                completed_count += 1
+
+                try:
+                    results[index] = future.result()
+                    statuses.record_frame(project_id, index, results[index])
+                    print(f"   ✅ Generated frame {completed_count}/{total_frames_needed}: {results[index]['frame_id']} ({scene.get('scene_type', 'dialogue')})")
+                except JobCancelledError:
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    raise
+                except Exception as frame_error:
+                    print(f"   ❌ Frame {index + 1} failed: {frame_error}")
+                    # Continue with other frames
+                finished[index] = True
+
+                while published < total_frames_needed and finished[published]:
+                    if results[published] is not None:
+                        frames.append(results[published])
+                    published += 1
+
+                # Update frames in real-time
+                statuses.update_status(
+                    project_id,
+                    current_step=f'Generated frame {completed_count} of {total_frames_needed} - Scene {scene["scene_number"]}.{frame_number}: {scene.get("location", "Unknown")}',
+                    progress=45 + (completed_count / total_frames_needed * 50),  # 45% to 95%
+                    current_frame=completed_count,
+                    total_frames=total_frames_needed,
+                    frames=frames.copy()
+                )
+
+    except JobCancelledError:
+        raise
+    except Exception as gen_error:
+        print(f"❌ Generation loop failed: {gen_error}")
+        statuses.update_status(project_id, status='error', error=str(gen_error))
+        return
+
+    check_cancelled()
+    print(f"🎉 Generation complete: {len(frames)} frames")
+
+    # Step 3: Complete
+    statuses.update_status(
+        project_id,
+        current_step=f'Generation complete! Created {len(frames)} frames.',
+        current_step_num=3,
+        status='completed',
+        progress=100,
+        frames=frames,
+        completed_at=datetime.now().isoformat()
+    )
+
+
+def _revise_analysis(project: Dict[str, Any], previous_project: Dict[str, Any],
+                     previous_analysis: Dict[str, Any]) -> Dict[str, Any]:
+    """Analysis of a revised draft: unchanged scenes are reused, only changed ones go to the model"""
+    plan = plan_revision(previous_analysis, previous_project['text'], project['text'])
+    budget = scene_budget(plan, project['detected_scenes'])
+    print(f"♻️ Revised draft of {previous_project['id']}: {len(plan['reused'])} scenes reused, "
+          f"{len(plan['changed'])} changed or new, selecting {budget} of them")
+
+    partial_analysis = None
+    if budget:
+        partial_text = changed_script(project['text'], plan)
+        elements = parse_fountain(partial_text) if project.get('format') == 'fountain' else None
+        partial_analysis = fast_ai_analyze_screenplay(partial_text, budget, elements)
+
+    analysis = merge_revision(previous_analysis, plan, project['text'], partial_analysis)
+    if not analysis['scenes']:
+        # Nothing survived the rewrite; analyze the new draft as a whole
+        elements = parse_fountain(project['text']) if project.get('format') == 'fountain' else None
+        return fast_ai_analyze_screenplay(project['text'], project['detected_scenes'], elements)
+    return analysis
@@ -0,0 +1,91 @@
+"""
+Render cache for generated frame images
+Maps (model, size, quality, sanitized prompt) to the stored image, so a
+retried job, the same script in the same style, or a repeated shot reuses
+the image instead of calling the image API again
+"""
+
+import os
+import json
+import time
+import hashlib
+from typing import Any, Dict, Optional
+
+from utils.project_store import DATA_DIR
+from utils.sqlite_db import SQLiteCache, process_wide
+from utils.image_store import IMAGE_URL_PREFIX, resolve_image_path
+
+IMAGE_CACHE_ENABLED = os.getenv('SF_SIMPLE_IMAGE_CACHE', 'true').lower() == 'true'
+IMAGE_CACHE_PATH = os.getenv('SF_SIMPLE_IMAGE_CACHE_PATH', os.path.join(DATA_DIR, 'image_cache.db'))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS renders (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    size TEXT NOT NULL,
+    quality TEXT NOT NULL,
+    prompt TEXT NOT NULL,
+    image_url TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_used_at REAL NOT NULL
+);
+"""
+
+
+def render_key(model: str, size: str, quality: str, prompt: str) -> str:
+    """SHA-256 of the parameters that determine a rendered image"""
+    canonical = json.dumps([model, size, quality, prompt], separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class ImageCache(SQLiteCache):
+    """Render parameters -> stored image URL, shared by all processes through SQLite"""
+
+    def __init__(self, db_path: str = IMAGE_CACHE_PATH) -> None:
+        super().__init__(db_path, SCHEMA, 'renders', ('key',), enabled=IMAGE_CACHE_ENABLED)
+
+    def count(self, name: str) -> None:
+        """Bump a metric counter ('hits', 'misses' or 'bypassed')"""
+        with self.connection() as conn:
+            self._count(conn, name)
+
+    def get(self, model: str, size: str, quality: str, prompt: str) -> Optional[str]:
+        """URL of a previously rendered image, or None (counted as a miss)"""
+        key = render_key(model, size, quality, prompt)
+        with self.connection() as conn:
+            row = conn.execute('SELECT image_url FROM renders WHERE key = ?', (key,)).fetchone()
+            # The image file may have been cleaned up since it was cached
+            if row is not None and resolve_image_path(row['image_url'][len(IMAGE_URL_PREFIX):]) is None:
+                conn.execute('DELETE FROM renders WHERE key = ?', (key,))
+                row = None
+            if row is not None:
+                conn.execute('UPDATE renders SET last_used_at = ? WHERE key = ?', (time.time(), key))
+
+        self.count('hits' if row is not None else 'misses')
+        return row['image_url'] if row is not None else None
+
+    def put(self, model: str, size: str, quality: str, prompt: str, image_url: str) -> None:
+        """Remember the stored image for these render parameters (replacing an older take)"""
+        if not image_url.startswith(IMAGE_URL_PREFIX):
+            return  # Only images in our own store; API URLs expire
+
+        now = time.time()
+        with self.connection() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO renders '
+                '(key, model, size, quality, prompt, image_url, created_at, last_used_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (render_key(model, size, quality, prompt), model, size, quality, prompt, image_url, now, now)
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss/bypass counters across all processes"""
+        return dict(super().stats(), bypassed=self.counters().get('bypassed', 0))
+
+
+_image_cache = process_wide(ImageCache)
+
+
+def get_image_cache() -> ImageCache:
+    """Get the process-wide image cache, opening its database on first use"""
+    return _image_cache()
@@ -0,0 +1,81 @@
+"""
+Content-addressed on-disk image store
+Generated images are written once under static/generated/ by SHA-256 and
+referenced by short URLs instead of base64 data URIs
+"""
+
+import os
+import re
+import base64
+import hashlib
+import tempfile
+from typing import Optional
+
+# Where image files live and the URL prefix they are served under
+IMAGE_STORE_DIR = os.getenv(
+    'SF_SIMPLE_IMAGE_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'static', 'generated')
+)
+IMAGE_URL_PREFIX = '/generated/'
+
+IMAGE_MIMETYPES = {
+    'png': 'image/png',
+    'jpg': 'image/jpeg',
+    'webp': 'image/webp'
+}
+
+_IMAGE_NAME_PATTERN = re.compile(r'^([0-9a-f]{64})\.(png|jpg|webp)$')
+
+
+def _image_path(digest: str, extension: str) -> str:
+    """Sharded path for a digest, e.g. static/generated/ab/abcd....png"""
+    return os.path.join(IMAGE_STORE_DIR, digest[:2], f"{digest}.{extension}")
+
+
+def save_image_bytes(data: bytes, extension: str = 'png') -> str:
+    """
+    Store image bytes by content hash and return their URL
+
+    Identical images map to the same file, so a write only happens the
+    first time a given image is seen.
+    """
+    if extension not in IMAGE_MIMETYPES:
+        raise ValueError(f"Unsupported image type: {extension}")
+
+    digest = hashlib.sha256(data).hexdigest()
+    path = _image_path(digest, extension)
+
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temp file and rename so readers never see partial images
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as tmp_file:
+                tmp_file.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    return f"{IMAGE_URL_PREFIX}{digest}.{extension}"
+
+
+def save_b64_image(b64_data: str, extension: str = 'png') -> str:
+    """Decode a base64 image (as returned by the image API) and store it"""
+    return save_image_bytes(base64.b64decode(b64_data), extension)
+
+
+def resolve_image_path(name: str) -> Optional[str]:
+    """Map a served image name (<sha256>.<ext>) to its file, or None if invalid/missing"""
+    match = _IMAGE_NAME_PATTERN.match(name)
+    if not match:
+        return None
+
+    path = _image_path(match.group(1), match.group(2))
+    return path if os.path.exists(path) else None
+
+
+def get_image_mimetype(name: str) -> str:
+    """Mimetype for a served image name"""
+    return IMAGE_MIMETYPES.get(name.rsplit('.', 1)[-1], 'application/octet-stream')
@@ -0,0 +1,144 @@
+"""
+Generation job queue
+Jobs are queued in the shared SQLite database and claimed atomically by
+worker processes, so the web tier only enqueues and never runs generation
+"""
+
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+# Admission control: queued (not yet running) jobs accepted before returning 429
+MAX_QUEUED_JOBS = int(os.getenv('SF_SIMPLE_MAX_QUEUED_JOBS', '20'))
+# Retry-After sent with 429 responses
+QUEUE_RETRY_AFTER = int(os.getenv('SF_SIMPLE_QUEUE_RETRY_AFTER', '30'))
+# Running jobs whose worker stopped heartbeating this long ago are requeued
+STALE_JOB_SECONDS = float(os.getenv('SF_SIMPLE_STALE_JOB_SECONDS', '60'))
+
+
+class JobQueue:
+    """FIFO of generation jobs stored in the `job_queue` table of a ProjectStore"""
+
+    def __init__(self, store) -> None:
+        self.store = store
+
+    def _begin(self):
+        """Start a write transaction up front so concurrent claims can't interleave"""
+        conn = self.store.connection()
+        conn.execute('BEGIN IMMEDIATE')
+        return conn
+
+    def enqueue(self, project_id: str, prompt_style: str, max_queued: int = MAX_QUEUED_JOBS) -> Optional[int]:
+        """
+        Add a job to the back of the queue
+
+        Returns the job's 1-based queue position, None if the queue is full,
+        or 0 (leaving the queue untouched) if the project's job is already
+        running. Re-enqueueing a waiting project replaces its previous entry.
+        """
+        conn = self._begin()
+        try:
+            running = conn.execute(
+                "SELECT 1 FROM job_queue WHERE project_id = ? AND state = 'running'", (project_id,)
+            ).fetchone()
+            if running is not None:
+                conn.rollback()
+                return 0
+            conn.execute("DELETE FROM job_queue WHERE project_id = ? AND state = 'queued'", (project_id,))
+            queued = conn.execute("SELECT COUNT(*) FROM job_queue WHERE state = 'queued'").fetchone()[0]
+            if queued >= max_queued:
+                conn.rollback()
+                return None
+
+            conn.execute(
+                "INSERT INTO job_queue (project_id, prompt_style, state, enqueued_at) VALUES (?, ?, 'queued', ?)",
+                (project_id, prompt_style, time.time())
+            )
+            conn.commit()
+            return queued + 1
+        except Exception:
+            conn.rollback()
+            raise
+
+    def claim(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        """Take the oldest queued job for a worker, or None if the queue is empty"""
+        conn = self._begin()
+        try:
+            row = conn.execute(
+                "SELECT project_id, prompt_style FROM job_queue WHERE state = 'queued' "
+                "ORDER BY enqueued_at LIMIT 1"
+            ).fetchone()
+            if row is None:
+                conn.rollback()
+                return None
+
+            conn.execute(
+                "UPDATE job_queue SET state = 'running', claimed_by = ?, heartbeat_at = ? WHERE project_id = ?",
+                (worker_id, time.time(), row['project_id'])
+            )
+            conn.commit()
+            return {'project_id': row['project_id'], 'prompt_style': row['prompt_style']}
+        except Exception:
+            conn.rollback()
+            raise
+
+    def heartbeat(self, project_id: str, worker_id: str) -> None:
+        """Mark a claimed job as still being worked on"""
+        with self.store.connection() as conn:
+            conn.execute(
+                'UPDATE job_queue SET heartbeat_at = ? WHERE project_id = ? AND claimed_by = ?',
+                (time.time(), project_id, worker_id)
+            )
+
+    def finish(self, project_id: str, worker_id: str) -> None:
+        """Remove a job once its worker is done with it (unless it was re-enqueued meanwhile)"""
+        with self.store.connection() as conn:
+            conn.execute('DELETE FROM job_queue WHERE project_id = ? AND claimed_by = ?', (project_id, worker_id))
+
+    def dequeue(self, project_id: str) -> bool:
+        """Remove a job that hasn't started yet; returns False if it isn't waiting in the queue"""
+        with self.store.connection() as conn:
+            cursor = conn.execute(
+                "DELETE FROM job_queue WHERE project_id = ? AND state = 'queued'", (project_id,)
+            )
+            return cursor.rowcount > 0
+
+    def requeue_stale(self, stale_seconds: float = STALE_JOB_SECONDS) -> int:
+        """Put running jobs whose worker died back in the queue; returns how many"""
+        with self.store.connection() as conn:
+            cursor = conn.execute(
+                "UPDATE job_queue SET state = 'queued', claimed_by = NULL "
+                "WHERE state = 'running' AND heartbeat_at < ?",
+                (time.time() - stale_seconds,)
+            )
+            return cursor.rowcount
+
+    def position(self, project_id: str) -> Optional[int]:
+        """1-based position of a queued job, 0 if it's running, None if it isn't queued"""
+        conn = self.store.connection()
+        row = conn.execute(
+            'SELECT state, enqueued_at FROM job_queue WHERE project_id = ?', (project_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        if row['state'] != 'queued':
+            return 0
+        ahead = conn.execute(
+            "SELECT COUNT(*) FROM job_queue WHERE state = 'queued' AND enqueued_at < ?", (row['enqueued_at'],)
+        ).fetchone()[0]
+        return ahead + 1
+
+    def queued_ids(self) -> List[str]:
+        """Project ids waiting in the queue, front first"""
+        rows = self.store.connection().execute(
+            "SELECT project_id FROM job_queue WHERE state = 'queued' ORDER BY enqueued_at"
+        ).fetchall()
+        return [row['project_id'] for row in rows]
+
+    def stats(self) -> Dict[str, int]:
+        """Number of queued and running jobs"""
+        rows = self.store.connection().execute(
+            'SELECT state, COUNT(*) AS count FROM job_queue GROUP BY state'
+        ).fetchall()
+        counts = {row['state']: row['count'] for row in rows}
+        return {'queued': counts.get('queued', 0), 'running': counts.get('running', 0)}
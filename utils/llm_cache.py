@@ -0,0 +1,106 @@
+"""
+Persistent cache for chat completion responses
+Responses are stored in a SQLite file under the data directory, keyed by a
+hash of the request, so every web and worker process shares the same cache
+"""
+
+import os
+import json
+import time
+import hashlib
+from typing import Any, Dict, Optional
+from openai.types.chat import ChatCompletion
+
+from utils.project_store import DATA_DIR
+from utils.sqlite_db import SQLiteCache, process_wide
+
+LLM_CACHE_ENABLED = os.getenv('SF_SIMPLE_LLM_CACHE', 'true').lower() == 'true'
+LLM_CACHE_PATH = os.getenv('SF_SIMPLE_LLM_CACHE_PATH', os.path.join(DATA_DIR, 'llm_cache.db'))
+# Least recently used responses are evicted once the cache grows past this size
+LLM_CACHE_MAX_BYTES = int(float(os.getenv('SF_SIMPLE_LLM_CACHE_MAX_MB', '256')) * 1024 * 1024)
+# Entries older than this are ignored and removed (0 keeps them until evicted)
+LLM_CACHE_TTL_SECONDS = float(os.getenv('SF_SIMPLE_LLM_CACHE_TTL_SECONDS', '0'))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    response TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_used_at REAL NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses(last_used_at);
+"""
+
+
+def cache_key(request: Dict[str, Any]) -> str:
+    """
+    SHA-256 of a chat request's parameters
+
+    Covers the model, messages, response_format and any other argument
+    (temperature, max_tokens, ...) that changes the answer.
+    """
+    canonical = json.dumps(request, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class LLMCache(SQLiteCache):
+    """Size-bounded LRU cache of chat completions with an optional TTL"""
+
+    def __init__(self, db_path: str = LLM_CACHE_PATH, max_bytes: int = LLM_CACHE_MAX_BYTES,
+                 ttl_seconds: float = LLM_CACHE_TTL_SECONDS) -> None:
+        self.ttl_seconds = ttl_seconds
+        super().__init__(db_path, SCHEMA, 'responses', ('key',), max_bytes, LLM_CACHE_ENABLED)
+
+    def get(self, key: str) -> Optional[ChatCompletion]:
+        """Cached response for a key, or None (counted as a miss)"""
+        now = time.time()
+        with self.connection() as conn:
+            row = conn.execute('SELECT response, created_at FROM responses WHERE key = ?', (key,)).fetchone()
+            if row is not None and self.ttl_seconds and now - row['created_at'] > self.ttl_seconds:
+                conn.execute('DELETE FROM responses WHERE key = ?', (key,))
+                row = None
+
+            if row is None:
+                self._count(conn, 'misses')
+                return None
+
+            conn.execute('UPDATE responses SET last_used_at = ? WHERE key = ?', (now, key))
+            self._count(conn, 'hits')
+        return ChatCompletion.model_validate_json(row['response'])
+
+    def put(self, key: str, response: ChatCompletion) -> None:
+        """Store a response and evict least recently used entries beyond max_bytes"""
+        data = response.model_dump_json()
+        size = len(data.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+
+        now = time.time()
+        with self.connection() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO responses (key, model, response, size, created_at, last_used_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (key, response.model, data, size, now, now)
+            )
+            self._evict_over_budget(conn)
+
+    def clear(self) -> None:
+        """Drop every cached response and reset the counters"""
+        with self.connection() as conn:
+            conn.execute('DELETE FROM responses')
+            conn.execute('DELETE FROM counters')
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters (across all processes), current size and its limit"""
+        return dict(super().stats(), max_bytes=self.max_bytes)
+
+
+_llm_cache = process_wide(LLMCache)
+
+
+def get_llm_cache() -> LLMCache:
+    """Get the process-wide cache, opening its database on first use"""
+    return _llm_cache()
@@ -19,6 +19,8 @@ class ModelConfig:
             # Fast processing tasks - use fast models
             'prompt_sanitization': os.getenv('SANITIZATION_MODEL', 'o3-mini'),
             'basic_info_extraction': os.getenv('INFO_MODEL', 'gpt-4o'),
+            # Per-chunk scene notes for long scripts (map step of the map-reduce analysis)
+            'chunk_analysis': os.getenv('CHUNK_MODEL', 'gpt-4o-mini'),
             
             # Image generation - use image-specific model
             'image_generation': os.getenv('IMAGE_MODEL', 'gpt-image-1'),
@@ -78,7 +80,8 @@ class ModelConfig:
             'character_extraction': 'gpt-4o',
             'scene_analysis': 'gpt-4o',
             'prompt_sanitization': 'gpt-4o',
-            'basic_info_extraction': 'gpt-4o'
+            'basic_info_extraction': 'gpt-4o',
+            'chunk_analysis': 'gpt-4o'
         })
         print("🚀 Premium models enabled for maximum quality")
     
@@ -89,7 +92,8 @@ class ModelConfig:
             'character_extraction': 'o3-mini',
             'scene_analysis': 'o3-mini',
             'prompt_sanitization': 'o3-mini',
-            'basic_info_extraction': 'o3-mini'
+            'basic_info_extraction': 'o3-mini',
+            'chunk_analysis': 'o3-mini'
         })
         print("⚡ Fast models enabled for maximum speed")
     
@@ -100,7 +104,8 @@ class ModelConfig:
             'character_extraction': 'gpt-4o',
             'scene_analysis': 'gpt-4o',
             'prompt_sanitization': 'o3-mini',
-            'basic_info_extraction': 'gpt-4o-mini'
+            'basic_info_extraction': 'gpt-4o-mini',
+            'chunk_analysis': 'gpt-4o-mini'
         })
         print("⚖️ Balanced models enabled for optimal speed/quality")
     
@@ -0,0 +1,232 @@
+"""
+Shared async runtime for OpenAI calls
+One background event loop thread owns a pooled, keep-alive OpenAI client;
+synchronous callers submit coroutines to it instead of spinning up their own loop
+"""
+
+import os
+import atexit
+import asyncio
+import threading
+import contextlib
+import contextvars
+import concurrent.futures
+from typing import Any, Awaitable, Iterator, Optional, Set
+import httpx
+from openai import AsyncOpenAI
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Connection pool sizing for the shared client
+MAX_CONNECTIONS = int(os.getenv('SF_SIMPLE_OPENAI_MAX_CONNECTIONS', '20'))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv('SF_SIMPLE_OPENAI_MAX_KEEPALIVE', '10'))
+KEEPALIVE_EXPIRY = float(os.getenv('SF_SIMPLE_OPENAI_KEEPALIVE_EXPIRY', '60'))
+
+
+def http2_enabled() -> bool:
+    """HTTP/2 is used when requested and the optional `h2` package is installed"""
+    if os.getenv('SF_SIMPLE_OPENAI_HTTP2', 'true').lower() != 'true':
+        return False
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class JobCancelledError(Exception):
+    """Raised by run_sync() for calls made inside a cancelled CancelScope"""
+
+
+class CancelScope:
+    """
+    Group of runtime calls that can be aborted together (one per generation job)
+
+    Calls made through run_sync() while the scope is active are tracked;
+    cancel() cancels their tasks on the loop, which aborts the underlying HTTP
+    requests, and makes any later call in the scope fail immediately.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._futures: Set[concurrent.futures.Future] = set()
+        self._cancelled = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self) -> None:
+        """Abort every in-flight call in the scope"""
+        with self._lock:
+            self._cancelled.set()
+            futures = list(self._futures)
+        for future in futures:
+            future.cancel()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the scope is cancelled or the timeout expires"""
+        return self._cancelled.wait(timeout)
+
+    def _track(self, future: concurrent.futures.Future) -> None:
+        with self._lock:
+            self._futures.add(future)
+            cancelled = self.cancelled
+        if cancelled:
+            future.cancel()
+
+    def _untrack(self, future: concurrent.futures.Future) -> None:
+        with self._lock:
+            self._futures.discard(future)
+
+
+# Scope of the job running in the current thread (copied into worker threads explicitly)
+_current_scope: contextvars.ContextVar = contextvars.ContextVar('cancel_scope', default=None)
+
+
+@contextlib.contextmanager
+def cancel_scope(scope: CancelScope) -> Iterator[CancelScope]:
+    """Make run_sync() calls in this context belong to a scope"""
+    token = _current_scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _current_scope.reset(token)
+
+
+class AsyncRuntime:
+    """Process-wide event loop running in a daemon thread, plus the client it owns"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._client: Optional[AsyncOpenAI] = None
+
+    def _ensure_started(self) -> asyncio.AbstractEventLoop:
+        """Start the loop thread on first use"""
+        with self._lock:
+            if self._loop is None or self._loop.is_closed():
+                loop = asyncio.new_event_loop()
+                ready = threading.Event()
+
+                def run_loop() -> None:
+                    asyncio.set_event_loop(loop)
+                    loop.call_soon(ready.set)
+                    loop.run_forever()
+
+                self._thread = threading.Thread(target=run_loop, name='openai-runtime', daemon=True)
+                self._thread.start()
+                ready.wait()
+                self._loop = loop
+            return self._loop
+
+    def in_runtime_thread(self) -> bool:
+        """True when called from the runtime's own loop thread"""
+        return self._thread is not None and threading.current_thread() is self._thread
+
+    def submit(self, coro: Awaitable[Any]) -> concurrent.futures.Future:
+        """Schedule a coroutine on the runtime loop and return a thread-safe future"""
+        loop = self._ensure_started()
+        return asyncio.run_coroutine_threadsafe(coro, loop)
+
+    def run_sync(self, coro: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+        """
+        Run a coroutine on the runtime loop and block until it finishes
+
+        Inside a cancelled CancelScope this raises JobCancelledError, both for
+        new calls and for calls that were in flight when the scope was cancelled.
+        """
+        if self.in_runtime_thread():
+            coro.close()
+            raise RuntimeError("run_sync() cannot be called from the runtime loop thread")
+
+        scope = _current_scope.get()
+        if scope is not None and scope.cancelled:
+            coro.close()
+            raise JobCancelledError("Job was cancelled")
+
+        future = self.submit(coro)
+        if scope is not None:
+            scope._track(future)
+        try:
+            return future.result(timeout=timeout)
+        except concurrent.futures.TimeoutError:
+            # Cancel the task so its HTTP request is aborted instead of running on
+            future.cancel()
+            raise
+        except concurrent.futures.CancelledError:
+            raise JobCancelledError("Job was cancelled")
+        finally:
+            if scope is not None:
+                scope._untrack(future)
+
+    def get_client(self) -> AsyncOpenAI:
+        """Get the shared OpenAI client, creating it on first use"""
+        with self._lock:
+            if self._client is None:
+                api_key = os.getenv('OPENAI_API_KEY')
+                if not api_key:
+                    raise ValueError("OPENAI_API_KEY environment variable not set")
+
+                http_client = httpx.AsyncClient(
+                    http2=http2_enabled(),
+                    limits=httpx.Limits(
+                        max_connections=MAX_CONNECTIONS,
+                        max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                        keepalive_expiry=KEEPALIVE_EXPIRY
+                    )
+                )
+                # Retries are handled by utils.rate_limiter so every attempt is rate limited
+                self._client = AsyncOpenAI(api_key=api_key, http_client=http_client, max_retries=0)
+            return self._client
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """Close the shared client and stop the loop thread"""
+        with self._lock:
+            loop, thread, client = self._loop, self._thread, self._client
+            self._loop, self._thread, self._client = None, None, None
+
+        if loop is None or loop.is_closed():
+            return
+
+        if client is not None:
+            try:
+                asyncio.run_coroutine_threadsafe(client.close(), loop).result(timeout=timeout)
+            except Exception as e:
+                print(f"⚠️ Client cleanup warning: {e}")
+
+        loop.call_soon_threadsafe(loop.stop)
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=timeout)
+        if not loop.is_running():
+            loop.close()
+
+
+# Global runtime instance
+_runtime = AsyncRuntime()
+
+
+def get_runtime() -> AsyncRuntime:
+    """Get the process-wide async runtime"""
+    return _runtime
+
+
+def get_shared_client() -> AsyncOpenAI:
+    """Get the shared, connection-pooled OpenAI client"""
+    return _runtime.get_client()
+
+
+def run_sync(coro: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+    """Run a coroutine on the shared runtime from synchronous code"""
+    return _runtime.run_sync(coro, timeout=timeout)
+
+
+def shutdown_runtime() -> None:
+    """Close the shared client and stop the runtime thread"""
+    _runtime.shutdown()
+
+
+atexit.register(shutdown_runtime)
@@ -0,0 +1,82 @@
+"""
+Per-page cache for extracted PDF text
+Keyed by the SHA-256 of the file and the page number, so re-uploading the
+same PDF skips extraction and a file is only ever parsed once per page
+"""
+
+import os
+import time
+from typing import Any, Dict
+
+from utils.project_store import DATA_DIR
+from utils.sqlite_db import SQLiteCache, process_wide
+
+PAGE_CACHE_ENABLED = os.getenv('SF_SIMPLE_PAGE_CACHE', 'true').lower() == 'true'
+PAGE_CACHE_PATH = os.getenv('SF_SIMPLE_PAGE_CACHE_PATH', os.path.join(DATA_DIR, 'page_cache.db'))
+# Least recently used pages are evicted once the cache grows past this size
+PAGE_CACHE_MAX_BYTES = int(float(os.getenv('SF_SIMPLE_PAGE_CACHE_MAX_MB', '64')) * 1024 * 1024)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    file_hash TEXT NOT NULL,
+    page_number INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    engine TEXT NOT NULL DEFAULT 'pypdf2',
+    quality REAL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_used_at REAL NOT NULL,
+    PRIMARY KEY (file_hash, page_number)
+);
+
+CREATE INDEX IF NOT EXISTS idx_pages_last_used ON pages(last_used_at);
+"""
+
+# Columns added after a table was first created: (table, column, definition)
+MIGRATIONS = (
+    ('pages', 'engine', "TEXT NOT NULL DEFAULT 'pypdf2'"),
+    ('pages', 'quality', 'REAL'),
+)
+
+
+class PageCache(SQLiteCache):
+    """(file hash, page number) -> extracted text and the engine that produced it, shared through SQLite"""
+
+    def __init__(self, db_path: str = PAGE_CACHE_PATH, max_bytes: int = PAGE_CACHE_MAX_BYTES) -> None:
+        super().__init__(db_path, SCHEMA, 'pages', ('file_hash', 'page_number'), max_bytes, PAGE_CACHE_ENABLED,
+                         MIGRATIONS)
+
+    def get_pages(self, file_hash: str, page_count: int) -> Dict[int, Dict[str, Any]]:
+        """Cached pages of a file by page number ({'text', 'engine', 'quality'}); pages not returned count as misses"""
+        with self.connection() as conn:
+            rows = conn.execute(
+                'SELECT page_number, text, engine, quality FROM pages WHERE file_hash = ? AND page_number < ?',
+                (file_hash, page_count)
+            ).fetchall()
+            if rows:
+                conn.execute('UPDATE pages SET last_used_at = ? WHERE file_hash = ?', (time.time(), file_hash))
+            self._count(conn, 'hits', len(rows))
+            self._count(conn, 'misses', page_count - len(rows))
+        return {row['page_number']: {'text': row['text'], 'engine': row['engine'], 'quality': row['quality']}
+                for row in rows}
+
+    def put_pages(self, file_hash: str, pages: Dict[int, Dict[str, Any]]) -> None:
+        """Store extracted pages and evict least recently used pages beyond max_bytes"""
+        now = time.time()
+        with self.connection() as conn:
+            conn.executemany(
+                'INSERT OR REPLACE INTO pages '
+                '(file_hash, page_number, text, engine, quality, size, created_at, last_used_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                [(file_hash, number, page['text'], page['engine'], page.get('quality'),
+                  len(page['text'].encode('utf-8')), now, now) for number, page in pages.items()]
+            )
+            self._evict_over_budget(conn)
+
+
+_page_cache = process_wide(PageCache)
+
+
+def get_page_cache() -> PageCache:
+    """Get the process-wide page cache, opening its database on first use"""
+    return _page_cache()
@@ -0,0 +1,391 @@
+"""
+Durable SQLite store for projects, generation jobs and frames
+Runs in WAL mode so the generation thread can write while requests read
+"""
+
+import os
+import json
+import time
+import zlib
+import sqlite3
+from collections.abc import MutableMapping
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from utils.sqlite_db import SQLiteDatabase
+
+# Data directory shared by the SQLite databases
+DATA_DIR = os.getenv(
+    'SF_SIMPLE_DATA_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+)
+DB_PATH = os.getenv('SF_SIMPLE_DB_PATH', os.path.join(DATA_DIR, 'script_fury.db'))
+
+# Job states that mean work was still pending or in progress
+ACTIVE_JOB_STATES = ('queued', 'analyzing', 'generating')
+# Final state a job's own writes can't move it out of
+CANCELLED = 'cancelled'
+
+# Project columns stored natively; anything else goes into the `extra` JSON blob
+PROJECT_COLUMNS = ('filename', 'text', 'created_at', 'word_count', 'char_count', 'detected_scenes')
+
+# Script text at least this long is stored zlib-compressed (screenplays shrink ~4x)
+COMPRESS_TEXT_CHARS = int(os.getenv('SF_SIMPLE_COMPRESS_TEXT_CHARS', '1024'))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS projects (
+    id TEXT PRIMARY KEY,
+    filename TEXT,
+    text TEXT,
+    created_at TEXT,
+    word_count INTEGER,
+    char_count INTEGER,
+    detected_scenes INTEGER,
+    extra TEXT,
+    text_z BLOB
+);
+
+CREATE TABLE IF NOT EXISTS jobs (
+    project_id TEXT PRIMARY KEY,
+    status TEXT,
+    state TEXT NOT NULL,
+    analysis TEXT,
+    epoch INTEGER NOT NULL DEFAULT 0,
+    version INTEGER NOT NULL DEFAULT 0,
+    analysis_version INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL,
+    last_seen_at REAL
+);
+
+CREATE TABLE IF NOT EXISTS frames (
+    project_id TEXT NOT NULL,
+    frame_id TEXT NOT NULL,
+    ordinal INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (project_id, frame_id)
+);
+
+CREATE TABLE IF NOT EXISTS job_queue (
+    project_id TEXT PRIMARY KEY,
+    prompt_style TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'queued',
+    enqueued_at REAL NOT NULL,
+    claimed_by TEXT,
+    heartbeat_at REAL
+);
+
+CREATE INDEX IF NOT EXISTS idx_projects_created ON projects(created_at, id);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status);
+CREATE INDEX IF NOT EXISTS idx_frames_project ON frames(project_id, ordinal);
+CREATE INDEX IF NOT EXISTS idx_job_queue_state ON job_queue(state, enqueued_at);
+"""
+
+# Columns added after a table was first created: (table, column, definition)
+MIGRATIONS = (
+    ('jobs', 'last_seen_at', 'REAL'),
+    ('projects', 'text_z', 'BLOB'),
+    ('jobs', 'analysis_version', 'INTEGER NOT NULL DEFAULT 0'),
+)
+
+
+def compress_text(text: Optional[str]) -> tuple:
+    """Split script text into its (text, text_z) columns, compressing long text"""
+    if text is None or len(text) < COMPRESS_TEXT_CHARS:
+        return text, None
+    return None, zlib.compress(text.encode('utf-8'), 6)
+
+
+def decompress_text(text: Optional[str], text_z: Optional[bytes]) -> Optional[str]:
+    """Script text from its (text, text_z) columns"""
+    return zlib.decompress(text_z).decode('utf-8') if text_z is not None else text
+
+
+class ProjectStore(SQLiteDatabase):
+    """SQLite-backed persistence with one connection per thread"""
+
+    def __init__(self, db_path: str = DB_PATH) -> None:
+        super().__init__(db_path, SCHEMA, MIGRATIONS)
+
+    # Projects
+
+    def save_project(self, project: Dict[str, Any]) -> None:
+        """Insert or replace a project record"""
+        extra = {k: v for k, v in project.items() if k != 'id' and k not in PROJECT_COLUMNS}
+        text, text_z = compress_text(project.get('text'))
+        with self.connection() as conn:
+            conn.execute(
+                """INSERT OR REPLACE INTO projects
+                   (id, filename, text, created_at, word_count, char_count, detected_scenes, extra, text_z)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                (project['id'], *(text if column == 'text' else project.get(column) for column in PROJECT_COLUMNS),
+                 json.dumps(extra), text_z)
+            )
+
+    def get_project(self, project_id: str) -> Optional[Dict[str, Any]]:
+        """Load a project record, or None if it doesn't exist"""
+        row = self.connection().execute('SELECT * FROM projects WHERE id = ?', (project_id,)).fetchone()
+        return self._project_from_row(row) if row is not None else None
+
+    @staticmethod
+    def _project_from_row(row: sqlite3.Row) -> Dict[str, Any]:
+        """Project dict from a projects row (text is left out when the row doesn't select it)"""
+        project = {'id': row['id']}
+        for column in PROJECT_COLUMNS:
+            if column == 'text':
+                value = decompress_text(row['text'], row['text_z']) if 'text_z' in row.keys() else None
+            else:
+                value = row[column]
+            if value is not None:
+                project[column] = value
+        project.update(json.loads(row['extra'] or '{}'))
+        return project
+
+    def has_project(self, project_id: str) -> bool:
+        """Check whether a project exists without loading its text"""
+        row = self.connection().execute('SELECT 1 FROM projects WHERE id = ?', (project_id,)).fetchone()
+        return row is not None
+
+    def list_project_ids(self) -> List[str]:
+        """All project ids, oldest first"""
+        rows = self.connection().execute('SELECT id FROM projects ORDER BY created_at, id').fetchall()
+        return [row['id'] for row in rows]
+
+    def list_projects(self, after: Optional[Tuple[str, str]] = None, limit: int = 50,
+                      with_text: bool = False) -> List[Dict[str, Any]]:
+        """
+        One page of projects, oldest first
+
+        `after` is the (created_at, id) of the last project on the previous
+        page. Each project carries its job's state under 'job' (None if it
+        has none); script text is only read when `with_text` is set.
+        """
+        columns = 'p.id, p.filename, p.created_at, p.word_count, p.char_count, p.detected_scenes, p.extra'
+        if with_text:
+            columns += ', p.text, p.text_z'
+        query = f'SELECT {columns}, j.state AS job_state FROM projects p LEFT JOIN jobs j ON j.project_id = p.id'
+        params: List[Any] = []
+        if after is not None:
+            query += ' WHERE p.created_at > ? OR (p.created_at = ? AND p.id > ?)'
+            params += [after[0], after[0], after[1]]
+        query += ' ORDER BY p.created_at, p.id LIMIT ?'
+
+        page = []
+        for row in self.connection().execute(query, (*params, limit)):
+            project = self._project_from_row(row)
+            project['job'] = json.loads(row['job_state']) if row['job_state'] else None
+            page.append(project)
+        return page
+
+    def delete_project(self, project_id: str) -> None:
+        """Delete a project together with its job, frames and queue entry"""
+        with self.connection() as conn:
+            conn.execute('DELETE FROM projects WHERE id = ?', (project_id,))
+            self._delete_job_rows(conn, project_id)
+
+    # Jobs
+
+    def save_job(self, project_id: str, status: Dict[str, Any], epoch: int, version: int) -> None:
+        """Replace a project's job record and its frames"""
+        state = {k: v for k, v in status.items() if k not in ('analysis', 'frames')}
+        state['published_frames'] = len(status.get('frames') or [])
+        with self.connection() as conn:
+            conn.execute(
+                """INSERT OR REPLACE INTO jobs
+                   (project_id, status, state, analysis, epoch, version, analysis_version, updated_at, last_seen_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                (project_id, status.get('status'), json.dumps(state),
+                 json.dumps(status.get('analysis')), epoch, version, version, time.time(), time.time())
+            )
+            conn.execute('DELETE FROM frames WHERE project_id = ?', (project_id,))
+            conn.executemany(
+                'INSERT OR REPLACE INTO frames (project_id, frame_id, ordinal, data) VALUES (?, ?, ?, ?)',
+                [(project_id, frame.get('frame_id', str(index)), index, json.dumps(frame))
+                 for index, frame in enumerate(status.get('frames') or [])]
+            )
+
+    def update_job(self, project_id: str, fields: Dict[str, Any]) -> Optional[int]:
+        """
+        Merge field updates into a job record and bump its version
+
+        Returns the new version, or None if the job no longer exists or was
+        cancelled (a cancelled job only takes updates that keep it cancelled;
+        a new run starts through save_job()). The version is incremented in
+        the database so writers in different processes never reuse a
+        version. Frame data is saved by save_frame().
+        """
+        conn = self.connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT state, version FROM jobs WHERE project_id = ?', (project_id,)).fetchone()
+            if row is None:
+                conn.rollback()
+                return None
+
+            state = json.loads(row['state'])
+            if state.get('status') == CANCELLED and fields.get('status') != CANCELLED:
+                conn.rollback()
+                return None
+            state.update({k: v for k, v in fields.items() if k not in ('analysis', 'frames')})
+            if 'frames' in fields:
+                # Frames are saved one by one; remember how many are published in order
+                state['published_frames'] = len(fields['frames'] or [])
+            version = row['version'] + 1
+            conn.execute(
+                'UPDATE jobs SET status = ?, state = ?, version = ?, updated_at = ? WHERE project_id = ?',
+                (state.get('status'), json.dumps(state), version, time.time(), project_id)
+            )
+            if 'analysis' in fields:
+                conn.execute('UPDATE jobs SET analysis = ?, analysis_version = ? WHERE project_id = ?',
+                             (json.dumps(fields['analysis']), version, project_id))
+            conn.commit()
+            return version
+        except Exception:
+            conn.rollback()
+            raise
+
+    def touch_job(self, project_id: str, min_interval: float = 5.0) -> None:
+        """Record that a client is watching a job (throttled to one write per min_interval)"""
+        now = time.time()
+        with self.connection() as conn:
+            conn.execute(
+                'UPDATE jobs SET last_seen_at = ? WHERE project_id = ? AND (last_seen_at IS NULL OR last_seen_at < ?)',
+                (now, project_id, now - min_interval)
+            )
+
+    def last_seen(self, project_id: str) -> Optional[float]:
+        """When a client last watched a job (defaults to when the job was saved)"""
+        row = self.connection().execute(
+            'SELECT last_seen_at FROM jobs WHERE project_id = ?', (project_id,)
+        ).fetchone()
+        return row['last_seen_at'] if row is not None else None
+
+    def get_job(self, project_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Load a job as a status dict plus its bookkeeping
+
+        Returns {'status': {...}, 'epoch': int, 'version': int,
+        'analysis_version': int} or None; analysis_version is the version
+        that last changed the analysis.
+        """
+        row = self.connection().execute('SELECT * FROM jobs WHERE project_id = ?', (project_id,)).fetchone()
+        if row is None:
+            return None
+
+        status = json.loads(row['state'])
+        status['analysis'] = json.loads(row['analysis']) if row['analysis'] else None
+        # Saved frames are in job order, so the published list is their prefix
+        published = status.pop('published_frames', None)
+        status['frames'] = self.get_frames(project_id)[:published]
+        return {'status': status, 'epoch': row['epoch'], 'version': row['version'],
+                'analysis_version': row['analysis_version']}
+
+    def get_job_version(self, project_id: str) -> Optional[tuple]:
+        """(epoch, version) of a job without loading it, or None if it doesn't exist"""
+        row = self.connection().execute(
+            'SELECT epoch, version FROM jobs WHERE project_id = ?', (project_id,)
+        ).fetchone()
+        return (row['epoch'], row['version']) if row is not None else None
+
+    def has_job(self, project_id: str) -> bool:
+        """Check whether a project has a job record"""
+        row = self.connection().execute('SELECT 1 FROM jobs WHERE project_id = ?', (project_id,)).fetchone()
+        return row is not None
+
+    def list_job_ids(self, states: Optional[tuple] = None) -> List[str]:
+        """Project ids that have a job, optionally filtered by job status"""
+        if states:
+            placeholders = ', '.join('?' for _ in states)
+            rows = self.connection().execute(
+                f'SELECT project_id FROM jobs WHERE status IN ({placeholders}) ORDER BY updated_at', states
+            ).fetchall()
+        else:
+            rows = self.connection().execute('SELECT project_id FROM jobs ORDER BY updated_at').fetchall()
+        return [row['project_id'] for row in rows]
+
+    def delete_job(self, project_id: str) -> None:
+        """Delete a job, its frames and its queue entry"""
+        with self.connection() as conn:
+            self._delete_job_rows(conn, project_id)
+
+    @staticmethod
+    def _delete_job_rows(conn: sqlite3.Connection, project_id: str) -> None:
+        conn.execute('DELETE FROM jobs WHERE project_id = ?', (project_id,))
+        conn.execute('DELETE FROM frames WHERE project_id = ?', (project_id,))
+        conn.execute('DELETE FROM job_queue WHERE project_id = ?', (project_id,))
+
+    # Frames
+
+    def save_frame(self, project_id: str, ordinal: int, frame: Dict[str, Any]) -> None:
+        """Persist one completed frame; ordinal is its position in the job's frame order"""
+        with self.connection() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO frames (project_id, frame_id, ordinal, data) VALUES (?, ?, ?, ?)',
+                (project_id, frame['frame_id'], ordinal, json.dumps(frame))
+            )
+
+    def get_frames(self, project_id: str) -> List[Dict[str, Any]]:
+        """All saved frames for a project in frame order"""
+        rows = self.connection().execute(
+            'SELECT data FROM frames WHERE project_id = ? ORDER BY ordinal', (project_id,)
+        ).fetchall()
+        return [json.loads(row['data']) for row in rows]
+
+    def list_frames(self, project_id: str, after: int = -1, limit: int = 50) -> List[Tuple[int, Dict[str, Any]]]:
+        """One page of a job's published frames as (ordinal, frame), after ordinal `after`"""
+        row = self.connection().execute('SELECT state FROM jobs WHERE project_id = ?', (project_id,)).fetchone()
+        if row is None:
+            return []
+        # Frames rendered out of order aren't published until the ones before them are.
+        # Failed frames leave gaps in the ordinals, so (as in get_job) the published
+        # list is the first `published_frames` saved frames, up to the last one's ordinal
+        published = json.loads(row['state']).get('published_frames')
+        last_ordinal = 2 ** 62
+        if published is not None:
+            if published <= 0:
+                return []
+            last = self.connection().execute(
+                'SELECT ordinal FROM frames WHERE project_id = ? ORDER BY ordinal LIMIT 1 OFFSET ?',
+                (project_id, published - 1)
+            ).fetchone()
+            if last is not None:
+                last_ordinal = last['ordinal']
+        rows = self.connection().execute(
+            'SELECT ordinal, data FROM frames WHERE project_id = ? AND ordinal > ? AND ordinal <= ? '
+            'ORDER BY ordinal LIMIT ?',
+            (project_id, after, last_ordinal, limit)
+        ).fetchall()
+        return [(row['ordinal'], json.loads(row['data'])) for row in rows]
+
+
+class ProjectMapping(MutableMapping):
+    """
+    Dict-style view of the projects table
+
+    Nothing is kept in memory: every lookup reads from SQLite, so memory no
+    longer grows with the number of projects ever uploaded.
+    """
+
+    def __init__(self, store: ProjectStore) -> None:
+        self.store = store
+
+    def __getitem__(self, project_id: str) -> Dict[str, Any]:
+        project = self.store.get_project(project_id)
+        if project is None:
+            raise KeyError(project_id)
+        return project
+
+    def __setitem__(self, project_id: str, project: Dict[str, Any]) -> None:
+        self.store.save_project(dict(project, id=project_id))
+
+    def __delitem__(self, project_id: str) -> None:
+        if not self.store.has_project(project_id):
+            raise KeyError(project_id)
+        self.store.delete_project(project_id)
+
+    def __contains__(self, project_id: object) -> bool:
+        return isinstance(project_id, str) and self.store.has_project(project_id)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.store.list_project_ids())
+
+    def __len__(self) -> int:
+        return len(self.store.list_project_ids())
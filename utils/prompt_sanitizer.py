@@ -9,6 +9,8 @@ from typing import Tuple, List, Dict, Any
 from openai import AsyncOpenAI
 from dotenv import load_dotenv
 from .model_config import get_model_for_task
+from .openai_runtime import get_shared_client, run_sync
+from .rate_limiter import chat_completion, moderate
 
 load_dotenv()
 
@@ -20,12 +22,9 @@ class AIPromptSanitizer:
         self.client = None
 
     def _get_client(self) -> AsyncOpenAI:
-        """Get OpenAI client for moderation."""
+        """Get the shared OpenAI client for moderation."""
         if self.client is None:
-            api_key = os.getenv('OPENAI_API_KEY')
-            if not api_key:
-                raise ValueError("OPENAI_API_KEY environment variable not set")
-            self.client = AsyncOpenAI(api_key=api_key)
+            self.client = get_shared_client()
         return self.client
 
     async def ai_sanitize_prompt(self, prompt: str) -> Tuple[str, List[str], bool]:
@@ -42,11 +41,11 @@ class AIPromptSanitizer:
             client = self._get_client()
             
             # Step 1: AI moderation check
-            moderation_response = await client.moderations.create(input=prompt)
+            moderation_response = await moderate(client, input=prompt)
             is_flagged = moderation_response.results[0].flagged
             
             # Step 2: AI-powered prompt cleaning and enhancement using configured model
-            sanitization_response = await client.chat.completions.create(
+            sanitization_response = await chat_completion(client,
                 model=get_model_for_task('prompt_sanitization'),
                 messages=[
                     {
@@ -124,7 +123,7 @@ Return a JSON object with:
         return prefix + prompt + suffix
 
     def sanitize_prompt_sync(self, prompt: str) -> Tuple[str, List[str], bool]:
-        """Synchronous wrapper for AI sanitization with proper cleanup."""
+        """Synchronous wrapper for AI sanitization on the shared async runtime."""
         try:
             # Check if we're already in an event loop
             try:
@@ -133,24 +132,8 @@ Return a JSON object with:
                 safe_prompt = self._add_storyboard_context(prompt, False)
                 return safe_prompt, ["Used basic sanitization (async conflict avoided)"], False
             except RuntimeError:
-                # No running loop, safe to create new one
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                
-                try:
-                    result = loop.run_until_complete(self.ai_sanitize_prompt(prompt))
-                    return result
-                finally:
-                    # CRITICAL: Close client connections before closing event loop
-                    if self.client:
-                        try:
-                            loop.run_until_complete(self.client.close())
-                            self.client = None  # Reset client after cleanup
-                        except Exception as e:
-                            print(f"⚠️ Client cleanup warning: {e}")
-                    
-                    # Always cleanup event loop
-                    loop.close()
+                # No running loop, submit to the shared async runtime
+                return run_sync(self.ai_sanitize_prompt(prompt))
                     
         except Exception as e:
             print(f"❌ Sync sanitization failed: {e}")
@@ -0,0 +1,423 @@
+"""
+Shared rate limiter for OpenAI calls
+Every chat, moderation and image request goes through one limiter per process:
+per-model requests/tokens-per-minute windows, adaptive (AIMD) concurrency and
+jittered retries that honour retry-after. The per-minute windows and 429
+pauses are also kept in SQLite, so the budget holds across all web and worker
+processes together
+"""
+
+import os
+import time
+import random
+import sqlite3
+import asyncio
+import email.utils
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+import openai
+from openai.types.chat import ChatCompletion
+from dotenv import load_dotenv
+from .llm_cache import LLM_CACHE_ENABLED, cache_key, get_llm_cache
+from .project_store import DATA_DIR
+from .sqlite_db import SQLiteDatabase
+
+# Load environment variables
+load_dotenv()
+
+# Default per-model budgets; override per model with
+# SF_SIMPLE_RATE_LIMITS="gpt-4o-mini=500:200000,gpt-image-1=50" (model=rpm[:tpm])
+DEFAULT_RPM = int(os.getenv('SF_SIMPLE_DEFAULT_RPM', '500'))
+DEFAULT_TPM = int(os.getenv('SF_SIMPLE_DEFAULT_TPM', '200000'))
+
+# Adaptive concurrency bounds per model
+INITIAL_CONCURRENCY = int(os.getenv('SF_SIMPLE_API_CONCURRENCY', '8'))
+MIN_CONCURRENCY = 1
+MAX_CONCURRENCY = int(os.getenv('SF_SIMPLE_API_MAX_CONCURRENCY', '32'))
+
+# Retries for throttled or transient failures
+MAX_RETRIES = int(os.getenv('SF_SIMPLE_API_MAX_RETRIES', '5'))
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 60.0
+
+# Completion tokens reserved for chat calls that don't set max_tokens
+DEFAULT_COMPLETION_TOKENS = 1000
+
+WINDOW_SECONDS = 60.0
+
+# Share the per-minute windows and 429 pauses between processes (otherwise each process gets the full budget)
+SHARED_RATE_LIMITS = os.getenv('SF_SIMPLE_SHARED_RATE_LIMITS', 'true').lower() == 'true'
+RATE_LIMIT_PATH = os.getenv('SF_SIMPLE_RATE_LIMIT_PATH', os.path.join(DATA_DIR, 'rate_limits.db'))
+
+SHARED_SCHEMA = """
+CREATE TABLE IF NOT EXISTS requests (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    model TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    tokens INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS pauses (
+    model TEXT PRIMARY KEY,
+    until REAL NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_requests_model ON requests(model, started_at);
+"""
+
+RETRYABLE_ERRORS = (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError)
+
+
+def parse_rate_limits(spec: str) -> Dict[str, Tuple[int, int]]:
+    """Parse 'model=rpm[:tpm],...' into {model: (rpm, tpm)}"""
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        try:
+            model, budget = item.split('=', 1)
+            rpm, _, tpm = budget.partition(':')
+            limits[model.strip()] = (int(rpm), int(tpm) if tpm else DEFAULT_TPM)
+        except ValueError:
+            print(f"⚠️ Ignoring invalid rate limit entry: {item}")
+    return limits
+
+
+def estimate_chat_tokens(kwargs: Dict[str, Any]) -> int:
+    """Rough token cost of a chat request (~4 characters per token plus the completion budget)"""
+    chars = sum(len(str(message.get('content', ''))) for message in kwargs.get('messages', []))
+    completion = kwargs.get('max_tokens') or kwargs.get('max_completion_tokens') or DEFAULT_COMPLETION_TOKENS
+    return chars // 4 + completion
+
+
+def get_retry_after(error: Exception) -> Optional[float]:
+    """Seconds the API asked us to wait, from retry-after-ms / retry-after headers"""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None)
+    if not headers:
+        return None
+
+    retry_after_ms = headers.get('retry-after-ms')
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000
+        except ValueError:
+            pass
+
+    retry_after = headers.get('retry-after')
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            parsed = email.utils.parsedate_to_datetime(retry_after)
+            if parsed is not None:
+                return max(0.0, parsed.timestamp() - time.time())
+    return None
+
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None) -> float:
+    """Full-jitter exponential backoff, never shorter than the server's retry-after"""
+    if retry_after is not None:
+        # Small jitter so throttled callers don't all come back in the same instant
+        return retry_after + random.uniform(0, min(1.0, retry_after * 0.1 + 0.1))
+    return random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** attempt)))
+
+
+class ModelLimiter:
+    """Sliding-window RPM/TPM budget plus AIMD concurrency for one model"""
+
+    def __init__(self, rpm: int, tpm: int) -> None:
+        self.rpm = rpm
+        self.tpm = tpm
+        self.concurrency = float(min(INITIAL_CONCURRENCY, MAX_CONCURRENCY))
+        self.in_flight = 0
+        self.throttled = 0
+        self._window: Deque[list] = deque()  # [timestamp, tokens] per request
+        self._tokens = 0
+        self._last_decrease = 0.0
+        self._changed: Optional[asyncio.Condition] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _condition(self) -> asyncio.Condition:
+        # Conditions belong to one loop; normally that's the shared runtime loop
+        loop = asyncio.get_running_loop()
+        if self._changed is None or self._loop is not loop:
+            self._changed = asyncio.Condition()
+            self._loop = loop
+        return self._changed
+
+    def _prune(self, now: float) -> None:
+        while self._window and now - self._window[0][0] >= WINDOW_SECONDS:
+            self._tokens -= self._window.popleft()[1]
+
+    def _wait_time(self, tokens: int, now: float) -> Optional[float]:
+        """
+        0 if a request fits now, seconds until the window frees enough room,
+        or None when every concurrency slot is taken (wait for a release)
+        """
+        self._prune(now)
+        if self.in_flight >= int(self.concurrency):
+            return None
+        if len(self._window) >= self.rpm:
+            return self._window[0][0] + WINDOW_SECONDS - now
+        if self._tokens + tokens > self.tpm and self._window:
+            # Free the oldest entries until the request fits
+            needed = self._tokens + tokens - self.tpm
+            for timestamp, used in self._window:
+                needed -= used
+                if needed <= 0:
+                    return timestamp + WINDOW_SECONDS - now
+        return 0
+
+    async def acquire(self, tokens: int) -> list:
+        """Wait for a concurrency slot and window budget, then reserve them"""
+        condition = self._condition()
+        async with condition:
+            while True:
+                now = time.monotonic()
+                wait = self._wait_time(tokens, now)
+                if wait == 0:
+                    break
+                try:
+                    await asyncio.wait_for(condition.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+
+            self.in_flight += 1
+            entry = [now, tokens]
+            self._window.append(entry)
+            self._tokens += tokens
+            return entry
+
+    async def release(self, entry: list, used_tokens: Optional[int], throttled: bool) -> None:
+        """Free the slot, correct the token estimate and adapt concurrency"""
+        condition = self._condition()
+        async with condition:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if used_tokens is not None and now - entry[0] < WINDOW_SECONDS:
+                self._tokens += used_tokens - entry[1]
+                entry[1] = used_tokens
+
+            if throttled:
+                self.throttled += 1
+                # Multiplicative decrease, at most once per second so one burst of 429s counts once
+                if now - self._last_decrease >= 1.0:
+                    self.concurrency = max(MIN_CONCURRENCY, self.concurrency / 2)
+                    self._last_decrease = now
+            else:
+                # Additive increase: roughly +1 slot per `concurrency` successful calls
+                self.concurrency = min(MAX_CONCURRENCY, self.concurrency + 1 / self.concurrency)
+            condition.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        self._prune(time.monotonic())
+        return {
+            'rpm_limit': self.rpm,
+            'tpm_limit': self.tpm,
+            'requests_in_window': len(self._window),
+            'tokens_in_window': self._tokens,
+            'concurrency': round(self.concurrency, 2),
+            'in_flight': self.in_flight,
+            'throttled': self.throttled
+        }
+
+
+class SharedWindow(SQLiteDatabase):
+    """Per-model RPM/TPM windows and 429 pauses shared by every process through SQLite"""
+
+    def __init__(self, db_path: str = RATE_LIMIT_PATH) -> None:
+        # Opened on first use, so importing the limiter doesn't touch the data directory
+        super().__init__(db_path, SHARED_SCHEMA, lazy=True)
+
+    def reserve(self, model: str, rpm: int, tpm: int, tokens: int) -> Tuple[float, Optional[int]]:
+        """
+        Reserve room for one request in the model's shared window
+
+        Returns (0, reservation id) when it fits, otherwise (seconds to wait,
+        None) until the window frees enough room or a 429 pause ends.
+        """
+        now = time.time()
+        conn = self.connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            pause = conn.execute('SELECT until FROM pauses WHERE model = ?', (model,)).fetchone()
+            if pause is not None and pause['until'] > now:
+                conn.rollback()
+                return pause['until'] - now, None
+
+            conn.execute('DELETE FROM requests WHERE model = ? AND started_at <= ?', (model, now - WINDOW_SECONDS))
+            window = conn.execute(
+                'SELECT started_at, tokens FROM requests WHERE model = ? ORDER BY started_at', (model,)
+            ).fetchall()
+            wait = 0.0
+            if len(window) >= rpm:
+                wait = window[0]['started_at'] + WINDOW_SECONDS - now
+            elif window and sum(row['tokens'] for row in window) + tokens > tpm:
+                # Free the oldest requests until this one fits
+                needed = sum(row['tokens'] for row in window) + tokens - tpm
+                for row in window:
+                    needed -= row['tokens']
+                    if needed <= 0:
+                        wait = row['started_at'] + WINDOW_SECONDS - now
+                        break
+            if wait > 0:
+                conn.rollback()
+                return wait, None
+
+            cursor = conn.execute('INSERT INTO requests (model, started_at, tokens) VALUES (?, ?, ?)',
+                                  (model, now, tokens))
+            conn.commit()
+            return 0.0, cursor.lastrowid
+        except Exception:
+            conn.rollback()
+            raise
+
+    def settle(self, reservation: int, tokens: int) -> None:
+        """Replace a reservation's estimated tokens with the usage the API reported"""
+        with self.connection() as conn:
+            conn.execute('UPDATE requests SET tokens = ? WHERE id = ?', (tokens, reservation))
+
+    def pause(self, model: str, seconds: float) -> None:
+        """Hold every process's requests for a model after a 429 (never shortens a longer pause)"""
+        with self.connection() as conn:
+            conn.execute(
+                'INSERT INTO pauses (model, until) VALUES (?, ?) '
+                'ON CONFLICT(model) DO UPDATE SET until = MAX(until, excluded.until)',
+                (model, time.time() + seconds)
+            )
+
+
+class RateLimiter:
+    """
+    Process-wide registry of per-model limiters; used from the shared runtime loop
+
+    With a SharedWindow the RPM/TPM budgets (and 429 pauses) apply to all
+    processes together; concurrency still adapts per process.
+    """
+
+    def __init__(self, limits: Optional[Dict[str, Tuple[int, int]]] = None,
+                 shared: Optional[SharedWindow] = None) -> None:
+        self.limits = limits if limits is not None else parse_rate_limits(os.getenv('SF_SIMPLE_RATE_LIMITS', ''))
+        self.shared = shared
+        self._models: Dict[str, ModelLimiter] = {}
+
+    def for_model(self, model: str) -> ModelLimiter:
+        limiter = self._models.get(model)
+        if limiter is None:
+            rpm, tpm = self.limits.get(model, (DEFAULT_RPM, DEFAULT_TPM))
+            limiter = self._models[model] = ModelLimiter(rpm, tpm)
+        return limiter
+
+    async def call(self, model: str, tokens: int, make_call: Callable[[], Awaitable[Any]],
+                   max_retries: int = MAX_RETRIES) -> Any:
+        """
+        Run an API call under the model's limits, retrying throttled/transient failures
+
+        make_call is invoked once per attempt. Token usage reported by the
+        response (if any) replaces the estimate in the window.
+        """
+        limiter = self.for_model(model)
+        attempt = 0
+        while True:
+            entry = await limiter.acquire(tokens)
+            try:
+                reservation = await self._reserve_shared(model, limiter, tokens)
+                response = await make_call()
+            except RETRYABLE_ERRORS as e:
+                throttled = isinstance(e, openai.RateLimitError)
+                await limiter.release(entry, None, throttled=throttled)
+                if attempt >= max_retries:
+                    raise
+                delay = backoff_delay(attempt, get_retry_after(e))
+                if throttled:
+                    # The quota is per account, so every process backs off, not just this one
+                    await self._shared_op(self.shared.pause if self.shared else None, model, delay)
+                print(f"⏳ {model} {'rate limited' if throttled else 'request failed'}, retrying in {delay:.1f}s")
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                await limiter.release(entry, None, throttled=False)
+                raise
+
+            usage = getattr(getattr(response, 'usage', None), 'total_tokens', None)
+            usage = usage if isinstance(usage, int) else None
+            await limiter.release(entry, usage, throttled=False)
+            if reservation is not None and usage is not None and usage != tokens:
+                await self._shared_op(self.shared.settle, reservation, usage)
+            return response
+
+    async def _reserve_shared(self, model: str, limiter: ModelLimiter, tokens: int) -> Optional[int]:
+        """Wait for room in the shared window; None without one (or if its database fails)"""
+        while self.shared is not None:
+            result = await self._shared_op(self.shared.reserve, model, limiter.rpm, limiter.tpm, tokens)
+            if result is None:
+                return None
+            wait, reservation = result
+            if reservation is not None:
+                return reservation
+            await asyncio.sleep(wait + random.uniform(0, 0.05))
+        return None
+
+    @staticmethod
+    async def _shared_op(operation, *args: Any) -> Any:
+        """Run a SharedWindow call off the event loop; a failing database degrades to per-process limits"""
+        if operation is None:
+            return None
+        try:
+            return await asyncio.to_thread(operation, *args)
+        except sqlite3.Error as e:
+            print(f"⚠️ Shared rate limit window unavailable: {e}")
+            return None
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Current window usage and concurrency per model"""
+        return {model: limiter.stats() for model, limiter in self._models.items()}
+
+
+# Global limiter instance
+_rate_limiter = RateLimiter(shared=SharedWindow() if SHARED_RATE_LIMITS else None)
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Get the process-wide rate limiter"""
+    return _rate_limiter
+
+
+async def chat_completion(client, **kwargs) -> Any:
+    """
+    client.chat.completions.create() behind the shared response cache and limiter
+
+    Identical requests (same model, messages, response_format, ...) are
+    answered from the disk cache without touching the API or the limits.
+    """
+    if not LLM_CACHE_ENABLED or kwargs.get('stream'):
+        return await _call_chat(client, kwargs)
+
+    cache = get_llm_cache()
+    key = cache_key(kwargs)
+    cached = await asyncio.to_thread(cache.get, key)
+    if cached is not None:
+        return cached
+
+    response = await _call_chat(client, kwargs)
+    if isinstance(response, ChatCompletion) and response.choices:
+        await asyncio.to_thread(cache.put, key, response)
+    return response
+
+
+async def _call_chat(client, kwargs: Dict[str, Any]) -> Any:
+    return await _rate_limiter.call(
+        kwargs['model'], estimate_chat_tokens(kwargs),
+        lambda: client.chat.completions.create(**kwargs)
+    )
+
+
+async def generate_image(client, **kwargs) -> Any:
+    """client.images.generate() behind the shared limiter (image models are limited by requests)"""
+    return await _rate_limiter.call(kwargs['model'], 0, lambda: client.images.generate(**kwargs))
+
+
+async def moderate(client, **kwargs) -> Any:
+    """client.moderations.create() behind the shared limiter"""
+    model = kwargs.get('model', 'omni-moderation-latest')
+    return await _rate_limiter.call(model, 0, lambda: client.moderations.create(**kwargs))
@@ -0,0 +1,172 @@
+"""
+Incremental re-analysis of revised drafts
+A new upload linked to an earlier project is diffed scene by scene by content
+hash; unchanged scenes keep their analysis and frames and only changed or new
+scenes go back through the model
+"""
+
+import hashlib
+from collections import defaultdict, deque
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from utils.screenplay_index import ScreenplayIndex, index_screenplay
+from utils.scene_analyzer import slug_key, extract_primary_setting_from_scenes
+
+
+def scene_fingerprint(section: str) -> str:
+    """SHA-256 of a scene's text with whitespace normalized, so reflowed pages don't count as edits"""
+    return hashlib.sha256(' '.join(section.split()).encode('utf-8')).hexdigest()
+
+
+def scene_fingerprints(text: str) -> List[str]:
+    """Fingerprint of every scene in script order"""
+    index = index_screenplay(text)
+    return [scene_fingerprint(index.section(scene_index)) for scene_index in range(len(index.sluglines))]
+
+
+def match_scenes(old_text: str, new_text: str) -> Dict[int, int]:
+    """
+    Unchanged scenes as {old scene index: new scene index} (0-based)
+
+    Scenes match by fingerprint, so moved scenes still match; repeated
+    identical scenes pair up in order.
+    """
+    old_positions = defaultdict(deque)
+    for old_index, fingerprint in enumerate(scene_fingerprints(old_text)):
+        old_positions[fingerprint].append(old_index)
+
+    matches = {}
+    for new_index, fingerprint in enumerate(scene_fingerprints(new_text)):
+        if old_positions[fingerprint]:
+            matches[old_positions[fingerprint].popleft()] = new_index
+    return matches
+
+
+def diff_summary(old_text: str, new_text: str) -> Dict[str, int]:
+    """Scene counts of a revision: unchanged, changed or new, and removed"""
+    matches = match_scenes(old_text, new_text)
+    new_scenes = len(index_screenplay(new_text).sluglines)
+    old_scenes = len(index_screenplay(old_text).sluglines)
+    return {
+        'unchanged_scenes': len(matches),
+        'changed_scenes': new_scenes - len(matches),
+        'removed_scenes': old_scenes - len(matches)
+    }
+
+
+def locate_scene(index: ScreenplayIndex, scene: Dict[str, Any]) -> Optional[int]:
+    """Section (0-based) an analysis scene was taken from: same slugline, nearest scene number"""
+    key = slug_key(scene.get('slug_line') or '')
+    candidates = [position for position, slug in enumerate(index.sluglines) if slug_key(slug['slug_line']) == key]
+    if not candidates:
+        return None
+    number = scene.get('scene_number') if isinstance(scene.get('scene_number'), int) else 1
+    return min(candidates, key=lambda position: abs(position + 1 - number))
+
+
+def plan_revision(previous_analysis: Dict[str, Any], old_text: str, new_text: str) -> Dict[str, Any]:
+    """
+    What a revised draft can reuse from the previous draft's analysis
+
+    Returns {'reused': scenes renumbered to the new draft (with
+    'previous_scene_number'), 'changed': 0-based new scenes with no unchanged
+    counterpart, 'dropped': previously selected scenes that changed or were removed}.
+    """
+    old_index, new_index = index_screenplay(old_text), index_screenplay(new_text)
+    matches = match_scenes(old_text, new_text)
+
+    reused, seen = [], set()
+    for scene in previous_analysis.get('scenes', []):
+        old_position = locate_scene(old_index, scene)
+        if old_position not in matches or old_position in seen:
+            continue
+        seen.add(old_position)
+        new_position = matches[old_position]
+        reused.append(dict(scene, scene_number=new_position + 1, previous_scene_number=scene['scene_number'],
+                           slug_line=new_index.sluglines[new_position]['slug_line']))
+
+    unchanged = set(matches.values())
+    return {
+        'reused': reused,
+        'changed': [position for position in range(len(new_index.sluglines)) if position not in unchanged],
+        'dropped': len(previous_analysis.get('scenes', [])) - len(reused)
+    }
+
+
+def changed_script(new_text: str, plan: Dict[str, Any]) -> str:
+    """Only the changed and new scenes of a draft, in order, for the model to analyze"""
+    index = index_screenplay(new_text)
+    return '\n\n'.join(index.section(position) for position in plan['changed'])
+
+
+def scene_budget(plan: Dict[str, Any], detected_scenes: int) -> int:
+    """Changed scenes to select: replacements for dropped ones plus any growth of the target count"""
+    wanted = max(detected_scenes - len(plan['reused']), plan['dropped'])
+    return max(0, min(wanted, len(plan['changed'])))
+
+
+def merge_revision(previous_analysis: Dict[str, Any], plan: Dict[str, Any], new_text: str,
+                   partial_analysis: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Analysis of the revised draft: reused scenes plus those selected from the changed scenes
+
+    Scenes of `partial_analysis` (run on changed_script()) are renumbered to
+    their place in the new draft. Known characters keep their descriptions so
+    they are drawn the same way; new ones are added.
+    """
+    scenes = {scene['scene_number']: scene for scene in plan['reused']}
+    characters = dict(previous_analysis.get('characters') or {})
+    analyzed = 0
+
+    if partial_analysis is not None:
+        partial_index = index_screenplay(changed_script(new_text, plan))
+        for scene in partial_analysis.get('scenes', []):
+            position = locate_scene(partial_index, scene)
+            if position is None:
+                continue
+            number = plan['changed'][position] + 1
+            if number not in scenes:
+                scenes[number] = dict(scene, scene_number=number)
+                analyzed += 1
+        for name, info in (partial_analysis.get('characters') or {}).items():
+            characters.setdefault(name, info)
+
+    scene_list = [scenes[number] for number in sorted(scenes)]
+    index = index_screenplay(new_text)
+    return dict(
+        previous_analysis,
+        scenes=scene_list,
+        total_scenes=len(scene_list),
+        total_frames=sum(scene.get('frames_needed', 1) for scene in scene_list),
+        characters=characters,
+        page_count=index.pages,
+        word_count=index.word_count,
+        setting=extract_primary_setting_from_scenes(scene_list),
+        analyzed_at=datetime.now().isoformat(),
+        revision={'reused_scenes': len(plan['reused']), 'analyzed_scenes': analyzed,
+                  'changed_scenes': len(plan['changed'])}
+    )
+
+
+def carry_over_frames(previous_frames: List[Dict[str, Any]], scenes: List[Dict[str, Any]],
+                      previous_project_id: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Frames of reused scenes, renamed to their scene number in the new draft
+
+    Returns {frame_id: frame} like saved frames, so the job treats them as
+    already rendered.
+    """
+    by_id = {frame.get('frame_id'): frame for frame in previous_frames}
+    carried = {}
+    for scene in scenes:
+        if 'previous_scene_number' not in scene:
+            continue
+        for frame_number in range(1, scene.get('frames_needed', 1) + 1):
+            frame = by_id.get(f"frame_{scene['previous_scene_number']}_{frame_number}")
+            if frame is None:
+                continue
+            frame_id = f"frame_{scene['scene_number']}_{frame_number}"
+            carried[frame_id] = dict(frame, frame_id=frame_id, scene_number=scene['scene_number'],
+                                     cost=0.0, reused_from=previous_project_id)
+    return carried
@@ -5,11 +5,23 @@ Uses OpenAI to properly extract scenes, characters, and analysis like the main a
 
 import re
 import os
+import json
 import asyncio
-from typing import List, Dict, Any
+from typing import Any, Awaitable, Dict, List, Optional, Tuple
 from datetime import datetime
 from openai import AsyncOpenAI
 from .model_config import get_model_for_task
+from .openai_runtime import get_shared_client, run_sync, JobCancelledError
+from .rate_limiter import chat_completion
+from .screenplay_index import index_screenplay, parse_location, parse_time_of_day, SCENE_HEADING
+from . import fountain_parser
+from .fountain_parser import FountainElement
+from .character_index import index_characters
+
+# Scripts longer than this are analyzed in chunks (map-reduce) instead of sampled
+CHUNKED_ANALYSIS_WORDS = int(os.getenv('SF_SIMPLE_CHUNKED_ANALYSIS_WORDS', '20000'))
+# Target size of each chunk; chunks always hold whole scenes
+ANALYSIS_CHUNK_WORDS = int(os.getenv('SF_SIMPLE_ANALYSIS_CHUNK_WORDS', '3000'))
 
 def analyze_screenplay(text: str, max_scenes: int = None) -> Dict[str, Any]:
     """
@@ -36,7 +48,7 @@ def analyze_screenplay(text: str, max_scenes: int = None) -> Dict[str, Any]:
         print(f"🤖 Starting AI analysis for {max_scenes} scenes...")
         
         # Calculate timeout based on script size (more time for larger scripts)
-        word_count = len(text.split())
+        word_count = index_screenplay(text).word_count
         if word_count > 20000:  # Very large script (like 21 Jump Street)
             timeout = 120  # 2 minutes
         elif word_count > 15000:  # Large script
@@ -50,7 +62,7 @@ def analyze_screenplay(text: str, max_scenes: int = None) -> Dict[str, Any]:
         
         # Run AI analysis in separate thread to prevent blocking Flask main thread
         with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
-            future = executor.submit(_run_ai_analysis_sync, text, max_scenes)
+            future = executor.submit(_run_ai_analysis_sync, text, max_scenes, timeout)
             
             # Set dynamic timeout based on script size
             try:
@@ -66,46 +78,34 @@ def analyze_screenplay(text: str, max_scenes: int = None) -> Dict[str, Any]:
         # Fallback to basic analysis
         return basic_analyze_screenplay(text, max_scenes)
 
-def _run_ai_analysis_sync(text: str, max_scenes: int) -> Dict[str, Any]:
+def _run_ai_analysis_sync(text: str, max_scenes: int, timeout: float = None) -> Dict[str, Any]:
     """
     Helper function to run async AI analysis synchronously in background thread
-    FIXED: Proper AsyncOpenAI client cleanup prevents event loop errors
+    Submits to the shared async runtime, which owns the pooled client; the
+    coroutine is cancelled if it outlives the timeout
     """
-    # Create new event loop for this thread only
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    
-    client = None
-    try:
-        client = get_openai_client()
-        analysis = loop.run_until_complete(
-            ai_analyze_screenplay(client, text, max_scenes)
-        )
-        return analysis
-    finally:
-        # CRITICAL: Close client connections before closing event loop
-        if client:
-            try:
-                loop.run_until_complete(client.close())
-            except Exception as e:
-                print(f"⚠️ Client cleanup warning: {e}")
-        
-        # Always cleanup event loop
-        loop.close()
+    client = get_openai_client()
+    return run_sync(ai_analyze_screenplay(client, text, max_scenes), timeout=timeout)
 
-def detect_optimal_scene_count(text: str) -> int:
+def detect_optimal_scene_count(text: str, elements: Optional[List[FountainElement]] = None) -> int:
     """
     Detect optimal scene count based on screenplay analysis.
     Uses industry standard: 1 scene per 2-3 pages for features
     
     OPTIMIZED: Caps scenes for very large scripts to prevent AI overload
+    Fountain scripts (parsed `elements`) count their exact scene headings.
     """
+    index = index_screenplay(text)
+    
     # Estimate pages
-    pages = estimate_pages(text)
-    word_count = len(text.split())
+    pages = index.pages
+    word_count = index.word_count
     
     # Count actual scene headers for comparison  
-    scene_headers = count_scene_headers(text)
+    if elements is not None:
+        scene_headers = sum(1 for element in elements if element.type == fountain_parser.SCENE_HEADING)
+    else:
+        scene_headers = index.strict_heading_count
     
     # OPTIMIZATION: For very large scripts, use stricter limits
     if word_count > 20000:  # Very large script (like 21 Jump Street)
@@ -140,49 +140,50 @@ def count_scene_headers(text: str) -> int:
     """
     Count scene headers using EXACT regex patterns from main app
     Copied from: src/screenplay_storyboard/parser/extractors/scene_extractor.py
+    (compiled into one scanner, see screenplay_index.STRICT_SCENE_HEADING)
     """
-    import re
-    
-    lines = text.split('\n')
-    count = 0
-    
-    # EXACT patterns from main app's _extract_scenes_with_regex
-    patterns = [
-        r'^\s*(INT\.|INTERIOR)\s+(.+?)\s*[-–—]\s*(.+)$',
-        r'^\s*(EXT\.|EXTERIOR)\s+(.+?)\s*[-–—]\s*(.+)$', 
-        r'^\s*(INT/EXT\.|INT\./EXT\.)\s+(.+?)\s*[-–—]\s*(.+)$',
-        r'^\s*(I/E\.?)\s+(.+?)\s*[-–—]\s*(.+)$',
-        # Handle cases without dashes
-        r'^\s*(INT\.|INTERIOR)\s+(.+?)\s+(DAY|NIGHT|DAWN|DUSK|MORNING|AFTERNOON|EVENING|CONTINUOUS|LATER).*$',
-        r'^\s*(EXT\.|EXTERIOR)\s+(.+?)\s+(DAY|NIGHT|DAWN|DUSK|MORNING|AFTERNOON|EVENING|CONTINUOUS|LATER).*$',
-    ]
-    
-    for line in lines:
-        line_stripped = line.strip()
-        if line_stripped:
-            for pattern in patterns:
-                match = re.match(pattern, line_stripped, re.IGNORECASE)
-                if match:
-                    count += 1
-                    break
-    
-    return count
+    return index_screenplay(text).strict_heading_count
 
 def get_openai_client() -> AsyncOpenAI:
-    """Get OpenAI client with API key"""
-    api_key = os.getenv('OPENAI_API_KEY')
-    if not api_key:
-        raise ValueError("OPENAI_API_KEY environment variable not set")
-    
-    return AsyncOpenAI(api_key=api_key)
+    """Get the shared OpenAI client (owned by the async runtime)"""
+    return get_shared_client()
+
+async def gather_json_responses(calls: Dict[str, Awaitable[Any]]) -> Dict[str, Optional[Dict[str, Any]]]:
+    """
+    Await independent JSON-mode chat calls concurrently
+
+    Returns the parsed object for each label, or None for a call that failed
+    or returned invalid JSON, so one bad response doesn't discard the others.
+    """
+    labels = list(calls)
+    responses = await asyncio.gather(*calls.values(), return_exceptions=True)
+
+    results = {}
+    for label, response in zip(labels, responses):
+        if isinstance(response, (JobCancelledError, asyncio.CancelledError)):
+            raise response
+        if isinstance(response, BaseException):
+            if not isinstance(response, Exception):
+                raise response
+            print(f"❌ AI {label} call failed: {response}")
+            results[label] = None
+            continue
+        try:
+            parsed = json.loads(response.choices[0].message.content)
+        except (json.JSONDecodeError, TypeError, AttributeError, IndexError) as e:
+            print(f"❌ Failed to parse AI {label} response as JSON: {e}")
+            parsed = None
+        results[label] = parsed if isinstance(parsed, dict) else None
+    return results
 
 async def ai_analyze_screenplay(client: AsyncOpenAI, text: str, max_scenes: int) -> Dict[str, Any]:
     """
     Use AI to analyze screenplay like the main app
     """
     
+    # The three extractions are independent, so they run concurrently
     # Step 1: Extract basic info using configured model
-    info_response = await client.chat.completions.create(
+    info_call = chat_completion(client,
         model=get_model_for_task('basic_info_extraction'),
         messages=[
             {
@@ -205,15 +206,8 @@ Return a JSON object with:
         response_format={"type": "json_object"}
     )
     
-    try:
-        import json
-        basic_info = json.loads(info_response.choices[0].message.content)
-    except json.JSONDecodeError as e:
-        print(f"Failed to parse AI response as JSON: {e}")
-        raise Exception("Invalid JSON response from OpenAI API")
-    
     # Step 2: Extract scenes using configured model
-    scenes_response = await client.chat.completions.create(
+    scenes_call = chat_completion(client,
         model=get_model_for_task('scene_analysis'),
         messages=[
             {
@@ -243,14 +237,8 @@ Focus on visually interesting and story-critical scenes."""
         response_format={"type": "json_object"}
     )
     
-    try:
-        scenes_data = json.loads(scenes_response.choices[0].message.content)
-    except json.JSONDecodeError as e:
-        print(f"Failed to parse scenes AI response as JSON: {e}")
-        raise Exception("Invalid JSON response for scenes from OpenAI API")
-    
     # Step 3: Extract characters using configured model
-    characters_response = await client.chat.completions.create(
+    characters_call = chat_completion(client,
         model=get_model_for_task('character_extraction'),
         messages=[
             {
@@ -274,14 +262,26 @@ Focus on:
         response_format={"type": "json_object"}
     )
     
-    try:
-        characters_data = json.loads(characters_response.choices[0].message.content)
-    except json.JSONDecodeError as e:
-        print(f"Failed to parse characters AI response as JSON: {e}")
-        raise Exception("Invalid JSON response for characters from OpenAI API")
-    
+    results = await gather_json_responses({
+        'basic info': info_call,
+        'scenes': scenes_call,
+        'characters': characters_call
+    })
+    if all(result is None for result in results.values()):
+        raise Exception("All AI analysis calls failed")
+
+    # A failed call only loses its own part: defaults for basic info and
+    # characters, regex scene extraction for scenes
+    basic_info = results['basic info'] or {}
+    characters_data = results['characters'] or {}
+    if results['scenes'] is not None:
+        scenes_list = results['scenes'].get('scenes', [])
+    else:
+        print("   Using basic scene extraction instead")
+        scenes_list = extract_scenes(text, max_scenes)
+
     # Calculate accurate frame totals
-    scenes_list = scenes_data.get('scenes', [])
+
     total_frames = 0
     
     # Ensure each scene has proper frame count
@@ -305,36 +305,41 @@ Focus on:
         'total_frames': total_frames,
         'scenes': scenes_list,
         'characters': characters_data.get('characters', {}),
-        'word_count': len(text.split()),
+        'word_count': index_screenplay(text).word_count,
         'analyzed_at': datetime.now().isoformat(),
         'analysis_type': 'AI-powered'
     }
     
     return analysis
 
-def basic_analyze_screenplay(text: str, max_scenes: int) -> Dict[str, Any]:
+def basic_analyze_screenplay(text: str, max_scenes: int, elements: Optional[List[FountainElement]] = None) -> Dict[str, Any]:
     """
     Fallback basic analysis when AI fails
-    Uses minimal analysis without pattern matching
+    Uses minimal analysis without pattern matching; Fountain scripts (parsed
+    `elements`) get their exact scenes and speaking characters
     """
     
     # Extract basic info
-    title = extract_title(text)
-    scenes = extract_scenes(text, max_scenes)
-    
-    # No character extraction in fallback to avoid garbage
-    # Users should fix their API configuration instead
-    characters_dict = {
-        'MAIN CHARACTER': {
-            'description': 'Primary character in the story',
-            'distinctive_features': 'To be determined by proper AI analysis',
-            'clothing': 'Appropriate for story context',
-            'role': 'protagonist'
-        }
-    }
+    title = extract_title(text, elements)
+    scenes = extract_scenes(text, max_scenes, elements)
     
-    print("⚠️ Using basic fallback analysis - character extraction disabled")
-    print("   Please ensure your AI configuration is working for better results")
+    if elements is not None:
+        # Character cues are explicit in Fountain, so they are safe to use
+        characters_dict = fountain_characters(elements)
+    else:
+        # No character extraction in fallback to avoid garbage
+        # Users should fix their API configuration instead
+        characters_dict = {
+            'MAIN CHARACTER': {
+                'description': 'Primary character in the story',
+                'distinctive_features': 'To be determined by proper AI analysis',
+                'clothing': 'Appropriate for story context',
+                'role': 'protagonist'
+            }
+        }
+        
+        print("⚠️ Using basic fallback analysis - character extraction disabled")
+        print("   Please ensure your AI configuration is working for better results")
     
     analysis = {
         'title': title,
@@ -342,7 +347,7 @@ def basic_analyze_screenplay(text: str, max_scenes: int) -> Dict[str, Any]:
         'scenes': scenes,
         'characters': characters_dict,
         'page_count': estimate_pages(text),
-        'word_count': len(text.split()),
+        'word_count': index_screenplay(text).word_count,
         'analyzed_at': datetime.now().isoformat(),
         'genre': 'Unknown',
         'setting': extract_primary_setting(scenes),
@@ -352,13 +357,16 @@ def basic_analyze_screenplay(text: str, max_scenes: int) -> Dict[str, Any]:
     
     return analysis
 
-def extract_title(text: str) -> str:
+def extract_title(text: str, elements: Optional[List[FountainElement]] = None) -> str:
     """Extract screenplay title"""
-    lines = text.split('\n')
+    if elements is not None:
+        title = fountain_parser.title_page(elements).get('title')
+        if title:
+            return title
     
     # Look for title in first few lines
     skip_next = False
-    for i, line in enumerate(lines[:10]):
+    for i, line in enumerate(index_screenplay(text).head_lines(10)):
         line = line.strip()
         
         # Skip empty lines
@@ -394,109 +402,128 @@ def extract_title(text: str) -> str:
     
     return "Untitled Screenplay"
 
-def extract_scenes(text: str, max_scenes: int) -> List[Dict[str, Any]]:
-    """Extract scenes from screenplay"""
+def extract_scenes(text: str, max_scenes: int, elements: Optional[List[FountainElement]] = None) -> List[Dict[str, Any]]:
+    """Extract scenes from screenplay (from parsed Fountain `elements` when given)"""
+    if elements is not None:
+        return fountain_scenes(elements, max_scenes)
+    
+    index = index_screenplay(text)
     scenes = []
-    lines = text.split('\n')
     
-    current_scene = None
-    current_description = []
-    scene_number = 0
+    for scene_index, slug in enumerate(index.sluglines[:max_scenes]):
+        # Characters are left to the AI (pattern matching is disabled, see is_character_name)
+        characters = []
+        description_lines = [line.strip() for line in index.section(scene_index).split('\n')[1:] if line.strip()]
+
+        description = '\n'.join(description_lines).strip()
+        scenes.append({
+            'scene_number': scene_index + 1,
+            'slug_line': slug['slug_line'],
+            'location': slug['location'],
+            'time_of_day': slug['time_of_day'],
+            'description': description,
+            'key_visual_moment': extract_key_visual(description),
+            'characters': characters,
+            'dialogue': [],
+            'camera_angles': ['medium shot', 'wide shot', 'close-up'],
+            'mood': 'neutral',
+            'importance': 5
+        })
     
-    for line in lines:
-        line = line.strip()
-        
-        # Check if this is a scene header
-        if is_scene_header(line):
-            # Save previous scene if exists
-            if current_scene and len(scenes) < max_scenes:
-                current_scene['description'] = '\n'.join(current_description).strip()
-                current_scene['key_visual_moment'] = extract_key_visual(current_scene['description'])
-                scenes.append(current_scene)
-            
-            # Start new scene
-            if len(scenes) < max_scenes:
-                scene_number += 1
-                current_scene = {
-                    'scene_number': scene_number,
-                    'slug_line': line,
-                    'location': extract_location(line),
-                    'time_of_day': extract_time_of_day(line),
-                    'description': '',
-                    'key_visual_moment': '',
-                    'characters': [],
-                    'dialogue': [],
-                    'camera_angles': ['medium shot', 'wide shot', 'close-up'],
-                    'mood': 'neutral',
-                    'importance': 5
-                }
-                current_description = []
+    return scenes
+
+def fountain_scenes(elements: List[FountainElement], max_scenes: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Scenes built directly from Fountain elements
+
+    Characters come from the scene's cues (most lines first, so prompt
+    builders that feature the first two get the main speakers) and dialogue
+    from the speeches; no guessing involved.
+    """
+    scenes = []
+    for heading, body in fountain_parser.split_scenes(elements)[:max_scenes]:
+        action_lines = [element.text for element in body if element.type == fountain_parser.ACTION]
+        cues = fountain_parser.character_cues(body)
+        dialogue = []
+        for element in body:
+            if element.type == fountain_parser.CHARACTER:
+                dialogue.append(f"{element.text}:")
+            elif element.type == fountain_parser.DIALOGUE and dialogue:
+                dialogue[-1] += f" {element.text}"
         
-        elif current_scene and len(scenes) < max_scenes:
-            # Add to current scene description
-            if line and not is_character_name(line):
-                current_description.append(line)
-            elif is_character_name(line):
-                # Add character to scene
-                char_name = line.strip()
-                if char_name not in current_scene['characters']:
-                    current_scene['characters'].append(char_name)
-    
-    # Add final scene
-    if current_scene and len(scenes) < max_scenes:
-        current_scene['description'] = '\n'.join(current_description).strip()
-        current_scene['key_visual_moment'] = extract_key_visual(current_scene['description'])
-        scenes.append(current_scene)
-    
+        description = '\n'.join(action_lines)
+        scenes.append({
+            'scene_number': len(scenes) + 1,
+            'slug_line': heading.text,
+            'location': parse_location(heading.text),
+            'time_of_day': parse_time_of_day(heading.text),
+            'description': description,
+            'key_visual_moment': extract_key_visual(description),
+            'characters': sorted(cues, key=cues.get, reverse=True),
+            'dialogue': dialogue,
+            'camera_angles': ['medium shot', 'wide shot', 'close-up'],
+            'mood': 'neutral',
+            'importance': 5,
+            'source_line': heading.line
+        })
     return scenes
 
+def fountain_characters(elements: List[FountainElement]) -> Dict[str, Any]:
+    """Character database entries for every speaking character in a Fountain script"""
+    cues = fountain_parser.character_cues(elements)
+    return {
+        name: {
+            'description': f'Speaking character ({count} lines of dialogue)',
+            'role': 'protagonist' if index == 0 else 'supporting'
+        }
+        for index, (name, count) in enumerate(sorted(cues.items(), key=lambda item: item[1], reverse=True))
+    }
+
+def slug_key(slug_line: str) -> str:
+    """Slugline normalized for matching (case, periods and spacing ignored)"""
+    return ' '.join(slug_line.upper().replace('.', ' ').split())
+
+def apply_fountain_structure(analysis: Dict[str, Any], elements: List[FountainElement]) -> Dict[str, Any]:
+    """
+    Replace guessed structure in an AI analysis with what the Fountain source states
+
+    Scenes are matched by slugline (nearest scene number on repeats) and take
+    their characters and dialogue from the cues; speaking characters the AI
+    missed are added to the character database.
+    """
+    by_slug: Dict[str, List[Dict[str, Any]]] = {}
+    for scene in fountain_scenes(elements):
+        by_slug.setdefault(slug_key(scene['slug_line']), []).append(scene)
+    
+    for scene in analysis.get('scenes', []):
+        candidates = by_slug.get(slug_key(scene.get('slug_line', '')))
+        if not candidates:
+            continue
+        number = scene.get('scene_number') if isinstance(scene.get('scene_number'), int) else 0
+        source = min(candidates, key=lambda candidate: abs(candidate['scene_number'] - number))
+        scene['characters'] = source['characters']
+        scene['dialogue'] = source['dialogue']
+    
+    characters = analysis.setdefault('characters', {})
+    for name, info in fountain_characters(elements).items():
+        characters.setdefault(name, info)
+    
+    title = fountain_parser.title_page(elements).get('title')
+    if title:
+        analysis['title'] = title
+    return analysis
+
 def is_scene_header(line: str) -> bool:
     """Check if line is a scene header"""
-    line = line.strip().upper()
-    return (
-        line.startswith(('INT.', 'EXT.', 'INTERIOR', 'EXTERIOR')) or
-        re.match(r'^(INT|EXT)\.?\s+', line) is not None
-    )
+    return SCENE_HEADING.match(line.strip()) is not None
 
 def extract_location(scene_header: str) -> str:
     """Extract location from scene header"""
-    # Remove INT./EXT. and time
-    header = scene_header.strip()
-    
-    # Pattern: INT./EXT. LOCATION - TIME
-    match = re.match(r'^(INT|EXT)\.?\s+([^-]+?)(?:\s*-\s*(.+))?$', header, re.IGNORECASE)
-    
-    if match:
-        location = match.group(2).strip()
-        return location
-    
-    # Fallback - just remove INT/EXT
-    for prefix in ['INT.', 'EXT.', 'INTERIOR', 'EXTERIOR']:
-        if header.upper().startswith(prefix):
-            location = header[len(prefix):].strip()
-            if ' - ' in location:
-                location = location.split(' - ')[0].strip()
-            return location
-    
-    return header
+    return parse_location(scene_header)
 
 def extract_time_of_day(scene_header: str) -> str:
     """Extract time of day from scene header"""
-    header = scene_header.strip().upper()
-    
-    # Common time indicators
-    time_indicators = ['DAY', 'NIGHT', 'DAWN', 'DUSK', 'MORNING', 'AFTERNOON', 'EVENING', 'CONTINUOUS']
-    
-    for time_indicator in time_indicators:
-        if time_indicator in header:
-            return time_indicator
-    
-    # Look for pattern after dash
-    if ' - ' in header:
-        time_part = header.split(' - ', 1)[1].strip()
-        return time_part if time_part else 'DAY'
-    
-    return 'DAY'
+    return parse_time_of_day(scene_header)
 
 def extract_key_visual(description: str) -> str:
     """Extract key visual moment from scene description"""
@@ -564,95 +591,67 @@ def estimate_pages(text: str) -> int:
     """
     Estimate screenplay pages using industry standards.
     Standard screenplay format: ~55 lines per page (including blanks)
-    or ~250 words per page for dialogue-heavy scripts.
+    or ~250 words per page for dialogue-heavy scripts; the higher estimate wins.
     """
     if not text:
         return 0
-    
-    lines = text.split('\n')
-    words = text.split()
-    
-    # Method 1: Line-based estimation (standard screenplay format)
-    # Standard format: ~55 lines per page (including blanks for formatting)
-    line_based_pages = max(1, len(lines) // 55)
-    
-    # Method 2: Word-based estimation (for dialogue-heavy scripts)
-    # Standard: ~250 words per page in screenplay format
-    word_based_pages = max(1, len(words) // 250)
-    
-    # Use the higher estimate for better accuracy (scripts vary in format)
-    estimated_pages = max(line_based_pages, word_based_pages)
-    
-    # Reasonable bounds (minimum 1 page)
-    return max(1, estimated_pages)
+    return index_screenplay(text).pages
 
-def fast_ai_analyze_screenplay(text: str, detected_scenes: int) -> Dict[str, Any]:
+def fast_ai_analyze_screenplay(text: str, detected_scenes: int,
+                               elements: Optional[List[FountainElement]] = None) -> Dict[str, Any]:
     """
-    FIXED: Fast targeted AI analysis with proper client cleanup
-    Uses AI to properly extract characters, story beats, and settings
+    FIXED: Fast targeted AI analysis on the shared async runtime
+    Uses AI to properly extract characters, story beats, and settings;
+    for Fountain scripts the parsed `elements` supply scene characters and dialogue
     """
-    # Run async analysis
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    
-    client = None
     try:
         # Get OpenAI client
         client = get_openai_client()
         
-        analysis = loop.run_until_complete(
-            fast_ai_extract_for_generation(client, text, detected_scenes)
-        )
-        
+        analysis = run_sync(fast_ai_extract_for_generation(client, text, detected_scenes, elements))
+        if elements is not None:
+            analysis = apply_fountain_structure(analysis, elements)
         return analysis
         
+    except JobCancelledError:
+        raise
     except Exception as e:
         print(f"❌ Fast AI analysis failed: {e}")
         print("   Falling back to basic analysis...")
         # Fallback to basic analysis
-        return basic_analyze_screenplay(text, detected_scenes)
-    finally:
-        # CRITICAL: Close client connections before closing event loop
-        if client:
-            try:
-                loop.run_until_complete(client.close())
-            except Exception as e:
-                print(f"⚠️ Client cleanup warning: {e}")
-        
-        # Always cleanup event loop
-        loop.close()
+        return basic_analyze_screenplay(text, detected_scenes, elements)
 
-async def fast_ai_extract_for_generation(client: AsyncOpenAI, text: str, max_scenes: int) -> Dict[str, Any]:
+async def sampled_extract(client: AsyncOpenAI, text: str, max_scenes: int,
+                          elements: Optional[List[FountainElement]] = None) -> Tuple[Dict[str, Any], Dict[str, Any]]:
     """
-    Fast targeted AI extraction for generation flow
-    Focuses on characters, story beats, and settings - not redundant scene detection
-    
-    OPTIMIZED for large scripts: Limits text sent to AI to prevent hanging
+    Character and scene extraction over the whole script (or a sample of it)
+    Returns (characters_data, story_data) as parsed from the model; Fountain
+    scripts are ranked by their parsed `elements`
     """
     
     # IMPROVED: Smart text sampling for character extraction - use FULL script for better character detection
-    word_count = len(text.split())
+    index = index_screenplay(text)
+    word_count = index.word_count
     if word_count > 20000:
         # For very large scripts, use strategic sampling: beginning + middle + end
-        words = text.split()
-        beginning = words[:5000]
-        middle_start = len(words) // 2 - 2000
-        middle = words[middle_start:middle_start + 4000]
-        end = words[-3000:]
-        text_sample = ' '.join(beginning + ['...MIDDLE SECTION...'] + middle + ['...FINAL SECTION...'] + end)
-        print(f"🔧 Large script optimization: Using {len(text_sample.split())} words from {word_count} total (beginning+middle+end)")
+        middle_start = word_count // 2 - 2000
+        sample = (index.words(0, 5000) + ['...MIDDLE SECTION...'] + index.words(middle_start, middle_start + 4000)
+                  + ['...FINAL SECTION...'] + index.words(word_count - 3000, word_count))
+        text_sample = ' '.join(sample)
+        print(f"🔧 Large script optimization: Using {len(sample)} words from {word_count} total (beginning+middle+end)")
     elif word_count > 10000:
         # For medium scripts, use first 8000 words (more than before)
-        words = text.split()
-        text_sample = ' '.join(words[:8000]) + '...TRUNCATED...'
-        print(f"🔧 Medium script optimization: Using {len(text_sample.split())} words from {word_count} total")
+        sample = index.words(0, 8000)
+        text_sample = ' '.join(sample) + '...TRUNCATED...'
+        print(f"🔧 Medium script optimization: Using {len(sample)} words from {word_count} total")
     else:
         # Small scripts - use full text (no change)
         text_sample = text
         print(f"📝 Using full script: {word_count} words")
     
+    # Character and scene extraction are independent, so they run concurrently
     # Step 1: Extract ALL characters using INTELLIGENT AI analysis - NO REGEX FALLBACKS
-    characters_response = await client.chat.completions.create(
+    characters_call = chat_completion(client,
         model=get_model_for_task('character_extraction'),
         messages=[
             {
@@ -701,8 +700,36 @@ Be VERY selective. Only include actual human character names."""
         response_format={"type": "json_object"}
     )
     
-    # Step 2: INTELLIGENT scene detection with variable frames per scene using configured model
-    story_response = await client.chat.completions.create(
+    # Step 2: INTELLIGENT scene detection - the model annotates locally pre-ranked
+    # candidates, or picks from the script text itself when ranking is off or finds no scenes
+    from .scene_ranker import SCENE_RANKER_ENABLED, rank_scenes, select_candidates, merge_annotations
+    ranked = rank_scenes(text, elements) if SCENE_RANKER_ENABLED else []
+    if ranked:
+        candidates = select_candidates(ranked, max_scenes)
+        print(f"🎯 Local ranking: {len(candidates)} of {len(ranked)} scenes sent for annotation")
+        story_call = _annotate_candidates_call(client, candidates, max_scenes)
+    else:
+        story_call = _scene_selection_call(client, text_sample, max_scenes)
+    
+    results = await gather_json_responses({'characters': characters_call, 'scenes': story_call})
+    if results['characters'] is None and results['scenes'] is None:
+        raise Exception("Character and scene extraction both failed")
+
+    # Keep whichever half succeeded: no characters, or regex scene extraction
+    characters_data = results['characters'] or {}
+    if ranked:
+        story_data = {'scenes': merge_annotations(candidates, results['scenes'], max_scenes)}
+    elif results['scenes'] is not None:
+        story_data = results['scenes']
+    else:
+        print("   Using basic scene extraction instead")
+        story_data = {'scenes': extract_scenes(text, max_scenes)}
+    
+    return characters_data, story_data
+
+def _scene_selection_call(client: AsyncOpenAI, text_sample: str, max_scenes: int) -> Awaitable[Any]:
+    """Scene selection from the script text: the model finds and picks the scenes itself"""
+    return chat_completion(client,
         model=get_model_for_task('scene_analysis'),
         messages=[
             {
@@ -769,15 +796,56 @@ CRITICAL: Avoid repetitive scenes. If a character "realizes something" or "disco
         ],
         response_format={"type": "json_object"}
     )
+
+def _annotate_candidates_call(client: AsyncOpenAI, candidates: List[Dict[str, Any]], max_scenes: int) -> Awaitable[Any]:
+    """Scene selection from locally ranked candidates: the model only picks and annotates by number"""
+    from .scene_ranker import format_candidates
+    return chat_completion(client,
+        model=get_model_for_task('scene_analysis'),
+        messages=[
+            {
+                "role": "system",
+                "content": f"""You are an expert storyboard director. You get a numbered short list of candidate scenes (slugline | characters | start of the action), already ranked as the most visual scenes of a screenplay and listed in story order.
+
+Select the {max_scenes} most important scenes for storyboarding, covering the story structure (setup, inciting incident, plot points, midpoint, climax, resolution) and avoiding repetitive scenes.
+
+Return a JSON object with:
+- "scenes": array of the selected scenes in story order, each with:
+  - scene_number: the number from the list
+  - story_beat: setup, inciting_incident, plot_point_1, midpoint, plot_point_2, climax or resolution
+  - scene_type: action, dialogue, establishing, emotional, transition or climax
+  - importance: 1-10
+  - frames_needed: 1-3 (action and climactic moments 2, otherwise 1)
+  - mood: emotional tone
+  - camera_angles: suggested camera angles
+  - visual_complexity: simple/medium/complex
+  - key_visual_moment: most important visual moment, one sentence
+
+Do not repeat the scene text."""
+            },
+            {
+                "role": "user",
+                "content": f"Candidate scenes:\n{format_candidates(candidates)}"
+            }
+        ],
+        response_format={"type": "json_object"}
+    )
+
+async def fast_ai_extract_for_generation(client: AsyncOpenAI, text: str, max_scenes: int,
+                                         elements: Optional[List[FountainElement]] = None) -> Dict[str, Any]:
+    """
+    Fast targeted AI extraction for generation flow
+    Focuses on characters, story beats, and settings - not redundant scene detection
+    
+    OPTIMIZED for large scripts: scripts over CHUNKED_ANALYSIS_WORDS are analyzed
+    in parallel chunks (map-reduce) so every scene can be selected
+    """
+    
+    if index_screenplay(text).word_count > CHUNKED_ANALYSIS_WORDS:
+        characters_data, story_data = await map_reduce_extract(client, text, max_scenes)
+    else:
+        characters_data, story_data = await sampled_extract(client, text, max_scenes, elements)
     
-    # Parse responses
-    import json
-    try:
-        characters_data = json.loads(characters_response.choices[0].message.content)
-        story_data = json.loads(story_response.choices[0].message.content)
-    except json.JSONDecodeError as e:
-        print(f"❌ Failed to parse AI response: {e}")
-        raise Exception("Invalid JSON response from OpenAI API")
     
     # PURE AI-BASED CHARACTER EXTRACTION - NO REGEX FALLBACKS
     ai_characters = set(characters_data.get('characters', {}).keys())
@@ -823,7 +891,7 @@ CRITICAL: Avoid repetitive scenes. If a character "realizes something" or "disco
         'scenes': scenes_list,
         'characters': characters_data.get('characters', {}),
         'page_count': estimate_pages(text),
-        'word_count': len(text.split()),
+        'word_count': index_screenplay(text).word_count,
         'analyzed_at': datetime.now().isoformat(),
         'genre': 'Unknown',
         'setting': extract_primary_setting_from_scenes(scenes_list),
@@ -834,6 +902,176 @@ CRITICAL: Avoid repetitive scenes. If a character "realizes something" or "disco
     print(f"✅ Fast AI analysis complete: {len(analysis['characters'])} characters, {analysis['total_scenes']} scenes, {analysis['total_frames']} frames")
     return analysis
 
+def split_into_scene_chunks(text: str, target_words: int = ANALYSIS_CHUNK_WORDS) -> List[Dict[str, Any]]:
+    """
+    Split a script on scene headings into chunks of roughly target_words
+
+    Each scene is prefixed with a "### SCENE n" marker carrying its number in
+    the whole script, so per-chunk results can be merged back in order.
+    Returns [{'text', 'first_scene', 'last_scene'}]; scenes are never split.
+    """
+    index = index_screenplay(text)
+    sections = []
+    if index.preamble().strip() or not index.sluglines:
+        sections.append((0, index.preamble().rstrip('\n'), index.preamble_words))
+    for scene_index, slug in enumerate(index.sluglines):
+        number = scene_index + 1
+        sections.append((number, f"### SCENE {number}\n{index.section(scene_index)}", slug['words']))
+
+    chunks = []
+    chunk_parts, chunk_words, first_scene = [], 0, None
+    last_scene = 0
+    for number, section, words in sections:
+        if chunk_parts and chunk_words + words > target_words:
+            chunks.append({'text': '\n'.join(chunk_parts), 'first_scene': first_scene, 'last_scene': last_scene})
+            chunk_parts, chunk_words, first_scene = [], 0, None
+
+        if first_scene is None:
+            first_scene = max(1, number)
+        chunk_parts.append(section)
+        chunk_words += words
+        last_scene = number
+
+    if chunk_parts:
+        chunks.append({'text': '\n'.join(chunk_parts), 'first_scene': first_scene, 'last_scene': last_scene})
+    return chunks
+
+def _chunk_call(client: AsyncOpenAI, chunk: Dict[str, Any]) -> Awaitable[Any]:
+    """Map step: synopses and candidate characters for the scenes of one chunk"""
+    return chat_completion(client,
+        model=get_model_for_task('chunk_analysis'),
+        messages=[
+            {
+                "role": "system",
+                "content": """You are a screenplay reader preparing notes for a storyboard director. The excerpt marks each scene with "### SCENE n".
+
+Return a JSON object with:
+- "scenes": array with one object per marked scene:
+  - scene_number: the n from its "### SCENE n" marker
+  - slug_line: scene header (EXT./INT. LOCATION - TIME)
+  - location: location name
+  - time_of_day: time of day
+  - synopsis: 1-2 sentences on what happens
+  - key_visual_moment: most important visual moment
+  - characters: array of actual human character names present
+  - scene_type: action, dialogue, establishing, emotional, transition or climax
+  - importance: 1-10 importance for storyboarding
+- "characters": object where each key is an actual human character name (NO sound effects, locations, organizations or objects) and the value is an object with "description", "distinctive_features" and "clothing" as far as this excerpt tells"""
+            },
+            {
+                "role": "user",
+                "content": f"Summarize the scenes in this screenplay excerpt:\n\n{chunk['text']}"
+            }
+        ],
+        response_format={"type": "json_object"}
+    )
+
+def _merge_characters(chunk_characters: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Combine per-chunk character notes, keeping the most detailed description of each"""
+    merged = {}
+    for characters in chunk_characters:
+        for name, info in characters.items():
+            info = info if isinstance(info, dict) else {'description': str(info)}
+            existing = merged.get(name)
+            if existing is None or len(json.dumps(info)) > len(json.dumps(existing)):
+                merged[name] = info
+    return merged
+
+async def map_reduce_extract(client: AsyncOpenAI, text: str, max_scenes: int) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Analyze a long script completely: chunks are summarized in parallel with a
+    cheaper model (map), then one pass picks the top max_scenes (reduce)
+
+    Returns (characters_data, story_data) in the same shape as sampled_extract.
+    A chunk whose call fails falls back to regex scenes so it stays selectable;
+    if the reduce pass fails the most important candidates are kept.
+    """
+    chunks = split_into_scene_chunks(text, ANALYSIS_CHUNK_WORDS)
+    print(f"🧩 Map-reduce analysis: {index_screenplay(text).word_count} words in {len(chunks)} chunks")
+
+    results = await gather_json_responses({
+        f"chunk {index + 1}": _chunk_call(client, chunk) for index, chunk in enumerate(chunks)
+    })
+
+    candidates = {}
+    chunk_characters = []
+    for chunk, result in zip(chunks, results.values()):
+        if result is None:
+            # Regex scenes have no synopsis, but keep the chunk's scenes in the running
+            result = {'scenes': [
+                dict(scene, scene_number=chunk['first_scene'] + offset,
+                     synopsis=scene.get('key_visual_moment') or scene.get('description', '')[:200])
+                for offset, scene in enumerate(extract_scenes(chunk['text'], 1000))
+            ]}
+        for scene in result.get('scenes', []):
+            if isinstance(scene, dict) and isinstance(scene.get('scene_number'), int):
+                candidates[scene['scene_number']] = scene
+        chunk_characters.append(result.get('characters') or {})
+
+    if not candidates:
+        raise Exception("Chunked analysis found no scenes")
+
+    characters = _merge_characters(chunk_characters)
+    scene_list = [candidates[number] for number in sorted(candidates)]
+    print(f"🧩 Map complete: {len(scene_list)} candidate scenes, {len(characters)} candidate characters")
+
+    # Reduce: choose and detail the top scenes from the compact synopses only
+    synopses = '\n'.join(
+        f"{scene['scene_number']}. {scene.get('slug_line', '')} | importance {scene.get('importance', 5)} | "
+        f"{', '.join(scene.get('characters', []))} | {scene.get('synopsis', '')}"
+        for scene in scene_list
+    )
+    reduce_results = await gather_json_responses({'reduce': chat_completion(client,
+        model=get_model_for_task('scene_analysis'),
+        messages=[
+            {
+                "role": "system",
+                "content": f"""You are an expert storyboard director. You get numbered synopses of every scene of a screenplay and its candidate characters.
+
+Select the {max_scenes} most important scenes for storyboarding, covering the whole story (setup, inciting incident, plot points, midpoint, climax, resolution) and avoiding repetitive scenes.
+
+Return a JSON object with:
+- "scenes": array of the selected scenes in story order, each with:
+  - scene_number: the number from the list
+  - story_beat: setup, inciting_incident, plot_point_1, midpoint, plot_point_2, climax or resolution
+  - scene_type: action, dialogue, establishing, emotional, transition or climax
+  - importance: 1-10
+  - frames_needed: 1-3 (action and climactic moments 2, otherwise 1)
+  - mood: emotional tone
+  - camera_angles: suggested camera angles
+  - visual_complexity: simple/medium/complex
+- "characters": array of the candidate names that are the same actual human characters' canonical names (drop duplicates, sound effects, locations and organizations)"""
+            },
+            {
+                "role": "user",
+                "content": f"Scenes:\n{synopses}\n\nCandidate characters: {', '.join(characters)}"
+            }
+        ],
+        response_format={"type": "json_object"}
+    )})
+    selection = reduce_results['reduce']
+
+    selected = []
+    if selection is not None:
+        for choice in selection.get('scenes', []):
+            if isinstance(choice, dict) and choice.get('scene_number') in candidates:
+                scene = dict(candidates[choice['scene_number']])
+                scene.update({key: value for key, value in choice.items() if value is not None})
+                selected.append(scene)
+        keep = [name for name in selection.get('characters', []) if name in characters]
+        if keep:
+            characters = {name: characters[name] for name in keep}
+
+    if not selected:
+        print("   Reduce pass failed, keeping the most important candidate scenes")
+        ranked = sorted(scene_list, key=lambda scene: scene.get('importance', 5), reverse=True)[:max_scenes]
+        selected = sorted(ranked, key=lambda scene: scene['scene_number'])
+
+    for scene in selected:
+        scene.setdefault('description', scene.get('synopsis', ''))
+
+    return {'characters': characters}, {'scenes': selected[:max_scenes]}
+
 def extract_primary_setting_from_scenes(scenes: List[Dict[str, Any]]) -> str:
     """Extract general setting overview from AI-analyzed scenes"""
     if not scenes:
@@ -898,28 +1136,10 @@ def extract_primary_setting_from_scenes(scenes: List[Dict[str, Any]]) -> str:
 
 def extract_character_context(text: str, character: str) -> str:
     """Extract basic visual context for a character from screenplay text"""
-    # Look for descriptions near character name mentions
-    lines = text.split('\n')
-    char_descriptions = []
-    
-    for i, line in enumerate(lines):
-        if character.upper() in line.upper():
-            # Look at surrounding lines for descriptions
-            context_start = max(0, i - 3)
-            context_end = min(len(lines), i + 3)
-            context_lines = lines[context_start:context_end]
-            
-            for context_line in context_lines:
-                # Look for descriptive text (usually in parentheses or action lines)
-                if any(word in context_line.lower() for word in 
-                      ['young', 'old', 'tall', 'short', 'beard', 'hair', 'wearing', 'dressed', 
-                       'looks', 'appears', 'age', 'years', 'man', 'woman', 'boy', 'girl']):
-                    char_descriptions.append(context_line.strip())
-    
-    if char_descriptions:
-        # Return the most descriptive line
-        best_description = max(char_descriptions, key=len)
+    # Descriptions near the character's mentions, looked up in the script's character index
+    best_description = index_characters(text).context(character)
+    if best_description:
         return f"Character: {best_description[:100]}..."
     else:
         # Fallback description based on character name
-        return f"Character appearing in screenplay: {character}"
\ No newline at end of file
+        return f"Character appearing in screenplay: {character}"
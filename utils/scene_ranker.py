@@ -0,0 +1,143 @@
+"""
+Local scene ranker
+Scores every scene of a script without calling the API - action density,
+characters present, location novelty and position in the story - so the
+model only has to annotate a short list of pre-ranked candidates
+"""
+
+import os
+import re
+import math
+from typing import Any, Dict, List, Optional
+
+from .fountain_parser import FountainElement
+from .scene_analyzer import extract_scenes
+from .screenplay_index import index_screenplay
+from .character_index import index_characters
+
+SCENE_RANKER_ENABLED = os.getenv('SF_SIMPLE_SCENE_RANKER', 'true').lower() == 'true'
+# Candidates sent to the model for every scene it has to select
+CANDIDATES_PER_SCENE = float(os.getenv('SF_SIMPLE_RANKER_CANDIDATES_PER_SCENE', '2'))
+
+# Verbs that make a scene worth drawing (base forms plus common irregular forms)
+ACTION_VERBS = frozenset({
+    'run', 'ran', 'chase', 'fight', 'fought', 'punch', 'kick', 'shoot', 'shot', 'fire', 'explode', 'crash',
+    'smash', 'jump', 'leap', 'fall', 'fell', 'grab', 'throw', 'threw', 'slam', 'burst', 'race', 'flee', 'fled',
+    'dive', 'dove', 'climb', 'charge', 'attack', 'strike', 'struck', 'hit', 'stab', 'scream', 'sprint', 'swing',
+    'swung', 'tackle', 'drag', 'collapse', 'shatter', 'blast', 'escape', 'dodge', 'spin', 'spun', 'lunge',
+    'kiss', 'hurl', 'rush', 'storm', 'pull', 'push', 'bang', 'wrestle', 'flip', 'kill'
+})
+
+# Story beats as (position in the story from 0 to 1, weight): opening, inciting
+# incident, first plot point, midpoint, second plot point, climax, resolution
+STORY_BEATS = ((0.0, 1.0), (0.12, 1.0), (0.25, 0.7), (0.5, 0.8), (0.75, 0.7), (0.9, 1.0), (1.0, 0.6))
+BEAT_WIDTH = 0.06
+
+SIGNAL_WEIGHTS = {'action': 0.3, 'characters': 0.25, 'novelty': 0.2, 'position': 0.25}
+
+# Fields the model may add to a candidate; slugline, characters and text stay local
+ANNOTATION_FIELDS = ('story_beat', 'scene_type', 'importance', 'frames_needed', 'mood',
+                     'camera_angles', 'visual_complexity', 'key_visual_moment')
+
+_WORD = re.compile(r"[a-z']+")
+
+
+def _is_action_word(word: str) -> bool:
+    """Match a verb with its -s/-es/-ed/-ing endings stripped"""
+    return any(form in ACTION_VERBS for form in (word, word[:-1], word[:-2], word[:-3], word[:-3] + 'e'))
+
+
+def action_density(description: str, scene_words: int) -> float:
+    """Action verbs per word of the whole scene, so dialogue-heavy scenes rank lower (0-1)"""
+    hits = sum(1 for word in _WORD.findall(description.lower()) if _is_action_word(word))
+    return min(1.0, hits * 20 / max(1, scene_words))
+
+
+def position_weight(position: float) -> float:
+    """How close a scene at this point of the story (0-1) sits to a structural beat (0-1)"""
+    return max(weight * math.exp(-((position - beat) / BEAT_WIDTH) ** 2) for beat, weight in STORY_BEATS)
+
+
+def rank_scenes(text: str, elements: Optional[List[FountainElement]] = None) -> List[Dict[str, Any]]:
+    """
+    Every scene of the script in story order with a 'rank_score' (0-1)
+
+    Scenes come from extract_scenes (or the parsed Fountain `elements`); the
+    score is a weighted sum of the four local signals, so the same script
+    always ranks the same way.
+    """
+    index = index_screenplay(text)
+    if elements is not None:
+        scenes = extract_scenes(text, None, elements)
+    else:
+        scenes = extract_scenes(text, len(index.sluglines))
+
+    seen_locations: Dict[str, int] = {}
+    last = max(1, len(scenes) - 1)
+    for position, scene in enumerate(scenes):
+        if elements is None:
+            scene['characters'] = scene['characters'] or index_characters(text).scene_characters(position)
+            scene_words = index.sluglines[position]['words']
+        else:
+            scene_words = len(scene['description'].split()) + sum(len(line.split()) for line in scene['dialogue'])
+
+        location = scene['location'].upper()
+        seen = seen_locations.get(location, 0)
+        seen_locations[location] = seen + 1
+
+        signals = {
+            'action': action_density(scene['description'], scene_words),
+            'characters': min(1.0, len(scene['characters']) / 4),
+            'novelty': 1.0 / (1 + seen),
+            'position': position_weight(position / last)
+        }
+        scene['rank_score'] = round(sum(SIGNAL_WEIGHTS[name] * value for name, value in signals.items()), 3)
+    return scenes
+
+
+def top_scenes(ranked: List[Dict[str, Any]], count: int) -> List[Dict[str, Any]]:
+    """The `count` best-scoring scenes, back in story order"""
+    best = sorted(ranked, key=lambda scene: (-scene['rank_score'], scene['scene_number']))[:count]
+    return sorted(best, key=lambda scene: scene['scene_number'])
+
+
+def select_candidates(ranked: List[Dict[str, Any]], max_scenes: int) -> List[Dict[str, Any]]:
+    """Short list for the model: CANDIDATES_PER_SCENE times the scenes it has to select"""
+    return top_scenes(ranked, max(max_scenes, math.ceil(max_scenes * CANDIDATES_PER_SCENE)))
+
+
+def format_candidates(candidates: List[Dict[str, Any]], snippet_words: int = 40) -> str:
+    """One compact numbered line per candidate: slugline, characters and the start of the action"""
+    lines = []
+    for scene in candidates:
+        snippet = ' '.join(scene['description'].split()[:snippet_words])
+        lines.append(f"{scene['scene_number']}. {scene['slug_line']} | "
+                     f"{', '.join(scene['characters'][:4]) or '-'} | {snippet}")
+    return '\n'.join(lines)
+
+
+def merge_annotations(candidates: List[Dict[str, Any]], annotation: Optional[Dict[str, Any]],
+                      max_scenes: int) -> List[Dict[str, Any]]:
+    """
+    Apply the model's picks (by scene_number) to the local candidates
+
+    Unknown or repeated numbers are ignored; when nothing usable comes back
+    the top max_scenes by local score are kept.
+    """
+    by_number = {scene['scene_number']: scene for scene in candidates}
+    choices = annotation.get('scenes', []) if isinstance(annotation, dict) else []
+    selected = {}
+    for choice in choices:
+        if not isinstance(choice, dict) or choice.get('scene_number') not in by_number:
+            continue
+        number = choice['scene_number']
+        if number in selected:
+            continue
+        scene = dict(by_number[number])
+        scene.update({field: choice[field] for field in ANNOTATION_FIELDS if choice.get(field) is not None})
+        selected[number] = scene
+
+    if not selected:
+        print("   Scene annotation unavailable, keeping the top locally ranked scenes")
+        return top_scenes(candidates, max_scenes)
+    return [selected[number] for number in sorted(selected)][:max_scenes]
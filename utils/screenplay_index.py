@@ -0,0 +1,208 @@
+"""
+Single-pass screenplay index
+Line offsets, word counts, scene headings and parsed sluglines are computed
+once per script text and shared by every text heuristic
+"""
+
+import os
+import re
+import hashlib
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Tuple
+
+# Loose scene heading check used to split a script into scenes
+SCENE_HEADING = re.compile(r'(?:INT\.|EXT\.|INTERIOR|EXTERIOR|(?:INT|EXT)\.?\s)', re.IGNORECASE)
+
+# Strict headings (slugline with a time of day) counted for scene-count detection
+_TIMES = r'(?:DAY|NIGHT|DAWN|DUSK|MORNING|AFTERNOON|EVENING|CONTINUOUS|LATER)'
+STRICT_SCENE_HEADING = re.compile(
+    r'\s*(?:'
+    r'(?:INT\.|INTERIOR|EXT\.|EXTERIOR|INT/EXT\.|INT\./EXT\.|I/E\.?)\s+(.+?)\s*[-–—]\s*(.+)$'
+    r'|(?:INT\.|INTERIOR|EXT\.|EXTERIOR)\s+(.+?)\s+' + _TIMES + r'.*$'
+    r')',
+    re.IGNORECASE
+)
+
+SLUGLINE = re.compile(r'^(INT|EXT)\.?\s+([^-]+?)(?:\s*-\s*(.+))?$', re.IGNORECASE)
+TIME_INDICATORS = ('DAY', 'NIGHT', 'DAWN', 'DUSK', 'MORNING', 'AFTERNOON', 'EVENING', 'CONTINUOUS')
+
+# Script characters whose indexes are kept for reuse, per cache (an index holds its script's text)
+INDEX_CACHE_CHARS = int(float(os.getenv('SF_SIMPLE_INDEX_CACHE_MB', '2')) * 1024 * 1024)
+
+# Industry page estimates: ~55 lines or ~250 words per page
+LINES_PER_PAGE = 55
+WORDS_PER_PAGE = 250
+
+
+def parse_location(scene_header: str) -> str:
+    """Location part of a slugline (INT./EXT. LOCATION - TIME)"""
+    header = scene_header.strip()
+    match = SLUGLINE.match(header)
+    if match:
+        return match.group(2).strip()
+
+    # Fallback - just remove INT/EXT
+    for prefix in ('INT.', 'EXT.', 'INTERIOR', 'EXTERIOR'):
+        if header.upper().startswith(prefix):
+            location = header[len(prefix):].strip()
+            if ' - ' in location:
+                location = location.split(' - ')[0].strip()
+            return location
+    return header
+
+
+def parse_time_of_day(scene_header: str) -> str:
+    """Time of day part of a slugline, 'DAY' if it has none"""
+    header = scene_header.strip().upper()
+    for time_indicator in TIME_INDICATORS:
+        if time_indicator in header:
+            return time_indicator
+
+    if ' - ' in header:
+        time_part = header.split(' - ', 1)[1].strip()
+        return time_part if time_part else 'DAY'
+    return 'DAY'
+
+
+class ScreenplayIndex:
+    """Everything the heuristics need to know about a script, from one scan of its lines"""
+
+    __slots__ = ('text', 'line_offsets', 'line_word_starts', 'word_count', 'non_empty_lines',
+                 'strict_heading_count', 'sluglines', 'preamble_words', 'pages')
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+        self.line_offsets: List[int] = []
+        self.line_word_starts: List[int] = []
+        self.word_count = 0
+        self.non_empty_lines = 0
+        self.strict_heading_count = 0
+        self.sluglines: List[Dict[str, Any]] = []
+        self.preamble_words = 0
+
+        offset = 0
+        section_words = 0
+        for number, line in enumerate(text.split('\n')):
+            self.line_offsets.append(offset)
+            self.line_word_starts.append(self.word_count)
+            offset += len(line) + 1
+
+            stripped = line.strip()
+            if not stripped:
+                continue
+            self.non_empty_lines += 1
+            words = len(stripped.split())
+            self.word_count += words
+
+            if SCENE_HEADING.match(stripped):
+                self._close_section(section_words)
+                section_words = 0
+                self.sluglines.append({
+                    'line': number,
+                    'offset': self.line_offsets[number],
+                    'slug_line': stripped,
+                    'location': parse_location(stripped),
+                    'time_of_day': parse_time_of_day(stripped)
+                })
+            if stripped[0] in 'IEie' and STRICT_SCENE_HEADING.match(stripped):
+                self.strict_heading_count += 1
+            section_words += words
+        self._close_section(section_words)
+
+        line_pages = max(1, len(self.line_offsets) // LINES_PER_PAGE)
+        word_pages = max(1, self.word_count // WORDS_PER_PAGE)
+        self.pages = max(line_pages, word_pages) if text else 0
+
+    def _close_section(self, words: int) -> None:
+        """Record the word count of the section that just ended"""
+        if self.sluglines:
+            self.sluglines[-1]['words'] = words
+        else:
+            self.preamble_words = words
+
+    @property
+    def line_count(self) -> int:
+        return len(self.line_offsets)
+
+    def line(self, number: int) -> str:
+        """One line of the script by 0-based number"""
+        start = self.line_offsets[number]
+        end = self.line_offsets[number + 1] - 1 if number + 1 < len(self.line_offsets) else len(self.text)
+        return self.text[start:end]
+
+    def words(self, start: int, stop: int) -> List[str]:
+        """Words start..stop of the script (as text.split() numbers them), splitting only the lines they're on"""
+        start, stop = max(0, start), min(stop, self.word_count)
+        words: List[str] = []
+        number = bisect_right(self.line_word_starts, start) - 1
+        while len(words) < stop - start and number < self.line_count:
+            line_words = self.line(number).split()
+            skip = max(0, start - self.line_word_starts[number])
+            words.extend(line_words[skip:skip + stop - start - len(words)])
+            number += 1
+        return words
+
+    def head_lines(self, count: int) -> List[str]:
+        """The first `count` lines"""
+        return [self.line(number) for number in range(min(count, self.line_count))]
+
+    def preamble(self) -> str:
+        """Text before the first scene heading (title page, FADE IN, ...)"""
+        end = self.sluglines[0]['offset'] if self.sluglines else len(self.text)
+        return self.text[:end]
+
+    def section(self, scene_index: int) -> str:
+        """Text of a scene from its heading up to the next heading"""
+        start = self.sluglines[scene_index]['offset']
+        if scene_index + 1 < len(self.sluglines):
+            return self.text[start:self.sluglines[scene_index + 1]['offset']].rstrip('\n')
+        return self.text[start:]
+
+
+class ScriptCache:
+    """
+    Values built from a script text, least recently used first out
+
+    Keyed by a hash of the text rather than the text itself, and bounded by
+    the total length of the scripts cached (the newest one is always kept).
+    """
+
+    def __init__(self, build: Callable[[str], Any], max_chars: int = INDEX_CACHE_CHARS) -> None:
+        self.build = build
+        self.max_chars = max_chars
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[bytes, Tuple[Any, int]]' = OrderedDict()
+        self._chars = 0
+
+    def get(self, text: str) -> Any:
+        key = hashlib.blake2b(text.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry[0]
+
+        value = self.build(text)
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = (value, len(text))
+                self._chars += len(text)
+            while self._chars > self.max_chars and len(self._entries) > 1:
+                _, (_, chars) = self._entries.popitem(last=False)
+                self._chars -= chars
+        return value
+
+
+_indexes = ScriptCache(ScreenplayIndex)
+
+
+def index_screenplay(text: str) -> ScreenplayIndex:
+    """
+    Index for a script text, built once and reused
+
+    Repeated calls with the same text (upload, scene detection, analysis)
+    return the cached index instead of rescanning the script.
+    """
+    return _indexes.get(text or '')
@@ -0,0 +1,161 @@
+"""
+Shared SQLite plumbing for the stores and caches under the data directory
+Every database is opened the same way (one WAL-mode connection per thread,
+schema and column migrations applied once); the caches also share their
+cross-process counters, size-bounded LRU eviction and stats
+"""
+
+import os
+import sqlite3
+import threading
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple, TypeVar
+
+T = TypeVar('T')
+
+# Hit/miss/eviction counters every cache keeps next to its entries
+COUNTERS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+def connect(db_path: str) -> sqlite3.Connection:
+    """Open a connection in WAL mode so readers and one writer never block each other"""
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute('PRAGMA busy_timeout=30000')
+    return conn
+
+
+class SQLiteDatabase:
+    """
+    A SQLite file with one connection per thread
+
+    `schema` (CREATE ... IF NOT EXISTS statements) and `migrations`
+    ((table, column, definition) columns added after a table was first
+    created) are applied when the database is first opened: on
+    construction, or on first use when `lazy` is set.
+    """
+
+    def __init__(self, db_path: str, schema: str, migrations: Sequence[Tuple[str, str, str]] = (),
+                 lazy: bool = False) -> None:
+        self.db_path = db_path
+        self._schema = schema
+        self._migrations = migrations
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_applied = False
+        if not lazy:
+            self.connection()
+
+    def connection(self) -> sqlite3.Connection:
+        """Get this thread's connection, opening it (and the database) on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            if os.path.dirname(self.db_path):
+                os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            conn = connect(self.db_path)
+            self._apply_schema(conn)
+            self._local.conn = conn
+        return conn
+
+    def _apply_schema(self, conn: sqlite3.Connection) -> None:
+        with self._schema_lock:
+            if self._schema_applied:
+                return
+            with conn:
+                conn.executescript(self._schema)
+                for table, column, definition in self._migrations:
+                    columns = {row['name'] for row in conn.execute(f'PRAGMA table_info({table})')}
+                    if column not in columns:
+                        conn.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+            self._schema_applied = True
+
+
+class SQLiteCache(SQLiteDatabase):
+    """
+    A cache table shared by every process, with hit/miss/eviction counters
+
+    Entries live in `table`, identified by `key_columns`. With `max_bytes`
+    set the table needs `size` and `last_used_at` columns, and
+    _evict_over_budget() drops least recently used entries past it.
+    """
+
+    def __init__(self, db_path: str, schema: str, table: str, key_columns: Tuple[str, ...],
+                 max_bytes: Optional[int] = None, enabled: bool = True,
+                 migrations: Sequence[Tuple[str, str, str]] = ()) -> None:
+        self.table = table
+        self.key_columns = key_columns
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        super().__init__(db_path, schema + COUNTERS_SCHEMA, migrations)
+
+    def _count(self, conn: sqlite3.Connection, name: str, amount: int = 1) -> None:
+        conn.execute(
+            'INSERT INTO counters (name, value) VALUES (?, ?) '
+            'ON CONFLICT(name) DO UPDATE SET value = value + excluded.value',
+            (name, amount)
+        )
+
+    def _evict_over_budget(self, conn: sqlite3.Connection) -> None:
+        """Delete least recently used entries until the table fits in max_bytes"""
+        if self.max_bytes is None:
+            return
+        excess = conn.execute(f'SELECT COALESCE(SUM(size), 0) FROM {self.table}').fetchone()[0] - self.max_bytes
+        if excess <= 0:
+            return
+
+        keys = ', '.join(self.key_columns)
+        evicted = []
+        for row in conn.execute(f'SELECT {keys}, size FROM {self.table} ORDER BY last_used_at'):
+            evicted.append(tuple(row[column] for column in self.key_columns))
+            excess -= row['size']
+            if excess <= 0:
+                break
+        match = ' AND '.join(f'{column} = ?' for column in self.key_columns)
+        conn.executemany(f'DELETE FROM {self.table} WHERE {match}', evicted)
+        self._count(conn, 'evictions', len(evicted))
+
+    def counters(self) -> Dict[str, int]:
+        """Counter values across all processes"""
+        return {row['name']: row['value'] for row in self.connection().execute('SELECT name, value FROM counters')}
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters (across all processes), entries and their size"""
+        counters = self.counters()
+        hits, misses = counters.get('hits', 0), counters.get('misses', 0)
+        stats = {
+            'enabled': self.enabled,
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / (hits + misses), 3) if hits + misses else 0.0
+        }
+        if self.max_bytes is None:
+            stats['entries'] = self.connection().execute(f'SELECT COUNT(*) FROM {self.table}').fetchone()[0]
+            return stats
+
+        entries, size = self.connection().execute(
+            f'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {self.table}'
+        ).fetchone()
+        stats.update({'evictions': counters.get('evictions', 0), 'entries': entries, 'bytes': size})
+        return stats
+
+
+def process_wide(factory: Callable[[], T]) -> Callable[[], T]:
+    """Getter for one instance per process, created by `factory` on first use"""
+    instance: Optional[T] = None
+    lock = threading.Lock()
+
+    def get() -> T:
+        nonlocal instance
+        if instance is None:
+            with lock:
+                if instance is None:
+                    instance = factory()
+        return instance
+
+    return get
@@ -0,0 +1,406 @@
+"""
+Versioned generation status tracking
+Keeps per-project status dicts, bumps a version on every change and serves
+compact delta payloads (progress fields + frames added since a client cursor)
+"""
+
+import os
+import json
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from utils.project_store import CANCELLED
+
+# Small fields every delta response carries
+PROGRESS_FIELDS = (
+    'status', 'progress', 'current_step', 'current_step_num', 'total_steps',
+    'current_frame', 'total_frames', 'style', 'started_at', 'completed_at', 'error',
+    'queue_position', 'upload'
+)
+
+# Job states that stay resident in memory when loaded back from the store (uploads being extracted too)
+ACTIVE_STATES = ('extracting', 'queued', 'analyzing', 'generating')
+
+# How often waiters re-check the store for changes made by other processes
+STATUS_POLL_SECONDS = float(os.getenv('SF_SIMPLE_STATUS_POLL_SECONDS', '0.5'))
+
+# Serialized responses kept per project (one entry per distinct client cursor)
+MAX_CACHED_RESPONSES = 16
+
+# Memory budget for resident statuses; least recently used ones are dropped past it
+STATUS_MEMORY_BYTES = int(float(os.getenv('SF_SIMPLE_STATUS_MEMORY_MB', '64')) * 1024 * 1024)
+# Resident statuses nobody read or wrote for this long are dropped too
+STATUS_IDLE_SECONDS = float(os.getenv('SF_SIMPLE_STATUS_IDLE_SECONDS', '600'))
+# Separate, smaller budget for finished jobs clients are still polling (their deltas and SSE replays)
+FINISHED_MEMORY_BYTES = int(float(os.getenv('SF_SIMPLE_STATUS_FINISHED_MB', '8')) * 1024 * 1024)
+
+
+def _size(value: Any) -> int:
+    """Approximate resident size of a status field (its JSON length)"""
+    return len(json.dumps(value, default=str))
+
+
+class _Entry:
+    """A status dict plus its version bookkeeping"""
+
+    __slots__ = ('status', 'epoch', 'version', 'field_versions', 'field_sizes', 'responses', 'last_used')
+
+    def __init__(self, status: Dict[str, Any], epoch: int, version: int,
+                 field_versions: Optional[Dict[str, int]] = None) -> None:
+        self.status = status
+        self.epoch = epoch
+        self.version = version
+        self.field_versions = {field: version for field in status}
+        self.field_versions.update(field_versions or {})
+        self.field_sizes = {field: _size(value) for field, value in status.items()}
+        self.responses: Dict[str, bytes] = {}
+        self.last_used = time.monotonic()
+
+    def resident_bytes(self) -> int:
+        return sum(self.field_sizes.values()) + sum(len(body) for body in self.responses.values())
+
+
+class StatusTracker(MutableMapping):
+    """
+    Thread-safe mapping of project_id -> generation status dict
+
+    Writers go through update_status() (or item assignment) so every change
+    bumps the project's version; readers use delta_response() to fetch what
+    changed since their cursor.
+
+    With a ProjectStore attached every change is written through to SQLite.
+    Running jobs stay in memory within `memory_bytes`, recently read finished
+    jobs within `finished_bytes`, each for at most `idle_seconds` without
+    use; anything dropped is read back from the store on demand.
+    """
+
+    def __init__(self, store=None, memory_bytes: int = STATUS_MEMORY_BYTES,
+                 idle_seconds: float = STATUS_IDLE_SECONDS, finished_bytes: int = FINISHED_MEMORY_BYTES) -> None:
+        self._store = store
+        self.memory_bytes = memory_bytes
+        self.finished_bytes = finished_bytes
+        self.idle_seconds = idle_seconds
+        self._lock = threading.RLock()
+        self._changed = threading.Condition(self._lock)
+        # Running jobs, and (with a store) finished ones, each in least recently used order
+        self._entries: 'OrderedDict[str, _Entry]' = OrderedDict()
+        self._finished: 'OrderedDict[str, _Entry]' = OrderedDict()
+        self._last_epoch = 0
+        self._evictions = {'lru': 0, 'idle': 0}
+
+    def _new_epoch(self) -> int:
+        # Wall-clock based so cursors from before a restart never match
+        self._last_epoch = max(self._last_epoch + 1, int(time.time() * 1000))
+        return self._last_epoch
+
+    def _entry(self, project_id: str) -> Optional[_Entry]:
+        """
+        Current entry for a project
+
+        With a store attached the store is the source of truth (other
+        processes may be running the job): a cached entry is reused only
+        while its epoch/version still match.
+        """
+        self._evict_idle()
+        if self._store is None:
+            entry = self._entries.get(project_id)
+            if entry is not None:
+                self._place(project_id, entry)
+            return entry
+
+        entry = self._entries.get(project_id) or self._finished.get(project_id)
+        stored = self._store.get_job_version(project_id)
+        if stored is None:
+            self._forget(project_id)
+            return None
+        if entry is not None and (entry.epoch, entry.version) == stored:
+            self._place(project_id, entry)
+            return entry
+
+        job = self._store.get_job(project_id)
+        if job is None:
+            self._forget(project_id)
+            return None
+
+        # Keep the stored analysis version so reloaded deltas only resend it when it changed
+        entry = _Entry(job['status'], job['epoch'], job['version'], {'analysis': job['analysis_version']})
+        self._place(project_id, entry)
+        return entry
+
+    # Memory budget
+
+    def _forget(self, project_id: str) -> None:
+        self._entries.pop(project_id, None)
+        self._finished.pop(project_id, None)
+
+    def _place(self, project_id: str, entry: _Entry) -> None:
+        """
+        Make an entry resident as the most recently used one, among running
+        or finished jobs by its status, and enforce that group's budget
+        """
+        active = self._store is None or entry.status.get('status') in ACTIVE_STATES
+        cache, other = (self._entries, self._finished) if active else (self._finished, self._entries)
+        other.pop(project_id, None)
+        entry.last_used = time.monotonic()
+        cache[project_id] = entry
+        cache.move_to_end(project_id)
+        self._evict_over_budget(cache, self.memory_bytes if active else self.finished_bytes)
+
+    def _evict_idle(self) -> None:
+        """Drop resident entries unused for idle_seconds (only when the store holds a copy)"""
+        if self._store is None:
+            return
+        cutoff = time.monotonic() - self.idle_seconds
+        for cache in (self._entries, self._finished):
+            while cache:
+                project_id, entry = next(iter(cache.items()))
+                if entry.last_used >= cutoff:
+                    break
+                del cache[project_id]
+                self._evictions['idle'] += 1
+
+    def _evict_over_budget(self, cache: 'OrderedDict[str, _Entry]', budget: int) -> None:
+        """Drop least recently used entries beyond a budget, always keeping the newest one"""
+        if self._store is None:
+            return
+        excess = sum(entry.resident_bytes() for entry in cache.values()) - budget
+        while excess > 0 and len(cache) > 1:
+            _, entry = cache.popitem(last=False)
+            excess -= entry.resident_bytes()
+            self._evictions['lru'] += 1
+
+    def memory_stats(self) -> Dict[str, Any]:
+        """Resident bytes per project, running and finished totals against their budgets, eviction counters"""
+        with self._lock:
+            self._evict_idle()
+            running = {project_id: entry.resident_bytes() for project_id, entry in self._entries.items()}
+            finished = {project_id: entry.resident_bytes() for project_id, entry in self._finished.items()}
+            resident = {**running, **finished}
+            return {
+                'entries': len(resident),
+                'bytes': sum(resident.values()),
+                'budget_bytes': self.memory_bytes,
+                'finished_entries': len(finished),
+                'finished_bytes': sum(finished.values()),
+                'finished_budget_bytes': self.finished_bytes,
+                'idle_seconds': self.idle_seconds,
+                'evictions': dict(self._evictions),
+                'projects': dict(sorted(resident.items(), key=lambda item: item[1], reverse=True))
+            }
+
+    # Mapping interface
+
+    def __getitem__(self, project_id: str) -> Dict[str, Any]:
+        with self._lock:
+            entry = self._entry(project_id)
+            if entry is None:
+                raise KeyError(project_id)
+            return entry.status
+
+    def __setitem__(self, project_id: str, status: Dict[str, Any]) -> None:
+        """Replace a project's status; starts a new epoch so cursors reset"""
+        with self._lock:
+            entry = _Entry(status, self._new_epoch(), 1)
+            if self._store is not None:
+                self._store.save_job(project_id, status, entry.epoch, entry.version)
+            self._place(project_id, entry)
+            self._changed.notify_all()
+
+    def __delitem__(self, project_id: str) -> None:
+        with self._lock:
+            if project_id not in self:
+                raise KeyError(project_id)
+            self._forget(project_id)
+            if self._store is not None:
+                self._store.delete_job(project_id)
+            self._changed.notify_all()
+
+    def __contains__(self, project_id: object) -> bool:
+        with self._lock:
+            if self._store is not None:
+                return isinstance(project_id, str) and self._store.has_job(project_id)
+            return project_id in self._entries
+
+    def __iter__(self) -> Iterator[str]:
+        with self._lock:
+            if self._store is not None:
+                return iter(self._store.list_job_ids())
+            return iter(list(self._entries))
+
+    def __len__(self) -> int:
+        with self._lock:
+            if self._store is not None:
+                return len(self._store.list_job_ids())
+            return len(self._entries)
+
+    # Versioned updates
+
+    def update_status(self, project_id: str, **fields: Any) -> bool:
+        """
+        Apply field updates to a project's status and bump its version
+
+        Returns False (and does nothing) when the project has no status,
+        e.g. because the job was removed while running, or when it was
+        cancelled and the update doesn't keep it cancelled, so a job's late
+        writes can't undo a cancel. Frames passed here are only published to
+        readers; record_frame() persists them.
+        """
+        with self._lock:
+            entry = self._entry(project_id)
+            if entry is None:
+                return False
+            if entry.status.get('status') == CANCELLED and fields.get('status') != CANCELLED:
+                return False
+
+            if self._store is not None:
+                version = self._store.update_job(project_id, fields)
+                if version is None:
+                    self._forget(project_id)
+                    self._changed.notify_all()
+                    return False
+            else:
+                version = entry.version + 1
+
+            # A gap means another process wrote too; drop the cached entry so it's reloaded
+            stale = version != entry.version + 1
+            entry.version = version
+            for field, value in fields.items():
+                entry.status[field] = value
+                entry.field_versions[field] = version
+                entry.field_sizes[field] = _size(value)
+            entry.responses.clear()
+            if stale:
+                self._forget(project_id)
+            else:
+                # The job may have just finished (or restarted): file it under the matching budget
+                self._place(project_id, entry)
+            self._changed.notify_all()
+            return True
+
+    def record_frame(self, project_id: str, ordinal: int, frame: Dict[str, Any]) -> None:
+        """Persist a completed frame as soon as it exists (ordinal = position in frame order)"""
+        if self._store is not None:
+            self._store.save_frame(project_id, ordinal, frame)
+
+    def saved_frames(self, project_id: str) -> List[Dict[str, Any]]:
+        """Every frame recorded for a project, including ones not yet published in order"""
+        if self._store is not None:
+            return self._store.get_frames(project_id)
+        status = self._entries.get(project_id)
+        return list(status.status.get('frames') or []) if status is not None else []
+
+    def release(self, project_id: str) -> None:
+        """Drop a finished job from memory; it stays readable through the store"""
+        if self._store is None:
+            return
+        with self._lock:
+            self._forget(project_id)
+            self._changed.notify_all()
+
+    def version(self, project_id: str) -> int:
+        """Current version of a project's status (0 if unknown)"""
+        with self._lock:
+            entry = self._entry(project_id)
+            return entry.version if entry is not None else 0
+
+    def wait_for_change(self, project_id: str, cursor: Optional[str], timeout: float) -> bool:
+        """
+        Block until the project's status moves past a cursor
+
+        Returns True when there is something new (or the status was removed),
+        False when the timeout expired with no change. With a store attached
+        the store is re-checked every STATUS_POLL_SECONDS so changes written by
+        worker processes are picked up too.
+        """
+        deadline = time.monotonic() + timeout
+        epoch, version, _ = self.parse_cursor(cursor)
+
+        with self._changed:
+            while True:
+                entry = self._entry(project_id)
+                if entry is None or epoch != entry.epoch or version != entry.version:
+                    return True
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._changed.wait(min(remaining, STATUS_POLL_SECONDS) if self._store is not None else remaining)
+
+    # Delta reads
+
+    @staticmethod
+    def parse_cursor(cursor: Optional[str]) -> Tuple[int, int, int]:
+        """Split an opaque 'epoch.version.frames' cursor; malformed cursors read as zero"""
+        try:
+            epoch, version, frame_count = (int(part) for part in (cursor or '').split('.'))
+            return epoch, version, frame_count
+        except ValueError:
+            return 0, 0, 0
+
+    def delta(self, project_id: str, cursor: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Build the delta payload for a client cursor
+
+        The payload always carries the progress fields; `analysis` is included
+        only if it changed since the cursor, and `frames` holds only frames added
+        since the cursor. A cursor from an older run gets `reset: True` and the
+        full frame list.
+        """
+        with self._lock:
+            entry = self._entry(project_id)
+            if entry is None:
+                return None
+            return self._build_delta(entry, cursor)
+
+    def _build_delta(self, entry: _Entry, cursor: Optional[str]) -> Dict[str, Any]:
+        status = entry.status
+        frames = status.get('frames') or []
+
+        cursor_epoch, cursor_version, cursor_frames = self.parse_cursor(cursor)
+        reset = cursor_epoch != entry.epoch or cursor_frames > len(frames)
+        if reset:
+            cursor_version, cursor_frames = 0, 0
+
+        payload = {field: status.get(field) for field in PROGRESS_FIELDS}
+        payload.update({
+            'version': entry.version,
+            'cursor': f"{entry.epoch}.{entry.version}.{len(frames)}",
+            'reset': reset,
+            'frame_count': len(frames),
+            'frames': frames[cursor_frames:]
+        })
+
+        if entry.field_versions.get('analysis', 0) > cursor_version:
+            payload['analysis'] = status.get('analysis')
+
+        return payload
+
+    def delta_response(self, project_id: str, cursor: Optional[str] = None) -> Optional[Tuple[str, bytes]]:
+        """
+        Serialized delta for a cursor, cached until the project's version changes
+
+        Returns (etag, json_bytes) or None if the project has no status. The
+        ETag covers the cursor too, since clients at different cursors get
+        different bodies for the same version.
+        """
+        with self._lock:
+            entry = self._entry(project_id)
+            if entry is None:
+                return None
+
+            key = cursor or ''
+            etag = f"{entry.epoch}-{entry.version}-{zlib.crc32(key.encode('utf-8')):08x}"
+            cached = entry.responses.get(key)
+            if cached is not None:
+                return etag, cached
+
+            body = json.dumps(self._build_delta(entry, cursor)).encode('utf-8')
+            if len(entry.responses) >= MAX_CACHED_RESPONSES:
+                entry.responses.pop(next(iter(entry.responses)))
+            entry.responses[key] = body
+            self._place(project_id, entry)
+            return etag, body
@@ -12,10 +12,22 @@ from datetime import datetime
 from openai import AsyncOpenAI
 from dotenv import load_dotenv
 from .model_config import get_model_for_task
+from .openai_runtime import get_shared_client, run_sync, JobCancelledError
+from .rate_limiter import generate_image
+from .image_store import save_b64_image
+from .image_cache import IMAGE_CACHE_ENABLED, get_image_cache
+from .character_index import find_character
 
 # Load environment variables
 load_dotenv()
 
+# Maximum number of frames rendered at the same time per generation job
+FRAME_CONCURRENCY = max(1, int(os.getenv('SF_SIMPLE_FRAME_CONCURRENCY', '4')))
+
+# Render parameters for frame images (part of the image cache key)
+IMAGE_SIZE = "1024x1024"
+IMAGE_QUALITY = "medium"
+
 def generate_storyboard_frames(analysis: Dict[str, Any], style_prompt: str) -> List[Dict[str, Any]]:
     """
     Generate storyboard frames from analysis using AI
@@ -31,49 +43,31 @@ def generate_storyboard_frames(analysis: Dict[str, Any], style_prompt: str) -> L
     # Calculate optimal frames per scene based on scene importance
     frames = []
     
-    # Run AI frame generation
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    
-    client = None
     try:
-        # Get OpenAI client
+        # Run AI frame generation on the shared runtime with the pooled client
         client = get_openai_client()
-        
-        frames = loop.run_until_complete(
-            ai_generate_frames(client, analysis, style_prompt)
-        )
+        frames = run_sync(ai_generate_frames(client, analysis, style_prompt))
         
     except Exception as e:
         print(f"AI frame generation failed: {e}")
         # Fallback to simulated generation
         frames = simulate_frame_generation(analysis, style_prompt)
-    finally:
-        # CRITICAL: Close client connections before closing event loop
-        if client:
-            try:
-                loop.run_until_complete(client.close())
-            except Exception as e:
-                print(f"⚠️ Client cleanup warning: {e}")
-        
-        # Always cleanup event loop
-        loop.close()
     
     return frames
 
 def get_openai_client() -> AsyncOpenAI:
-    """Get OpenAI client with API key"""
-    api_key = os.getenv('OPENAI_API_KEY')
-    if not api_key:
-        raise ValueError("OPENAI_API_KEY environment variable not set")
-    
-    return AsyncOpenAI(api_key=api_key)
+    """Get the shared OpenAI client (owned by the async runtime)"""
+    return get_shared_client()
 
-async def ai_generate_frames(client: AsyncOpenAI, analysis: Dict[str, Any], style_prompt: str) -> List[Dict[str, Any]]:
+async def ai_generate_frames(client: AsyncOpenAI, analysis: Dict[str, Any], style_prompt: str, max_concurrency: int = None) -> List[Dict[str, Any]]:
     """
     Generate frames using AI like the main app
+
+    Frames are rendered concurrently (bounded by max_concurrency) and returned
+    in scene/frame order.
     """
-    frames = []
+    if max_concurrency is None:
+        max_concurrency = FRAME_CONCURRENCY
     
     # Get style DNA (like main app)
     style_dna = get_style_dna(style_prompt)
@@ -81,6 +75,7 @@ async def ai_generate_frames(client: AsyncOpenAI, analysis: Dict[str, Any], styl
     # Get character database for consistency
     character_database = analysis.get('characters', {})
     
+    frame_jobs = []
     for scene in analysis['scenes']:
         # Use AI-determined frame count (more conservative)
         frames_per_scene = scene.get('frames_needed', 1)
@@ -89,21 +84,28 @@ async def ai_generate_frames(client: AsyncOpenAI, analysis: Dict[str, Any], styl
         frames_per_scene = min(frames_per_scene, 2)
         
         for frame_num in range(frames_per_scene):
+            frame_jobs.append((scene, frame_num + 1))
+    
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+    completed = 0
+    
+    async def render(scene: Dict[str, Any], frame_number: int) -> Dict[str, Any]:
+        nonlocal completed
+        async with semaphore:
             try:
                 # Generate frame using AI with character consistency
-                frame = await generate_ai_frame(client, scene, frame_num + 1, style_dna, character_database)
-                frames.append(frame)
-                
-                # Small delay between frames
-                await asyncio.sleep(0.5)
-                
+                frame = await generate_ai_frame(client, scene, frame_number, style_dna, character_database)
             except Exception as e:
                 print(f"Frame generation failed for scene {scene['scene_number']}: {e}")
                 # Fallback to placeholder frame
-                frame = generate_placeholder_frame(scene, frame_num + 1, style_prompt)
-                frames.append(frame)
+                frame = generate_placeholder_frame(scene, frame_number, style_prompt)
+        
+        completed += 1
+        print(f"   📝 Frame {completed}/{len(frame_jobs)} ready: {frame['frame_id']}")
+        return frame
     
-    return frames
+    # gather() preserves submission order, so frames come back in scene/frame order
+    return list(await asyncio.gather(*(render(scene, frame_number) for scene, frame_number in frame_jobs)))
 
 def get_style_dna(style_prompt: str) -> str:
     """
@@ -155,9 +157,12 @@ def get_style_dna(style_prompt: str) -> str:
     
     return base_dna + style_suffix + consistency_reinforcement
 
-async def generate_ai_frame(client: AsyncOpenAI, scene: Dict[str, Any], frame_number: int, style_dna: str, character_database: Dict[str, Any] = None) -> Dict[str, Any]:
+async def generate_ai_frame(client: AsyncOpenAI, scene: Dict[str, Any], frame_number: int, style_dna: str, character_database: Dict[str, Any] = None, use_cache: bool = True) -> Dict[str, Any]:
     """
     Generate a single frame using AI with prompt sanitization and character consistency
+
+    A frame whose sanitized prompt and render parameters match an earlier render
+    reuses that image; use_cache=False forces a fresh take (and caches it instead).
     """
     
     # Create frame prompt with character database for consistency
@@ -173,26 +178,42 @@ async def generate_ai_frame(client: AsyncOpenAI, scene: Dict[str, Any], frame_nu
     
     # Generate image using configured image generation model
     image_model = get_model_for_task('image_generation')
-    print(f"🎨 Generating image for frame {scene['scene_number']}.{frame_number} using {image_model}")
-    print(f"   Prompt: {sanitized_prompt[:100]}...")
-    
-    image_response = await client.images.generate(
-        model=image_model,
-        prompt=sanitized_prompt,
-        size="1024x1024",
-        quality="medium",
-        n=1
-    )
-    
-    # gpt-image-1 returns base64 directly in the response
-    # Check if it's base64 or URL
-    if hasattr(image_response.data[0], 'b64_json') and image_response.data[0].b64_json:
-        # Base64 format
-        b64_image = image_response.data[0].b64_json
-        image_url = f"data:image/png;base64,{b64_image}"
+    render_params = (image_model, IMAGE_SIZE, IMAGE_QUALITY, sanitized_prompt)
+    image_cache = get_image_cache() if IMAGE_CACHE_ENABLED else None
+    image_url = None
+    
+    if image_cache is not None:
+        if use_cache:
+            image_url = await asyncio.to_thread(image_cache.get, *render_params)
+        else:
+            await asyncio.to_thread(image_cache.count, 'bypassed')
+    
+    cached = image_url is not None
+    if cached:
+        print(f"♻️ Reusing cached image for frame {scene['scene_number']}.{frame_number}")
     else:
-        # URL format (fallback)
-        image_url = image_response.data[0].url
+        print(f"🎨 Generating image for frame {scene['scene_number']}.{frame_number} using {image_model}")
+        print(f"   Prompt: {sanitized_prompt[:100]}...")
+        
+        image_response = await generate_image(client,
+            model=image_model,
+            prompt=sanitized_prompt,
+            size=IMAGE_SIZE,
+            quality=IMAGE_QUALITY,
+            n=1
+        )
+        
+        # gpt-image-1 returns base64 directly in the response
+        # Check if it's base64 or URL
+        if hasattr(image_response.data[0], 'b64_json') and image_response.data[0].b64_json:
+            # Base64 format: decode once into the content-addressed store, keep only the URL
+            # (decoding, hashing and writing the file run off the event loop)
+            image_url = await asyncio.to_thread(save_b64_image, image_response.data[0].b64_json)
+            if image_cache is not None:
+                await asyncio.to_thread(image_cache.put, *render_params, image_url)
+        else:
+            # URL format (fallback)
+            image_url = image_response.data[0].url
     
     # Create frame metadata with sanitization info
     frame = {
@@ -207,7 +228,8 @@ async def generate_ai_frame(client: AsyncOpenAI, scene: Dict[str, Any], frame_nu
         'image_url': image_url,
         'status': 'completed',
         'generation_time': datetime.now().isoformat(),
-        'cost': 0.020,  # gpt-image-1 cost
+        'cost': 0.0 if cached else 0.020,  # gpt-image-1 cost
+        'image_cached': cached,
         'scene_description': scene.get('description', ''),
         'key_visual': scene.get('key_visual_moment', ''),
         'location': scene.get('location', 'Unknown'),
@@ -245,7 +267,7 @@ def create_ai_frame_prompt(scene: Dict[str, Any], frame_number: int, style_dna:
     if characters and character_database:
         character_details = []
         for char_name in characters[:2]:  # Max 2 characters for clarity
-            char_info = character_database.get(char_name)
+            char_info = find_character(character_database, char_name)
             if char_info and isinstance(char_info, dict):
                 # Build detailed character description
                 char_desc_parts = []
@@ -318,7 +340,7 @@ def simulate_frame_generation(analysis: Dict[str, Any], style_prompt: str) -> Li
     print(f"✅ Frame generation complete: {len(frames)} frames")
     return frames
 
-def generate_ai_frame_sync(scene: Dict[str, Any], frame_number: int, style_prompt: str, analysis: Dict[str, Any] = None) -> Dict[str, Any]:
+def generate_ai_frame_sync(scene: Dict[str, Any], frame_number: int, style_prompt: str, analysis: Dict[str, Any] = None, use_cache: bool = True) -> Dict[str, Any]:
     """
     Synchronous wrapper for AI frame generation with character consistency
     """
@@ -332,17 +354,13 @@ def generate_ai_frame_sync(scene: Dict[str, Any], frame_number: int, style_promp
         # Get character database for consistency
         character_database = analysis.get('characters', {}) if analysis else {}
         
-        # Run async generation
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        
-        frame = loop.run_until_complete(
-            generate_ai_frame(client, scene, frame_number, style_dna, character_database)
+        # Run async generation on the shared runtime loop
+        return run_sync(
+            generate_ai_frame(client, scene, frame_number, style_dna, character_database, use_cache)
         )
         
-        loop.close()
-        return frame
-        
+    except JobCancelledError:
+        raise
     except Exception as e:
         print(f"❌ AI generation failed for scene {scene['scene_number']}: {e}")
         print("   Falling back to placeholder...")
@@ -4,8 +4,36 @@ Handles PDF and text file processing
 """
 
 import os
+import re
+import math
+import hashlib
 import tempfile
-from typing import Optional
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional
+from .screenplay_index import index_screenplay
+from .page_cache import PAGE_CACHE_ENABLED, get_page_cache
+
+# Processes extracting PDF pages in parallel (1 = extract in this process)
+PDF_WORKERS = max(1, int(os.getenv('SF_SIMPLE_PDF_WORKERS', str(min(4, os.cpu_count() or 1)))))
+# Shorter PDFs are extracted inline; starting worker processes costs more than it saves
+PDF_PARALLEL_MIN_PAGES = int(os.getenv('SF_SIMPLE_PDF_PARALLEL_MIN_PAGES', '16'))
+
+# Pages scoring below this (0-1) with PyPDF2 are extracted again with pdfplumber
+PDF_QUALITY_THRESHOLD = float(os.getenv('SF_SIMPLE_PDF_QUALITY_THRESHOLD', '0.6'))
+
+# Courier screenplay pages: about 1 character in 6 is whitespace and no line
+# runs much past 60 characters; glued words and merged columns break both
+MIN_WHITESPACE_RATIO = 0.12
+MAX_WORD_LENGTH = 20
+MAX_LINE_LENGTH = 80
+
+_HEADING = re.compile(r'\b(?:INT|EXT|I/E|INT\./EXT)\.\s')
+
+_pdf_pool: Optional[ProcessPoolExecutor] = None
+_pdf_pool_lock = threading.Lock()
 
 def extract_text_from_file(filepath: str) -> Optional[str]:
     """
@@ -33,40 +61,200 @@ def extract_text_from_file(filepath: str) -> Optional[str]:
         print(f"Error extracting text from {filepath}: {e}")
         return None
 
-def extract_pdf_text(filepath: str) -> Optional[str]:
-    """Extract text from PDF file"""
+def detect_source_format(filename: str) -> str:
+    """'pdf', 'fountain' (structured screenplay markup) or 'text' by file extension"""
+    _, ext = os.path.splitext(filename.lower())
+    if ext == '.pdf':
+        return 'pdf'
+    if ext == '.fountain':
+        return 'fountain'
+    return 'text'
+
+def file_sha256(filepath: str, chunk_size: int = 1024 * 1024) -> str:
+    """SHA-256 of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def page_quality(text: str) -> float:
+    """
+    Extraction quality of one page (0-1), the worst of four signals
+
+    Whitespace ratio and word length catch dropped spaces, the long tail of
+    line lengths catches merged columns, and scene headings in the middle of
+    a line catch lines glued together. Blank pages score 1 (nothing to repair).
+    """
+    words = text.split()
+    lines = [line.rstrip() for line in text.split('\n') if line.strip()]
+    if not words:
+        return 1.0
+
+    spacing = min(1.0, sum(1 for char in text if char.isspace()) / len(text) / MIN_WHITESPACE_RATIO)
+    glued = sum(1 for word in words if len(word) > MAX_WORD_LENGTH) / len(words)
+    lengths = sorted(len(line) for line in lines)
+    tail = lengths[int(len(lengths) * 0.9)] if len(lengths) > 1 else lengths[0]
+    headings = [match.start() == len(line) - len(line.lstrip())
+                for line in lines for match in _HEADING.finditer(line)]
+
+    signals = (
+        spacing,
+        1.0 - min(1.0, glued * 5),
+        1.0 - min(1.0, max(0, tail - MAX_LINE_LENGTH) / (MAX_LINE_LENGTH / 2)),
+        sum(headings) / len(headings) if headings else 1.0
+    )
+    return round(min(signals), 3)
+
+def _extracted(text: str, engine: str) -> Dict[str, Any]:
+    return {'text': text, 'engine': engine, 'quality': page_quality(text)}
+
+def extract_pdf_page_range(filepath: str, page_numbers: List[int]) -> Dict[int, Optional[Dict[str, Any]]]:
+    """
+    Pages of a PDF as {'text', 'engine', 'quality'} (runs in a pool worker, so it opens its own reader)
+
+    PyPDF2 reads every page; only pages it can't read or that score below
+    PDF_QUALITY_THRESHOLD are extracted again with pdfplumber, keeping
+    whichever result scores better. Pages neither engine can read are None.
+    """
+    import PyPDF2
+
+    pages: Dict[int, Optional[Dict[str, Any]]] = {}
+    retry = []
+    reader = PyPDF2.PdfReader(filepath)
+    for number in page_numbers:
+        try:
+            pages[number] = _extracted(reader.pages[number].extract_text() or '', 'pypdf2')
+            if pages[number]['quality'] < PDF_QUALITY_THRESHOLD:
+                retry.append(number)
+        except Exception as e:
+            print(f"PyPDF2 could not read page {number + 1}: {e}")
+            retry.append(number)
+
+    if retry:
+        try:
+            import pdfplumber
+            with pdfplumber.open(filepath) as pdf:
+                for number in retry:
+                    try:
+                        page = _extracted(pdf.pages[number].extract_text() or '', 'pdfplumber')
+                    except Exception as e:
+                        print(f"pdfplumber could not read page {number + 1}: {e}")
+                        continue
+                    if pages.get(number) is None or page['quality'] > pages[number]['quality']:
+                        pages[number] = page
+        except ImportError:
+            pass
+        except Exception as e:
+            print(f"Error with pdfplumber: {e}")
+    for number in retry:
+        pages.setdefault(number, None)
+    return pages
+
+def get_pdf_pool() -> Optional[ProcessPoolExecutor]:
+    """Shared page extraction pool, started on first use (None when PDF_WORKERS is 1)"""
+    global _pdf_pool
+    if PDF_WORKERS <= 1:
+        return None
+    if _pdf_pool is None:
+        with _pdf_pool_lock:
+            if _pdf_pool is None:
+                # Spawned workers don't inherit the web server's threads or connections
+                _pdf_pool = ProcessPoolExecutor(PDF_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+    return _pdf_pool
+
+def extract_pdf_pages(filepath: str, page_numbers: List[int]) -> Dict[int, Optional[Dict[str, Any]]]:
+    """Extract pages across the pool in contiguous batches, or inline for short documents"""
+    global _pdf_pool
+    pool = get_pdf_pool() if len(page_numbers) >= PDF_PARALLEL_MIN_PAGES else None
+    if pool is None:
+        return extract_pdf_page_range(filepath, page_numbers)
+
+    size = math.ceil(len(page_numbers) / PDF_WORKERS)
+    batches = [page_numbers[start:start + size] for start in range(0, len(page_numbers), size)]
+    try:
+        pages: Dict[int, Optional[Dict[str, Any]]] = {}
+        for batch in pool.map(extract_pdf_page_range, [filepath] * len(batches), batches):
+            pages.update(batch)
+        return pages
+    except BrokenProcessPool:
+        print("PDF worker pool broke, extracting pages inline")
+        with _pdf_pool_lock:
+            _pdf_pool = None
+        return extract_pdf_page_range(filepath, page_numbers)
+
+def extract_pdf_document(filepath: str, file_hash: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Extract a PDF with a per-page report
+
+    Returns {'text', 'pages': [{'page', 'engine', 'quality'}], 'engines': {engine: page count}}
+    or None if no page could be read. Pages are cached by file hash and page
+    number, so only pages not seen before are extracted (in parallel for long
+    documents); unreadable pages are skipped with a warning. Pass `file_hash`
+    when the SHA-256 is already known to skip hashing the file again.
+    """
     try:
         import PyPDF2
         
         with open(filepath, 'rb') as file:
-            pdf_reader = PyPDF2.PdfReader(file)
-            text = ""
-            
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
-            
-            return text.strip()
+            page_count = len(PyPDF2.PdfReader(file).pages)
+
+        if PAGE_CACHE_ENABLED:
+            file_hash = file_hash or file_sha256(filepath)
+        else:
+            file_hash = None
+        pages: Dict[int, Optional[Dict[str, Any]]] = get_page_cache().get_pages(file_hash, page_count) if file_hash else {}
+        missing = [number for number in range(page_count) if number not in pages]
+        if missing:
+            extracted = extract_pdf_pages(filepath, missing)
+            pages.update(extracted)
+            readable = {number: page for number, page in extracted.items() if page is not None}
+            if file_hash and readable:
+                get_page_cache().put_pages(file_hash, readable)
+
+        unreadable = [number + 1 for number in range(page_count) if pages.get(number) is None]
+        if unreadable:
+            print(f"⚠️ Skipped unreadable PDF pages: {unreadable}")
+            if len(unreadable) == page_count:
+                return None
+
+        report = [{'page': number + 1, 'engine': pages[number]['engine'], 'quality': pages[number]['quality']}
+                  for number in range(page_count) if pages.get(number) is not None]
+        engines: Dict[str, int] = {}
+        for page in report:
+            engines[page['engine']] = engines.get(page['engine'], 0) + 1
+        print(f"📄 PDF pages by engine: {engines}")
+
+        return {
+            # Joined once at the end instead of growing a string page by page
+            'text': '\n'.join(pages[number]['text'] for number in range(page_count)
+                              if pages.get(number) is not None).strip(),
+            'pages': report,
+            'engines': engines
+        }
             
     except ImportError:
         print("PyPDF2 not installed, trying alternative method...")
-        return extract_pdf_text_alternative(filepath)
+        text = extract_pdf_text_alternative(filepath)
+        return {'text': text, 'pages': [], 'engines': {}} if text is not None else None
     except Exception as e:
         print(f"Error extracting PDF text: {e}")
         return None
 
+def extract_pdf_text(filepath: str) -> Optional[str]:
+    """Extract text from PDF file"""
+    document = extract_pdf_document(filepath)
+    return document['text'] if document else None
+
 def extract_pdf_text_alternative(filepath: str) -> Optional[str]:
     """Alternative PDF text extraction using pdfplumber"""
     try:
         import pdfplumber
         
-        text = ""
         with pdfplumber.open(filepath) as pdf:
-            for page in pdf.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text + "\n"
+            page_texts = [page.extract_text() for page in pdf.pages]
         
-        return text.strip()
+        return '\n'.join(text for text in page_texts if text).strip()
         
     except ImportError:
         print("pdfplumber not installed, trying simple approach...")
@@ -148,11 +336,7 @@ def estimate_pages(text: str) -> int:
     if not text:
         return 0
     
-    # Standard screenplay formatting estimates
-    lines = text.split('\n')
-    non_empty_lines = [line for line in lines if line.strip()]
-    
-    # Roughly 25 lines per page in standard screenplay format
-    estimated_pages = max(1, len(non_empty_lines) // 25)
+    # Roughly 25 non-empty lines per page in standard screenplay format
+    estimated_pages = max(1, index_screenplay(text).non_empty_lines // 25)
     
     return estimated_pages
\ No newline at end of file
@@ -0,0 +1,92 @@
+"""
+Upload dedupe cache
+Uploads are streamed through a SHA-256 hasher; a file seen before gets its
+extracted text and scene count back without being saved or parsed again
+"""
+
+import os
+import json
+import time
+import hashlib
+import tempfile
+from typing import Any, BinaryIO, Dict, Optional, Tuple
+
+from utils.project_store import DATA_DIR
+from utils.sqlite_db import SQLiteCache, process_wide
+
+UPLOAD_CACHE_ENABLED = os.getenv('SF_SIMPLE_UPLOAD_CACHE', 'true').lower() == 'true'
+UPLOAD_CACHE_PATH = os.getenv('SF_SIMPLE_UPLOAD_CACHE_PATH', os.path.join(DATA_DIR, 'upload_cache.db'))
+# Least recently used uploads are evicted once the cache grows past this size
+UPLOAD_CACHE_MAX_BYTES = int(float(os.getenv('SF_SIMPLE_UPLOAD_CACHE_MAX_MB', '128')) * 1024 * 1024)
+# Uploads up to this size are spooled in memory, larger ones go to a temp file
+UPLOAD_SPOOL_BYTES = int(float(os.getenv('SF_SIMPLE_UPLOAD_SPOOL_MB', '8')) * 1024 * 1024)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS uploads (
+    file_hash TEXT NOT NULL,
+    format TEXT NOT NULL,
+    text TEXT NOT NULL,
+    result TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_used_at REAL NOT NULL,
+    PRIMARY KEY (file_hash, format)
+);
+
+CREATE INDEX IF NOT EXISTS idx_uploads_last_used ON uploads(last_used_at);
+"""
+
+
+def spool_upload(stream: BinaryIO, chunk_size: int = 1024 * 1024) -> Tuple[BinaryIO, str, int]:
+    """Copy an upload stream into a spooled temp file, hashing it on the way; returns (file, sha256, size)"""
+    spool = tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_BYTES)
+    digest = hashlib.sha256()
+    size = 0
+    for chunk in iter(lambda: stream.read(chunk_size), b''):
+        digest.update(chunk)
+        spool.write(chunk)
+        size += len(chunk)
+    spool.seek(0)
+    return spool, digest.hexdigest(), size
+
+
+class UploadCache(SQLiteCache):
+    """(file hash, source format) -> extracted text plus the upload's analysis, shared through SQLite"""
+
+    def __init__(self, db_path: str = UPLOAD_CACHE_PATH, max_bytes: int = UPLOAD_CACHE_MAX_BYTES) -> None:
+        super().__init__(db_path, SCHEMA, 'uploads', ('file_hash', 'format'), max_bytes, UPLOAD_CACHE_ENABLED)
+
+    def get(self, file_hash: str, source_format: str) -> Optional[Dict[str, Any]]:
+        """Cached {'text', ...result} of an upload, or None"""
+        with self.connection() as conn:
+            row = conn.execute(
+                'SELECT text, result FROM uploads WHERE file_hash = ? AND format = ?',
+                (file_hash, source_format)
+            ).fetchone()
+            if row is None:
+                self._count(conn, 'misses')
+                return None
+            conn.execute('UPDATE uploads SET last_used_at = ? WHERE file_hash = ? AND format = ?',
+                         (time.time(), file_hash, source_format))
+            self._count(conn, 'hits')
+        return {'text': row['text'], **json.loads(row['result'])}
+
+    def put(self, file_hash: str, source_format: str, text: str, result: Dict[str, Any]) -> None:
+        """Store an upload's text and result, evicting least recently used uploads beyond max_bytes"""
+        payload = json.dumps(result)
+        now = time.time()
+        with self.connection() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO uploads (file_hash, format, text, result, size, created_at, last_used_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (file_hash, source_format, text, payload, len(text.encode('utf-8')) + len(payload), now, now)
+            )
+            self._evict_over_budget(conn)
+
+
+_upload_cache = process_wide(UploadCache)
+
+
+def get_upload_cache() -> UploadCache:
+    """Get the process-wide upload cache, opening its database on first use"""
+    return _upload_cache()
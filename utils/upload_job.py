@@ -0,0 +1,210 @@
+"""
+Upload extraction job
+/upload only saves the file and answers 202; text extraction and scene
+counting run here in the background and report progress through the same
+StatusTracker channel generation uses
+"""
+
+import os
+from datetime import datetime
+from typing import Any, Callable, Dict, IO, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process dev server, nothing to coordinate with
+    fcntl = None
+
+from utils.text_extractor import extract_text_from_file, extract_pdf_document
+from utils.fountain_parser import parse_fountain
+from utils.screenplay_index import index_screenplay
+from utils.revisions import diff_summary
+from utils.upload_cache import UPLOAD_CACHE_ENABLED, get_upload_cache
+
+# Uploads extracted at the same time (PDF pages themselves are parsed by the PDF process pool)
+EXTRACTION_WORKERS = max(1, int(os.getenv('SF_SIMPLE_EXTRACTION_WORKERS', '2')))
+
+# Status of a project whose upload is still being extracted, and once it's ready
+EXTRACTING = 'extracting'
+EXTRACTED = 'extracted'
+
+
+def extraction_status() -> Dict[str, Any]:
+    """Initial status published for a freshly uploaded project"""
+    return {
+        'status': EXTRACTING,
+        'progress': 0,
+        'current_step': 'Extracting text...',
+        'total_steps': 2,
+        'current_step_num': 1,
+        'scenes': [],
+        'frames': [],
+        'analysis': None,
+        'started_at': datetime.now().isoformat()
+    }
+
+
+def extract_upload(filepath: str, source_format: str, file_hash: str, statuses=None,
+                   project_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Extract a saved upload and count its scenes
+
+    Returns {'text', 'extraction', 'word_count', 'detected_scenes'} (also
+    stored in the upload cache under the file hash), or None if no text
+    could be extracted. Progress goes to `statuses` when given.
+    """
+    # PDFs report the engine chosen for every page
+    if source_format == 'pdf':
+        extraction = extract_pdf_document(filepath, file_hash)
+        text = extraction.pop('text') if extraction else None
+    else:
+        extraction = None
+        text = extract_text_from_file(filepath)
+    if not text:
+        return None
+
+    word_count = index_screenplay(text).word_count
+    print(f"✅ Text extracted: {len(text)} characters, {word_count} words")
+    if statuses is not None:
+        statuses.update_status(project_id, current_step='Counting scenes...', current_step_num=2, progress=50)
+
+    from utils.scene_analyzer import detect_optimal_scene_count
+    elements = parse_fountain(text) if source_format == 'fountain' else None
+    detected_scenes = detect_optimal_scene_count(text, elements)
+    print(f"📊 Scene detection complete: {detected_scenes} scenes detected")
+
+    result = {'extraction': extraction, 'detected_scenes': detected_scenes, 'word_count': word_count}
+    if UPLOAD_CACHE_ENABLED:
+        get_upload_cache().put(file_hash, source_format, text, result)
+    return {'text': text, **result}
+
+
+def finish_upload(project: Dict[str, Any], result: Dict[str, Any], projects) -> Dict[str, Any]:
+    """
+    Store an extracted upload on its project (now 'ready') and return the
+    summary reported to the client; revised drafts are diffed against the
+    project they replace
+    """
+    text = result['text']
+    previous_project = projects.get(project['revision_of']) if project.get('revision_of') else None
+    revision = diff_summary(previous_project['text'], text) if previous_project else None
+    if revision:
+        print(f"📝 Revised draft of {previous_project['id']}: {revision['changed_scenes']} changed, "
+              f"{revision['unchanged_scenes']} unchanged scenes")
+
+    # The saved upload is deleted once extracted, so its path isn't kept
+    stored = {key: value for key, value in project.items() if key != 'upload_path'}
+    projects[project['id']] = dict(stored, text=text, status='ready', extraction=result['extraction'],
+                                   word_count=result['word_count'], char_count=len(text),
+                                   detected_scenes=result['detected_scenes'])
+    return {
+        'filename': project['filename'],
+        'word_count': result['word_count'],
+        'char_count': len(text),
+        'text_length': len(text),
+        'detected_scenes': result['detected_scenes'],
+        'revision_of': project.get('revision_of'),
+        'revision': revision,
+        'extraction': result['extraction']
+    }
+
+
+def _claim_upload(filepath: str) -> Optional[IO[bytes]]:
+    """
+    Lock a saved upload for extraction
+
+    Returns the open, locked file (the lock lasts until it's closed or the
+    process dies), or None if another thread or process is extracting it
+    or already has.
+    """
+    try:
+        handle = open(filepath, 'rb')
+    except FileNotFoundError:
+        return None
+    if fcntl is not None:
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            return None
+    # The extraction that held the lock before us may have finished and deleted the file
+    if not os.path.exists(filepath):
+        handle.close()
+        return None
+    return handle
+
+
+def _fail_upload(project_id: str, error: str, projects, statuses) -> None:
+    """Move an upload's project and status to 'error'"""
+    if project_id in projects:
+        projects[project_id] = dict(projects[project_id], status='error')
+    statuses.update_status(
+        project_id,
+        status='error',
+        error=error,
+        current_step=f'Error: {error}',
+        completed_at=datetime.now().isoformat()
+    )
+
+
+def run_upload_job(project_id: str, filepath: str, projects, statuses) -> None:
+    """
+    Extract an upload saved at `filepath` into its project, then delete the file
+
+    The project's status moves from 'extracting' to 'extracted' (with the
+    upload summary under 'upload') or 'error'. Does nothing if the upload
+    is already being (or has been) extracted elsewhere.
+    """
+    claim = _claim_upload(filepath)
+    if claim is None:
+        return
+    try:
+        if statuses.get(project_id, {}).get('status') != EXTRACTING:
+            return
+        project = projects[project_id]
+        result = extract_upload(filepath, project['format'], project['file_hash'], statuses, project_id)
+        if result is None:
+            raise ValueError('Could not extract text from file')
+
+        summary = finish_upload(project, result, projects)
+        statuses.update_status(
+            project_id,
+            status=EXTRACTED,
+            current_step=f"Text extracted, {summary['detected_scenes']} scenes detected",
+            progress=100,
+            upload=summary,
+            completed_at=datetime.now().isoformat()
+        )
+        print(f"🆔 Project ready: {project_id}")
+    except Exception as e:
+        print(f"❌ Extraction failed for {project_id}: {e}")
+        _fail_upload(project_id, str(e), projects, statuses)
+    finally:
+        if os.path.exists(filepath):
+            os.remove(filepath)
+        claim.close()
+        statuses.release(project_id)
+
+
+def recover_uploads(store, projects, statuses, submit: Callable[..., Any]) -> int:
+    """
+    Restart extraction of uploads a previous process left 'extracting'
+
+    Each one whose saved file still exists is handed to `submit` (e.g. the
+    upload executor's submit) with run_upload_job, which skips uploads a
+    live process is still extracting. The rest can't be extracted any more
+    and are moved to 'error'. Returns how many were resubmitted.
+    """
+    resubmitted = 0
+    for project_id in store.list_job_ids((EXTRACTING,)):
+        project = projects.get(project_id) or {}
+        filepath = project.get('upload_path')
+        if filepath and os.path.exists(filepath):
+            submit(run_upload_job, project_id, filepath, projects, statuses)
+            resubmitted += 1
+        elif statuses.get(project_id, {}).get('status') == EXTRACTING:
+            print(f"❌ Upload {project_id} was interrupted and its file is gone")
+            _fail_upload(project_id, 'Upload was interrupted, please upload the file again', projects, statuses)
+            statuses.release(project_id)
+    if resubmitted:
+        print(f"♻️ Resubmitted {resubmitted} interrupted upload extraction(s)")
+    return resubmitted
@@ -0,0 +1,157 @@
+"""
+Generation worker processes
+Each worker claims jobs from the JobQueue and runs them; the pool is started
+next to the web server (or on its own with worker.py)
+"""
+
+import os
+import time
+import socket
+import threading
+import multiprocessing
+from typing import List, Optional
+
+from utils.project_store import ProjectStore
+from utils.status_tracker import StatusTracker
+from utils.job_queue import JobQueue
+from utils.generation_job import run_generation_job
+from utils.openai_runtime import CancelScope
+
+# Worker processes draining the queue (each renders FRAME_CONCURRENCY frames at a time)
+WORKER_PROCESSES = max(1, int(os.getenv('SF_SIMPLE_WORKER_PROCESSES', '2')))
+QUEUE_POLL_SECONDS = float(os.getenv('SF_SIMPLE_QUEUE_POLL_SECONDS', '1'))
+JOB_HEARTBEAT_SECONDS = 10
+# How often a running job checks whether it was cancelled
+CANCEL_POLL_SECONDS = float(os.getenv('SF_SIMPLE_CANCEL_POLL_SECONDS', '0.5'))
+# Jobs started with cancel_when_unwatched stop after nobody has watched them this long
+UNWATCHED_GRACE_SECONDS = float(os.getenv('SF_SIMPLE_UNWATCHED_GRACE_SECONDS', '60'))
+
+
+def refresh_queue_positions(queue: JobQueue, statuses: StatusTracker) -> None:
+    """Publish the current queue position of every waiting job"""
+    for position, project_id in enumerate(queue.queued_ids(), start=1):
+        status = statuses.get(project_id)
+        if status is not None and status.get('queue_position') != position:
+            statuses.update_status(
+                project_id,
+                queue_position=position,
+                current_step=f'Waiting in queue (position {position})...'
+            )
+
+
+def process_job(job: dict, worker_id: str, store: ProjectStore, queue: JobQueue,
+                statuses: StatusTracker) -> None:
+    """
+    Run one claimed job while a monitor thread heartbeats the claim and watches
+    for cancellation (cancel endpoint, deleted status, or nobody watching)
+    """
+    project_id = job['project_id']
+    scope = CancelScope()
+    finished = threading.Event()
+
+    def should_cancel() -> bool:
+        status = statuses.get(project_id)
+        if status is None or status.get('status') == 'cancelled':
+            return True
+        if status.get('cancel_when_unwatched'):
+            last_seen = store.last_seen(project_id) or 0
+            if time.time() - last_seen > UNWATCHED_GRACE_SECONDS:
+                print(f"👀 Nobody is watching {project_id}, cancelling")
+                return True
+        return False
+
+    def monitor() -> None:
+        last_heartbeat = time.monotonic()
+        while not finished.wait(CANCEL_POLL_SECONDS):
+            if time.monotonic() - last_heartbeat >= JOB_HEARTBEAT_SECONDS:
+                last_heartbeat = time.monotonic()
+                queue.heartbeat(project_id, worker_id)
+            try:
+                if not scope.cancelled and should_cancel():
+                    scope.cancel()
+            except Exception as e:
+                print(f"⚠️ Cancel check failed for {project_id}: {e}")
+
+    monitor_thread = threading.Thread(target=monitor, name='job-monitor', daemon=True)
+    monitor_thread.start()
+    try:
+        project = store.get_project(project_id)
+        if project is None:
+            print(f"⚠️ Skipping job for missing project {project_id}")
+            return
+        # A revised draft reuses what hasn't changed since the draft it replaces
+        previous_project = store.get_project(project['revision_of']) if project.get('revision_of') else None
+        print(f"👷 Worker {worker_id} running {project_id}")
+        run_generation_job(project_id, project, job['prompt_style'], statuses, scope=scope,
+                           previous_project=previous_project)
+    finally:
+        finished.set()
+        monitor_thread.join()
+        queue.finish(project_id, worker_id)
+
+
+def run_worker(stop_event=None, db_path: Optional[str] = None) -> None:
+    """Worker process main loop: claim, run, repeat until stop_event is set"""
+    store = ProjectStore(db_path) if db_path else ProjectStore()
+    queue = JobQueue(store)
+    statuses = StatusTracker(store)
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    last_sweep = 0.0
+
+    print(f"👷 Worker {worker_id} ready")
+    while stop_event is None or not stop_event.is_set():
+        try:
+            if time.monotonic() - last_sweep > JOB_HEARTBEAT_SECONDS:
+                last_sweep = time.monotonic()
+                requeued = queue.requeue_stale()
+                if requeued:
+                    print(f"♻️ Requeued {requeued} job(s) from stopped workers")
+
+            job = queue.claim(worker_id)
+            if job is None:
+                if stop_event is not None:
+                    stop_event.wait(QUEUE_POLL_SECONDS)
+                else:
+                    time.sleep(QUEUE_POLL_SECONDS)
+                continue
+
+            refresh_queue_positions(queue, statuses)
+            process_job(job, worker_id, store, queue, statuses)
+        except Exception as e:
+            print(f"❌ Worker {worker_id} error: {e}")
+            time.sleep(QUEUE_POLL_SECONDS)
+
+
+class WorkerPool:
+    """A set of worker processes started with the 'spawn' method (no inherited threads or connections)"""
+
+    def __init__(self, processes: int = WORKER_PROCESSES) -> None:
+        self.processes = processes
+        self._context = multiprocessing.get_context('spawn')
+        self._stop_event = self._context.Event()
+        self._workers: List[multiprocessing.Process] = []
+
+    def start(self) -> 'WorkerPool':
+        """Launch the worker processes"""
+        for index in range(self.processes):
+            process = self._context.Process(
+                target=run_worker, args=(self._stop_event,), name=f'sf-worker-{index + 1}', daemon=True
+            )
+            process.start()
+            self._workers.append(process)
+        print(f"👷 Started {self.processes} generation worker process(es)")
+        return self
+
+    def alive(self) -> int:
+        """Number of worker processes still running"""
+        return sum(1 for process in self._workers if process.is_alive())
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Ask workers to stop after their current poll; terminate any that don't"""
+        self._stop_event.set()
+        deadline = time.monotonic() + timeout
+        for process in self._workers:
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                process.terminate()
+        self._workers = []
@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+"""
+Script Fury Simple - generation worker pool
+Runs the worker processes on their own, e.g. on a separate machine sharing
+the data directory, with SF_SIMPLE_EMBEDDED_WORKERS=false on the web tier
+"""
+
+import signal
+import threading
+
+from utils.worker_pool import WorkerPool, WORKER_PROCESSES
+
+if __name__ == '__main__':
+    stopped = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stopped.set())
+
+    print(f"🚀 Script Fury Simple workers starting ({WORKER_PROCESSES} processes)...")
+    pool = WorkerPool().start()
+    try:
+        while not stopped.wait(1):
+            pass
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pool.stop()